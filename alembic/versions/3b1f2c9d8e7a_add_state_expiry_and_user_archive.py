@@ -0,0 +1,49 @@
+"""Add state expiry columns and archived users
+
+Revision ID: 3b1f2c9d8e7a
+Revises: ccfe844c61ac
+Create Date: 2026-10-19 10:12:41.220913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f2c9d8e7a'
+down_revision: Union[str, Sequence[str], None] = 'ccfe844c61ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('state_updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('activated_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_users_state_updated_at'), 'users', ['state_updated_at'], unique=False)
+    # Existing users may well have messaged us; never treat them as inactive
+    op.execute("UPDATE users SET activated_at = created_at")
+
+    op.create_table('archived_users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_users_id'), 'archived_users', ['id'], unique=False)
+    op.create_index(op.f('ix_archived_users_phone'), 'archived_users', ['phone'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_archived_users_phone'), table_name='archived_users')
+    op.drop_index(op.f('ix_archived_users_id'), table_name='archived_users')
+    op.drop_table('archived_users')
+    op.drop_index(op.f('ix_users_state_updated_at'), table_name='users')
+    op.drop_column('users', 'activated_at')
+    op.drop_column('users', 'state_updated_at')
@@ -0,0 +1,28 @@
+"""Add tree version
+
+Revision ID: 5d2e8a4c1b90
+Revises: 3b1f2c9d8e7a
+Create Date: 2026-10-19 14:05:12.377102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8a4c1b90'
+down_revision: Union[str, Sequence[str], None] = '3b1f2c9d8e7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trees', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trees', 'version')
@@ -0,0 +1,46 @@
+"""Add tree change feed
+
+Revision ID: 8e4b1f6a2c37
+Revises: 5d2e8a4c1b90
+Create Date: 2026-10-19 15:31:48.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b1f6a2c37'
+down_revision: Union[str, Sequence[str], None] = '5d2e8a4c1b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tree_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['tree_id'], ['trees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tree_changes_tree_id_id', 'tree_changes', ['tree_id', 'id'], unique=False)
+    op.create_index('ix_tree_changes_entity', 'tree_changes', ['tree_id', 'entity', 'entity_id', 'id'], unique=False)
+    op.create_index(op.f('ix_tree_changes_created_at'), 'tree_changes', ['created_at'], unique=False)
+    op.add_column('trees', sa.Column('change_floor', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trees', 'change_floor')
+    op.drop_index(op.f('ix_tree_changes_created_at'), table_name='tree_changes')
+    op.drop_index('ix_tree_changes_entity', table_name='tree_changes')
+    op.drop_index('ix_tree_changes_tree_id_id', table_name='tree_changes')
+    op.drop_table('tree_changes')
@@ -0,0 +1,33 @@
+"""Unique tree access per user
+
+Revision ID: a91c3e5f7d20
+Revises: 8e4b1f6a2c37
+Create Date: 2026-10-19 17:02:36.518830
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91c3e5f7d20'
+down_revision: Union[str, Sequence[str], None] = '8e4b1f6a2c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # grant_access used to check-then-insert, so races may have left duplicates; keep the newest row
+    op.execute(
+        "DELETE FROM tree_access WHERE id NOT IN "
+        "(SELECT MAX(id) FROM tree_access GROUP BY tree_id, user_id)"
+    )
+    op.create_unique_constraint('uq_tree_access_tree_user', 'tree_access', ['tree_id', 'user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_tree_access_tree_user', 'tree_access', type_='unique')
@@ -0,0 +1,28 @@
+"""Add pending reply parts for long messages
+
+Revision ID: b6d0e3f7a214
+Revises: f3b8d1a5c602
+Create Date: 2026-10-19 22:03:11.417902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d0e3f7a214'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d1a5c602'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('pending_reply', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'pending_reply')
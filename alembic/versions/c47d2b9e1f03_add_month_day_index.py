@@ -0,0 +1,43 @@
+"""Add month/day keys for upcoming dates
+
+Revision ID: c47d2b9e1f03
+Revises: a91c3e5f7d20
+Create Date: 2026-10-19 18:40:12.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47d2b9e1f03'
+down_revision: Union[str, Sequence[str], None] = 'a91c3e5f7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _month_day(column: str) -> str:
+    if op.get_bind().dialect.name == "sqlite":
+        return f"CAST(strftime('%m%d', {column}) AS INTEGER)"
+    return f"(EXTRACT(MONTH FROM {column}) * 100 + EXTRACT(DAY FROM {column}))::integer"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('members', sa.Column('month_day', sa.Integer(), nullable=True))
+    op.add_column('events', sa.Column('month_day', sa.Integer(), nullable=True))
+    # 0001-01-01 is the placeholder for unknown birth dates, which have no birthday
+    op.execute(f"UPDATE members SET month_day = {_month_day('dob')} WHERE dob <> '0001-01-01'")
+    op.execute(f"UPDATE events SET month_day = {_month_day('event_date')}")
+    op.create_index('ix_members_tree_month_day', 'members', ['tree_id', 'month_day'], unique=False)
+    op.create_index(op.f('ix_events_month_day'), 'events', ['month_day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_events_month_day'), table_name='events')
+    op.drop_index('ix_members_tree_month_day', table_name='members')
+    op.drop_column('events', 'month_day')
+    op.drop_column('members', 'month_day')
@@ -0,0 +1,44 @@
+"""Number change feed entries per tree
+
+Revision ID: d8c5a2e9f417
+Revises: b6d0e3f7a214
+Create Date: 2026-10-19 23:12:40.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8c5a2e9f417'
+down_revision: Union[str, Sequence[str], None] = 'b6d0e3f7a214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tree_changes', sa.Column('seq', sa.Integer(), nullable=True))
+    # Existing entries keep their id as seq, so clients' `since` cursors and the
+    # compaction floors stay valid; versions move past them so new entries sort after
+    op.execute("UPDATE tree_changes SET seq = id")
+    op.execute(
+        "UPDATE trees SET version = GREATEST(version, "
+        "(SELECT COALESCE(MAX(seq), 0) FROM tree_changes WHERE tree_changes.tree_id = trees.id), change_floor)"
+    )
+    op.alter_column('tree_changes', 'seq', nullable=False)
+    op.drop_index('ix_tree_changes_entity', table_name='tree_changes')
+    op.drop_index('ix_tree_changes_tree_id_id', table_name='tree_changes')
+    op.create_index('ix_tree_changes_tree_seq', 'tree_changes', ['tree_id', 'seq'], unique=True)
+    op.create_index('ix_tree_changes_entity', 'tree_changes', ['tree_id', 'entity', 'entity_id', 'seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tree_changes_entity', table_name='tree_changes')
+    op.drop_index('ix_tree_changes_tree_seq', table_name='tree_changes')
+    op.create_index('ix_tree_changes_tree_id_id', 'tree_changes', ['tree_id', 'id'], unique=False)
+    op.create_index('ix_tree_changes_entity', 'tree_changes', ['tree_id', 'entity', 'entity_id', 'id'], unique=False)
+    op.drop_column('tree_changes', 'seq')
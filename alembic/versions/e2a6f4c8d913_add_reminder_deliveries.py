@@ -0,0 +1,45 @@
+"""Add reminder delivery outbox
+
+Revision ID: e2a6f4c8d913
+Revises: c47d2b9e1f03
+Create Date: 2026-10-19 19:55:03.611482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a6f4c8d913'
+down_revision: Union[str, Sequence[str], None] = 'c47d2b9e1f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reminder_deliveries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reminder_date', sa.Date(), nullable=False),
+    sa.Column('tree_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), server_default='pending', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['tree_id'], ['trees.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reminder_date', 'tree_id', 'user_id', name='uq_reminder_deliveries_day_tree_user')
+    )
+    op.create_index('ix_reminder_deliveries_day_status', 'reminder_deliveries', ['reminder_date', 'status', 'id'], unique=False)
+    op.create_index('ix_members_month_day', 'members', ['month_day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_members_month_day', table_name='members')
+    op.drop_index('ix_reminder_deliveries_day_status', table_name='reminder_deliveries')
+    op.drop_table('reminder_deliveries')
@@ -0,0 +1,28 @@
+"""Add opt-in flag for edit notifications
+
+Revision ID: f3b8d1a5c602
+Revises: e2a6f4c8d913
+Create Date: 2026-10-19 21:14:48.902356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1a5c602'
+down_revision: Union[str, Sequence[str], None] = 'e2a6f4c8d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('notify_changes', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'notify_changes')
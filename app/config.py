@@ -10,6 +10,88 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     ENVIRONMENT: str = "development"
 
+    # Webhook signatures are always enforced in production; elsewhere mismatches are
+    # only logged unless this is set. The signed URL is rebuilt from X-Forwarded-*.
+    TWILIO_VALIDATE_SIGNATURES: bool = False
+    TRUST_PROXY_HEADERS: bool = True
+
+    # Conversation state storage: "database", "memory" or "write_behind"
+    STATE_STORE_BACKEND: str = "database"
+    STATE_TTL_SECONDS: int = 86400
+    STATE_FLUSH_INTERVAL_MS: int = 200
+
+    # Periodic cleanup of abandoned states and never-active users (0 disables)
+    GC_INTERVAL_SECONDS: int = 3600
+    GC_BATCH_SIZE: int = 500
+    USER_ARCHIVE_AFTER_DAYS: int = 30
+    # Change-feed compaction: keep only the latest entry per entity after this long,
+    # drop delete/reset entries entirely after CHANGE_TOMBSTONE_DAYS
+    CHANGE_COMPACT_AFTER_DAYS: int = 1
+    CHANGE_TOMBSTONE_DAYS: int = 30
+
+    # Trees with more members than this are deleted in background chunks
+    TREE_DELETE_CHUNK_THRESHOLD: int = 5000
+    TREE_DELETE_BATCH_SIZE: int = 1000
+
+    # Twilio gives up on a webhook after 15 s; past this budget the handler is cancelled,
+    # its transaction rolled back, and PostgreSQL statements time out with it
+    REQUEST_DEADLINE_SECONDS: float = 12.0
+
+    # Circuit breaker around the DB: opens after this many consecutive connect/timeout
+    # failures, then lets DB_BREAKER_HALF_OPEN_TRIALS requests probe every RESET_SECONDS
+    DB_BREAKER_FAILURES: int = 5
+    DB_BREAKER_RESET_SECONDS: float = 10.0
+    DB_BREAKER_HALF_OPEN_TRIALS: int = 1
+
+    # Prometheus /metrics (behind API_KEY, like /trees): per-state latency histograms,
+    # per-request statement counts and DB time, pool, breaker and admission stats
+    METRICS_ENABLED: bool = True
+
+    # Admission control in front of the webhook: per-phone token buckets ("memory", or
+    # "shared" in Redis for several workers) and a cap on concurrent requests sized to
+    # the DB pool (SQLAlchemy's default: 5 connections + 10 overflow)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_BACKEND: str = "memory"
+    ADMISSION_REDIS_URL: str = "redis://localhost:6379/0"
+    ADMISSION_PHONE_RATE: float = 1.0
+    ADMISSION_PHONE_BURST: float = 20.0
+    ADMISSION_MAX_CONCURRENCY: int = 15
+    ADMISSION_MAX_QUEUE: int = 100
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 2000
+
+    # Shared key for the /trees HTTP API (X-API-Key header); required in production
+    API_KEY: str = ""
+    EXPORT_BATCH_SIZE: int = 500
+
+    # How far ahead the "upcoming dates" menu option looks
+    UPCOMING_DAYS: int = 30
+
+    # Daily birthday/anniversary reminders, sent once a day after REMINDER_HOUR_UTC
+    REMINDERS_ENABLED: bool = False
+    REMINDER_HOUR_UTC: int = 8
+    REMINDER_BATCH_SIZE: int = 100
+    # Outbound WhatsApp messages: "twilio" or "fake" (records instead of sending)
+    OUTBOUND_SENDER: str = "twilio"
+    TWILIO_API_URL: str = "https://api.twilio.com"
+    # Token bucket per sender number, shared keep-alive pool, retries on 429/5xx
+    OUTBOUND_RATE_PER_SECOND: float = 10.0
+    OUTBOUND_BURST: float = 10.0
+    OUTBOUND_MAX_CONNECTIONS: int = 10
+    OUTBOUND_MAX_RETRIES: int = 3
+
+    # Edit digests for opted-in collaborators: edits to a tree are coalesced for
+    # NOTIFY_WINDOW_SECONDS, then fanned out through a bounded outbound queue
+    NOTIFY_ENABLED: bool = False
+    NOTIFY_WINDOW_SECONDS: float = 60.0
+    NOTIFY_QUEUE_SIZE: int = 10000
+    NOTIFY_BATCH_SIZE: int = 50
+
+    # Replies are split into WhatsApp-sized messages (UTF-16 units and UTF-8 bytes);
+    # past REPLY_MAX_PARTS messages the rest waits for the user to send "more"
+    REPLY_MAX_CHARS: int = 1600
+    REPLY_MAX_BYTES: int = 4096
+    REPLY_MAX_PARTS: int = 4
+
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,11 @@
+from sqlalchemy import event, exc
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.config import get_settings
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.deadline import statement_timeout_ms
+from app.utils.query_counter import instrument_engine
 from urllib.parse import urlparse, urlencode, parse_qs, urlunparse
 
 settings = get_settings()
@@ -34,7 +39,75 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+# Opens after DB_BREAKER_FAILURES consecutive outage errors; while open, get_db
+# refuses without touching the pool and the webhook answers from memory
+db_breaker = CircuitBreaker(
+    settings.DB_BREAKER_FAILURES, settings.DB_BREAKER_RESET_SECONDS, settings.DB_BREAKER_HALF_OPEN_TRIALS
+)
+
+# Driver errors meaning the server is unreachable, overloaded or too slow (asyncpg names)
+OUTAGE_ERRORS = {"QueryCanceledError", "CannotConnectNowError", "TooManyConnectionsError", "ConnectionDoesNotExistError"}
+
+
+class DatabaseUnavailable(Exception):
+    """Raised by `get_db` while the breaker is open."""
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether `error` means the database is down or slow, as opposed to a bad query."""
+    if isinstance(error, (exc.TimeoutError, DatabaseUnavailable)):
+        return True  # pool checkout timed out
+    if isinstance(error, exc.DBAPIError):
+        return (
+            error.connection_invalidated
+            or isinstance(error.orig, OSError)
+            or type(error.orig).__name__ in OUTAGE_ERRORS
+        )
+    return isinstance(error, OSError)
+
+
+def record_pool_timeout(error: BaseException):
+    """Pool checkout timeouts never reach the engine's error hook; whoever catches one counts it here."""
+    if isinstance(error, exc.TimeoutError):
+        db_breaker.record_failure()
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _record_db_failure(context):
+    # No connection yet means connecting itself failed
+    if (
+        context.is_disconnect
+        or context.connection is None
+        or isinstance(context.original_exception, OSError)
+        or type(context.original_exception).__name__ in OUTAGE_ERRORS
+    ):
+        db_breaker.record_failure()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_db_success(conn, cursor, statement, parameters, context, executemany):
+    db_breaker.record_success()
+
+
+# Statement timings for /metrics and per-request QueryCounters
+instrument_engine(engine.sync_engine)
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    """Under a request deadline, PostgreSQL cancels any statement that outlives the remaining budget."""
+    timeout_ms = statement_timeout_ms()
+    if timeout_ms is not None and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+def dialect_insert(session: AsyncSession):
+    """The backend's own `insert()` (PostgreSQL or SQLite), which supports ON CONFLICT upserts."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
 async def get_db():
+    if not db_breaker.allow():
+        raise DatabaseUnavailable()
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -1,12 +1,77 @@
-from fastapi import FastAPI
-from app.routers import webhook
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from app.config import get_settings
+from app.database import AsyncSessionLocal, DatabaseUnavailable
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.twilio_signature import TwilioSignatureMiddleware
+from app.routers import metrics, webhook, trees
+from app.services.chatbot_service import DEGRADED_TWIML
+from app.services.admission import close_admission_controller, get_admission_controller
+from app.services.maintenance_service import run_periodic_gc
+from app.services.notifier import ChangeNotifier, set_notifier
+from app.services.outbound import get_outbound_sender
+from app.services.reminder_service import run_daily_reminders
+from app.services.state_store import close_state_store
 from app.utils.logging import setup_logging
 
 logger = setup_logging()
+settings = get_settings()
 
-app = FastAPI(title="Family Tree WhatsApp Bot")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.GC_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodic_gc(AsyncSessionLocal, settings.GC_INTERVAL_SECONDS)))
+    sender = get_outbound_sender() if settings.REMINDERS_ENABLED or settings.NOTIFY_ENABLED else None
+    if settings.REMINDERS_ENABLED:
+        tasks.append(asyncio.create_task(run_daily_reminders(AsyncSessionLocal, sender, settings.REMINDER_HOUR_UTC)))
+    if settings.NOTIFY_ENABLED:
+        notifier = ChangeNotifier(
+            AsyncSessionLocal, sender, settings.NOTIFY_WINDOW_SECONDS,
+            settings.NOTIFY_BATCH_SIZE, settings.NOTIFY_QUEUE_SIZE,
+        )
+        set_notifier(notifier)
+        tasks.append(asyncio.create_task(notifier.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    set_notifier(None)
+    if sender:
+        await sender.close()
+    await close_admission_controller()
+    # Flush any write-behind conversation state before the worker exits
+    await close_state_store()
+
+app = FastAPI(title="Family Tree WhatsApp Bot", lifespan=lifespan)
+# Middleware added last runs first: metrics, deadline, signature check, admission, then the app
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=get_admission_controller())
+# Forged webhook calls are refused here, before any route or DB session runs
+app.add_middleware(
+    TwilioSignatureMiddleware,
+    auth_token=settings.TWILIO_AUTH_TOKEN,
+    enforce=settings.ENVIRONMENT == "production" or settings.TWILIO_VALIDATE_SIGNATURES,
+    trust_proxy=settings.TRUST_PROXY_HEADERS,
+)
+app.add_middleware(DeadlineMiddleware, seconds=settings.REQUEST_DEADLINE_SECONDS)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable(request: Request, exc: DatabaseUnavailable):
+    """The DB breaker is open: answer from memory instead of waiting on the pool."""
+    if request.url.path == "/webhook":
+        return Response(content=DEGRADED_TWIML, media_type="application/xml")
+    return JSONResponse({"detail": "Database temporarily unavailable"}, status_code=503, headers={"Retry-After": "10"})
 
 app.include_router(webhook.router)
+app.include_router(trees.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,49 @@
+from typing import Iterable
+
+from app.middleware.twilio_signature import FORM_STATE_KEY
+from app.services.admission import SHED_PHONE, AdmissionController
+from app.utils.twiml import response_xml
+
+# An empty reply: Twilio treats it as handled and neither retries nor sends anything
+EMPTY_TWIML = response_xml([]).encode("utf-8")
+
+
+class AdmissionMiddleware:
+    """
+    Admission control for the webhook (see `AdmissionController`). It runs
+    inside `TwilioSignatureMiddleware` and takes the sender's phone from the
+    form that middleware parsed. Shed requests are answered here, before a
+    route or DB session exists:
+
+    - a phone over its rate gets `200` with empty TwiML, so Twilio does not retry;
+    - when every slot is busy the answer is `429` with `Retry-After`.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str] = ("/webhook",), retry_after: int = 1):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.retry_after = str(retry_after).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        form = scope.get("state", {}).get(FORM_STATE_KEY)
+        phone = form.get("From") if form is not None else None
+        shed = await self.controller.acquire(phone)
+        if shed is not None:
+            await self._shed(send, shed)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _shed(self, send, reason: str):
+        headers = [(b"content-type", b"application/xml"), (b"content-length", str(len(EMPTY_TWIML)).encode())]
+        if reason != SHED_PHONE:
+            headers.append((b"retry-after", self.retry_after))
+        await send({"type": "http.response.start", "status": 200 if reason == SHED_PHONE else 429, "headers": headers})
+        await send({"type": "http.response.body", "body": EMPTY_TWIML})
@@ -0,0 +1,23 @@
+from typing import Iterable
+
+from app.utils.deadline import deadline
+
+
+class DeadlineMiddleware:
+    """
+    Starts the request's deadline when a webhook call arrives. The budget
+    covers the signature check, the wait for an admission slot, the handler
+    and each of its statements (see `app/utils/deadline.py`).
+    """
+
+    def __init__(self, app, seconds: float, paths: Iterable[str] = ("/webhook",)):
+        self.app = app
+        self.seconds = seconds
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.seconds):
+            await self.app(scope, receive, send)
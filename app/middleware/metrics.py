@@ -0,0 +1,46 @@
+import logging
+import time
+from typing import Iterable
+
+from app.utils.metrics import PathMetrics, path_metrics
+from app.utils.query_counter import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Outermost middleware: times each request to `paths`, counts its response
+    status and, through a `QueryCounter`, its statements and DB time (see
+    `app/utils/metrics.py`). Results are served by `/metrics`; at DEBUG level
+    each request's statements are also logged.
+    """
+
+    def __init__(self, app, paths: Iterable[str] = ("/webhook",)):
+        self.app = app
+        self.paths = {path: path_metrics.setdefault(path, PathMetrics()) for path in paths}
+
+    async def __call__(self, scope, receive, send):
+        metrics = self.paths.get(scope["path"]) if scope["type"] == "http" else None
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        debug = logger.isEnabledFor(logging.DEBUG)
+        with QueryCounter(trace=debug) as queries:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe(elapsed, queries.queries, queries.db_seconds, status)
+                if debug:
+                    logger.debug(f"{scope['method']} {scope['path']} {status} in {elapsed * 1000:.1f} ms, {queries.report()}")
@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import hmac
+import logging
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from starlette.datastructures import FormData
+
+logger = logging.getLogger(__name__)
+
+# Request.state attribute holding the parsed webhook form
+FORM_STATE_KEY = "twilio_form"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def request_url(scope, trust_proxy: bool = True) -> str:
+    """
+    The URL Twilio requested, which is what it signed. Behind a proxy
+    (Render, a load balancer) the first X-Forwarded-Proto/-Host values win
+    over what the app server saw.
+    """
+    scheme = scope.get("scheme", "http")
+    host = _header(scope, b"host")
+    if trust_proxy:
+        proto, forwarded_host = _header(scope, b"x-forwarded-proto"), _header(scope, b"x-forwarded-host")
+        if proto:
+            scheme = proto.split(",")[0].strip()
+        if forwarded_host:
+            host = forwarded_host.split(",")[0].strip()
+    if not host:
+        server_host, port = scope.get("server") or ("localhost", None)
+        host = server_host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{server_host}:{port}"
+    path = scope.get("raw_path", b"").decode("latin-1") or scope.get("root_path", "") + scope["path"]
+    query = scope.get("query_string", b"").decode("latin-1")
+    return f"{scheme}://{host}{path}" + (f"?{query}" if query else "")
+
+
+def url_variants(url: str) -> List[str]:
+    """The URL with and without a port; Twilio may have signed either form."""
+    parts = urlsplit(url)
+    if parts.port:
+        return [url, parts._replace(netloc=parts.netloc.rsplit(":", 1)[0]).geturl()]
+    default = DEFAULT_PORTS.get(parts.scheme)
+    return [url, parts._replace(netloc=f"{parts.netloc}:{default}").geturl()] if default else [url]
+
+
+class SignatureVerifier:
+    """
+    X-Twilio-Signature check: base64 HMAC-SHA1 over the URL followed by
+    every sorted parameter name and value. Keyed once; each request only
+    copies the keyed state.
+    """
+
+    def __init__(self, auth_token: str):
+        self._mac = hmac.new(auth_token.encode("utf-8"), digestmod=hashlib.sha1)
+
+    def signature(self, url: str, params: Dict[str, List[str]]) -> bytes:
+        mac = self._mac.copy()
+        mac.update(url.encode("utf-8"))
+        for name in sorted(params):
+            for value in sorted(set(params[name])):
+                mac.update(f"{name}{value}".encode("utf-8"))
+        return base64.b64encode(mac.digest())
+
+    def verify(self, url: str, params: Dict[str, List[str]], signature: str) -> bool:
+        expected = signature.strip().encode("latin-1", "replace")
+        # No short-circuit, so both variants always cost the same
+        results = [hmac.compare_digest(self.signature(u, params), expected) for u in url_variants(url)]
+        return any(results)
+
+
+class TwilioSignatureMiddleware:
+    """
+    Verifies Twilio webhook signatures before the app sees the request.
+
+    The body is read once. It is parsed into a `FormData` that the endpoint
+    picks up from `request.state.twilio_form`, and it is also replayed to the
+    app. A request with a bad signature is answered 403 straight from here,
+    so no route, dependency or DB session runs for it. With `enforce=False`
+    (development) mismatches are only logged.
+    """
+
+    def __init__(
+        self,
+        app,
+        auth_token: str,
+        paths: Iterable[str] = ("/webhook",),
+        enforce: bool = True,
+        trust_proxy: bool = True,
+        max_body: int = 64 * 1024,
+    ):
+        self.app = app
+        self.verifier = SignatureVerifier(auth_token)
+        self.paths = frozenset(paths)
+        self.enforce = enforce
+        self.trust_proxy = trust_proxy
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        chunks, size, more = [], 0, True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                await self._reject(send, 413, b"Request body too large")
+                return
+            chunks.append(chunk)
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        pairs = parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True)
+        params: Dict[str, List[str]] = {}
+        for name, value in pairs:
+            params.setdefault(name, []).append(value)
+        url = request_url(scope, self.trust_proxy)
+        if not self.verifier.verify(url, params, _header(scope, b"x-twilio-signature") or ""):
+            if self.enforce:
+                logger.warning(f"Invalid Twilio signature for {url}")
+                await self._reject(send, 403, b"Invalid signature")
+                return
+            logger.debug(f"Unsigned or mis-signed webhook call for {url} (not enforced)")
+
+        scope.setdefault("state", {})[FORM_STATE_KEY] = FormData(pairs)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    async def _reject(send, status: int, detail: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(detail)).encode())],
+        })
+        await send({"type": "http.response.body", "body": detail})
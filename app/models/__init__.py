@@ -1,5 +1,8 @@
 from app.database import Base
-from .user import User
+from .user import User, ArchivedUser
 from .tree import Tree, TreeAccess, Role
 from .member import Member, Relationship, Gender
 from .event import Event
+from .change import TreeChange
+from .reminder import ReminderDelivery
+from . import versioning
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class TreeChange(Base):
+    """
+    Append-only change feed per tree. `seq` is the sequence clients sync from:
+    it comes from the tree's version bump (see `models/versioning.py`), so it
+    grows in commit order within a tree, which the global `id` does not.
+    `data` holds the full row after the change (just the id for deletes), so
+    compaction can keep only the latest entry per entity.
+    """
+    __tablename__ = "tree_changes"
+
+    id = Column(Integer, primary_key=True)
+    tree_id = Column(Integer, ForeignKey("trees.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # tree, member, relationship, event, access
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)      # create, update, delete, reset
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_tree_changes_tree_seq", "tree_id", "seq", unique=True),
+        Index("ix_tree_changes_entity", "tree_id", "entity", "entity_id", "seq"),
+    )
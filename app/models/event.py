@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Date, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
+from app.models.member import month_day, month_day_default
 
 class Event(Base):
     __tablename__ = "events"
@@ -10,5 +11,12 @@ class Event(Base):
     event_type = Column(String, nullable=False) # e.g., "Anniversary", "Birthday"
     event_date = Column(Date, nullable=False)
     description = Column(String, nullable=True)
+    # Anniversary key for the upcoming-dates view, kept in step with event_date
+    month_day = Column(Integer, default=month_day_default("event_date"), nullable=True, index=True)
 
     member = relationship("Member", back_populates="events")
+
+    @validates("event_date")
+    def _sync_month_day(self, key, value):
+        self.month_day = month_day(value)
+        return value
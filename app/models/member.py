@@ -1,14 +1,49 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Enum, Boolean, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
 import enum
+from datetime import date
+from typing import NamedTuple, Optional
 
 class Gender(str, enum.Enum):
     MALE = "male"
     FEMALE = "female"
     OTHER = "other"
 
+class RelationSpec(NamedTuple):
+    generation_delta: int     # new member's generation relative to the relative
+    relationship_type: str    # parent, child, spouse or sibling (from the new member's side)
+    gender: Optional[Gender]  # gender implied by the relation, if any
+
+# How the NEW member relates to an existing relative
+RELATIONS = {
+    "mother": RelationSpec(-1, "parent", Gender.FEMALE),
+    "father": RelationSpec(-1, "parent", Gender.MALE),
+    "parent": RelationSpec(-1, "parent", None),
+    "child": RelationSpec(1, "child", None),
+    "spouse": RelationSpec(0, "spouse", None),
+    "brother": RelationSpec(0, "sibling", Gender.MALE),
+    "sister": RelationSpec(0, "sibling", Gender.FEMALE),
+    "sibling": RelationSpec(0, "sibling", None),
+}
+
+# Numbered options shown in the chat flows
+RELATION_CHOICES = {1: "mother", 2: "father", 3: "child", 4: "spouse", 5: "brother", 6: "sister"}
+
+# Stored for imported people whose birth date is unknown (dob is NOT NULL)
+UNKNOWN_DOB = date(1, 1, 1)
+
+def month_day(value: Optional[date]) -> Optional[int]:
+    """Recurring-date key, month * 100 + day (7 Mar -> 307). None for unknown dates."""
+    if value is None or value == UNKNOWN_DOB:
+        return None
+    return value.month * 100 + value.day
+
+def month_day_default(column: str):
+    """Column default filling `month_day` from `column` on INSERT, for ORM and Core inserts alike."""
+    return lambda context: month_day(context.get_current_parameters().get(column))
+
 class Member(Base):
     __tablename__ = "members"
 
@@ -19,6 +54,8 @@ class Member(Base):
     gender = Column(Enum(Gender), nullable=False)
     phone = Column(String, nullable=True)
     generation_level = Column(Integer, nullable=False) # 1-4
+    # Birthday key for the upcoming-dates view, kept in step with dob
+    month_day = Column(Integer, default=month_day_default("dob"), nullable=True)
     
     # Locking mechanism
     is_locked = Column(Boolean, default=False)
@@ -36,6 +73,17 @@ class Member(Base):
     
     events = relationship("Event", back_populates="member", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_members_tree_month_day", "tree_id", "month_day"),
+        # Daily reminders look up today's birthdays across all trees
+        Index("ix_members_month_day", "month_day"),
+    )
+
+    @validates("dob")
+    def _sync_month_day(self, key, value):
+        self.month_day = month_day(value)
+        return value
+
 class Relationship(Base):
     __tablename__ = "relationships"
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ReminderDelivery(Base):
+    """
+    Outbox of daily reminder messages, one row per (day, tree, recipient).
+    The unique key makes planning a day idempotent. `status` lets a crashed
+    run resume without sending anything twice:
+    pending -> sending (claimed for a batch) -> sent / failed.
+    """
+    __tablename__ = "reminder_deliveries"
+
+    id = Column(Integer, primary_key=True)
+    reminder_date = Column(Date, nullable=False)
+    tree_id = Column(Integer, ForeignKey("trees.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("reminder_date", "tree_id", "user_id", name="uq_reminder_deliveries_day_tree_user"),
+        Index("ix_reminder_deliveries_day_status", "reminder_date", "status", "id"),
+    )
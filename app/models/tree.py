@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, String, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -15,11 +15,16 @@ class Tree(Base):
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), unique=True) # One tree per user (owner)
     generation_limit = Column(Integer, default=4)
+    # Bumped on every member/relationship/event change (see models/versioning.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Change-feed entries at or below this sequence may have been compacted away
+    change_floor = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     owner = relationship("User", backref="owned_tree", lazy="selectin")
     members = relationship("Member", back_populates="tree", cascade="all, delete-orphan")
     access_list = relationship("TreeAccess", back_populates="tree", cascade="all, delete-orphan")
+    changes = relationship("TreeChange", cascade="all, delete-orphan", passive_deletes=True)
 
 class TreeAccess(Base):
     __tablename__ = "tree_access"
@@ -29,5 +34,8 @@ class TreeAccess(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     role = Column(Enum(Role), default=Role.VIEWER)
 
+    # Target of the grant_access / share upserts
+    __table_args__ = (UniqueConstraint("tree_id", "user_id", name="uq_tree_access_tree_user"),)
+
     tree = relationship("Tree", back_populates="access_list")
     user = relationship("User", backref="accessed_trees")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean
+from sqlalchemy.sql import false, func
 from app.database import Base
 
 class User(Base):
@@ -13,3 +13,23 @@ class User(Base):
     # State management for the menu flow
     current_state = Column(String, nullable=True)
     state_data = Column(JSON, nullable=True, default={})
+    state_updated_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    # Set the first time the user messages the bot; NULL for users only created via share/transfer
+    activated_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Opted in to digests of other collaborators' edits ("notify on")
+    notify_changes = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Already split reply parts that did not fit in the last response, sent on "more"
+    pending_reply = Column(JSON, nullable=True)
+
+class ArchivedUser(Base):
+    __tablename__ = "archived_users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=True)
+    phone = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,154 @@
+import enum
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable, List, Tuple
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from app.models.tree import Tree, TreeAccess
+from app.models.member import Member, Relationship
+from app.models.event import Event
+from app.models.change import TreeChange
+
+# Tree.version is bumped, and a `tree_changes` entry appended, whenever anything
+# the read API serves changes, inside the same transaction as the write. ORM
+# writes are tracked by the flush hook below; Core writes go through
+# `insert_changes` / `record_changes`. Each entry's `seq` is taken from the
+# tree's new version, so feed order is the order in which writes committed.
+
+ENTITIES = {Tree: "tree", Member: "member", Relationship: "relationship", Event: "event", TreeAccess: "access"}
+
+# Edit locks coordinate chat editors; they are not tree data, so taking or
+# releasing one never bumps the version, enters the feed or notifies anyone
+LOCK_COLUMNS = frozenset({"is_locked", "locked_by", "lock_expires_at"})
+
+def bump_tree_versions(tree_ids: Iterable[int]):
+    return (
+        update(Tree.__table__)
+        .where(Tree.__table__.c.id.in_(set(tree_ids)))
+        .values(version=Tree.__table__.c.version + 1)
+    )
+
+def reserve_seqs(tree_id: int, count: int):
+    """
+    Bumps the tree's version by `count` and returns the new value: the last of
+    `count` sequence numbers for its change entries. The row lock this takes is
+    held until commit, so concurrent writers to a tree get ascending numbers in
+    commit order, unlike the table's global id.
+    """
+    trees = Tree.__table__
+    return (
+        update(trees).where(trees.c.id == tree_id)
+        .values(version=trees.c.version + count)
+        .returning(trees.c.version)
+    )
+
+def _number(changes: List[dict], tree_id: int, last_seq: int):
+    mine = [c for c in changes if c["tree_id"] == tree_id]
+    for seq, change in enumerate(mine, last_seq - len(mine) + 1):
+        change["seq"] = seq
+
+def _jsonable(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def row_snapshot_dict(row: dict, row_id: int) -> dict:
+    """Same shape as `row_snapshot` for rows written with Core inserts."""
+    return {"id": row_id, **{key: _jsonable(value) for key, value in row.items() if key not in LOCK_COLUMNS}}
+
+def row_snapshot(obj) -> dict:
+    """Loaded column values of `obj` as JSON-safe data (never triggers a load)."""
+    state = inspect(obj)
+    return {
+        attr.key: _jsonable(state.dict[attr.key])
+        for attr in state.mapper.column_attrs if attr.key in state.dict and attr.key not in LOCK_COLUMNS
+    }
+
+def has_data_changes(obj) -> bool:
+    """Whether a flush would change `obj` in anything but its edit lock."""
+    state = inspect(obj)
+    return any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in state.mapper.column_attrs if attr.key not in LOCK_COLUMNS
+    )
+
+def note_edits(session: Session, changes: List[dict]):
+    """
+    Keeps this transaction's change rows for the collaborator notifier, which
+    picks them up after commit. Only writes made on behalf of a chat user
+    (`session.info["actor_id"]`) are kept.
+    """
+    if session.info.get("actor_id") is not None:
+        session.info.setdefault("tree_edits", []).extend(changes)
+
+async def insert_changes(db, changes: List[dict], notify: bool = True):
+    """Numbers `changes` (`tree_changes` rows without `seq`) per tree and inserts them."""
+    for tree_id, count in Counter(c["tree_id"] for c in changes).items():
+        _number(changes, tree_id, (await db.execute(reserve_seqs(tree_id, count))).scalar_one())
+    await db.execute(insert(TreeChange), changes)
+    if notify:
+        note_edits(db.sync_session, changes)
+
+async def record_changes(db, tree_id: int, changes: List[Tuple[str, str, dict]]):
+    """
+    Version bump and change-feed rows for writes that bypass the flush hook
+    (Core / UPDATE ... RETURNING statements). `changes` are (entity, op, data).
+    """
+    if not changes:
+        return
+    await insert_changes(db, [
+        {"tree_id": tree_id, "entity": entity, "entity_id": data["id"], "op": op, "data": data}
+        for entity, op, data in changes
+    ])
+
+@event.listens_for(Session, "after_flush")
+def _track_changes_on_flush(session, flush_context):
+    changes = []
+    pending_events = []
+    deleted_trees = {obj.id for obj in session.deleted if isinstance(obj, Tree)}
+
+    for op, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            entity = ENTITIES.get(type(obj))
+            if entity is None:
+                continue
+            if op == "update" and not has_data_changes(obj):
+                continue
+            data = {"id": obj.id} if op == "delete" else row_snapshot(obj)
+            change = {"entity": entity, "entity_id": obj.id, "op": op, "data": data}
+            if isinstance(obj, Event):
+                pending_events.append((obj.member_id, change))
+            else:
+                change["tree_id"] = obj.id if isinstance(obj, Tree) else obj.tree_id
+                changes.append(change)
+    if not changes and not pending_events:
+        return
+
+    connection = session.connection()
+    if pending_events:
+        # Members already in the session know their tree; only the others are looked up
+        tree_of_member = {}
+        for member_id, _ in pending_events:
+            member = session.identity_map.get(session.identity_key(Member, member_id))
+            if member is not None and "tree_id" in member.__dict__:
+                tree_of_member[member_id] = member.tree_id
+        unknown = {m for m, _ in pending_events} - tree_of_member.keys()
+        if unknown:
+            members = Member.__table__
+            tree_of_member.update(connection.execute(
+                select(members.c.id, members.c.tree_id).where(members.c.id.in_(unknown))
+            ).all())
+        for member_id, change in pending_events:
+            if member_id in tree_of_member:
+                change["tree_id"] = tree_of_member[member_id]
+                changes.append(change)
+
+    # Nothing to report for trees that are being deleted in this flush
+    changes = [c for c in changes if c["tree_id"] is not None and c["tree_id"] not in deleted_trees]
+    if changes:
+        for tree_id, count in Counter(c["tree_id"] for c in changes).items():
+            _number(changes, tree_id, connection.execute(reserve_seqs(tree_id, count)).scalar_one())
+        connection.execute(insert(TreeChange.__table__), changes)
+        note_edits(session, changes)
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.pool import QueuePool
+from app.config import get_settings
+from app.database import db_breaker, engine
+from app.routers.trees import require_api_key
+from app.services.admission import get_admission_controller
+from app.services.chatbot_service import registry
+from app.services.notifier import get_notifier
+from app.services.state_store import WriteBehindStateStore, get_shared_state_store
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from app.utils.metrics import MetricsWriter, db_query_seconds, path_metrics
+
+settings = get_settings()
+
+router = APIRouter(tags=["metrics"], dependencies=[Depends(require_api_key)])
+
+BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def write_fsm(w: MetricsWriter):
+    w.family("fsm_state_seconds", "histogram", "Handler latency per conversation state")
+    for state, stats in registry.stats.items():
+        w.histogram("fsm_state_seconds", stats.histogram, {"state": state})
+    for name, attr, help in (
+        ("fsm_state_deadline_exceeded_total", "deadline_exceeded", "Handlers cancelled at the request deadline"),
+        ("fsm_state_errors_total", "errors", "Handlers that raised"),
+        ("fsm_state_outages_total", "outages", "Handlers that raised because the database was unreachable"),
+    ):
+        w.family(name, "counter", help)
+        for state, stats in registry.stats.items():
+            w.sample(name, getattr(stats, attr), {"state": state})
+
+
+def write_requests(w: MetricsWriter):
+    w.family("http_request_seconds", "histogram", "Request wall time")
+    for path, metrics in path_metrics.items():
+        w.histogram("http_request_seconds", metrics.seconds, {"path": path})
+    w.family("http_request_db_queries", "histogram", "Statements executed per request")
+    for path, metrics in path_metrics.items():
+        w.histogram("http_request_db_queries", metrics.queries, {"path": path})
+    w.family("http_request_db_seconds", "histogram", "Database time per request")
+    for path, metrics in path_metrics.items():
+        w.histogram("http_request_db_seconds", metrics.db_seconds, {"path": path})
+    w.family("http_responses_total", "counter", "Responses by status")
+    for path, metrics in path_metrics.items():
+        for code, count in sorted(metrics.statuses.items()):
+            w.sample("http_responses_total", count, {"path": path, "status": code})
+
+
+def write_database(w: MetricsWriter):
+    w.family("db_query_seconds", "histogram", "Duration of each statement")
+    w.histogram("db_query_seconds", db_query_seconds)
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        for name, value, help in (
+            ("db_pool_size", pool.size(), "Configured pool size"),
+            ("db_pool_checked_out", pool.checkedout(), "Connections in use"),
+            ("db_pool_checked_in", pool.checkedin(), "Idle connections"),
+            ("db_pool_overflow", pool.overflow(), "Connections beyond the pool size (negative: not yet opened)"),
+        ):
+            w.family(name, "gauge", help)
+            w.sample(name, value)
+
+    breaker = db_breaker.snapshot()
+    w.family("db_breaker_state", "gauge", "Database circuit breaker: 0 closed, 1 half-open, 2 open")
+    w.sample("db_breaker_state", BREAKER_STATES[breaker["state"]])
+    for key in ("failures", "opened", "rejected", "trials"):
+        w.family(f"db_breaker_{key}_total", "counter", f"Database circuit breaker {key}")
+        w.sample(f"db_breaker_{key}_total", breaker[key])
+
+
+def write_snapshot(w: MetricsWriter, prefix: str, snapshot: dict, counters: set):
+    """One metric per numeric snapshot field; `counters` names the monotonic ones."""
+    for key, value in snapshot.items():
+        name = f"{prefix}_{key}"
+        if key in counters and not key.endswith("_total"):
+            name += "_total"
+        w.family(name, "counter" if key in counters else "gauge", f"{prefix} {key.replace('_', ' ')}")
+        w.sample(name, value)
+
+
+def write_services(w: MetricsWriter):
+    if settings.ADMISSION_ENABLED:
+        write_snapshot(w, "admission", get_admission_controller().snapshot(), {
+            "admitted", "shed_phone", "shed_overload", "queued", "queue_wait_seconds_total",
+        })
+
+    notifier = get_notifier()
+    if notifier is not None:
+        write_snapshot(w, "notifier", notifier.snapshot(), set(notifier.stats.__dict__))
+
+    store = get_shared_state_store()
+    if isinstance(store, WriteBehindStateStore):
+        w.family("state_store_cache_requests_total", "counter", "Conversation state reads served from memory (hit) or the user row (miss)")
+        w.sample("state_store_cache_requests_total", store.hits, {"result": "hit"})
+        w.sample("state_store_cache_requests_total", store.misses, {"result": "miss"})
+        w.family("state_store_flushes_total", "counter", "Batched state writes")
+        w.sample("state_store_flushes_total", store.flush_count)
+
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint. Everything is read from in-process counters; no DB access."""
+    w = MetricsWriter()
+    write_fsm(w)
+    write_requests(w)
+    write_database(w)
+    write_services(w)
+    return Response(content=w.render(), media_type=MetricsWriter.CONTENT_TYPE)
@@ -0,0 +1,146 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.config import get_settings
+from app.database import get_db
+from app.schemas.member import MemberDetailResponse, MemberPage, MemberResponse, RelationshipPage, RelationshipResponse
+from app.schemas.tree import TreeSummaryResponse
+from app.schemas.change import ChangeFeedResponse, TreeChangeResponse
+from app.services.export_service import ExportService, EXPORT_FORMATS
+from app.services.member_service import MemberService
+from app.services.tree_service import TreeService
+
+settings = get_settings()
+
+async def require_api_key(x_api_key: Optional[str] = Header(None)):
+    """Tree data is only served with the shared `API_KEY`. Without one configured it is open outside production."""
+    if not settings.API_KEY:
+        if settings.ENVIRONMENT == "production":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API access is not configured")
+        return
+    if not x_api_key or not hmac.compare_digest(x_api_key, settings.API_KEY):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
+
+router = APIRouter(prefix="/trees", tags=["trees"], dependencies=[Depends(require_api_key)])
+
+PAGE_LIMIT = Query(50, ge=1, le=200)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison (RFC 9110): W/"x" matches "x"
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+async def check_tree_version(
+    tree_id: int, request: Request, response: Response, db: AsyncSession, variant: str = ""
+) -> Optional[Response]:
+    """
+    Reads only `trees.version`. Returns a 304 response when the client's ETag
+    is current, otherwise sets the ETag on `response` and returns None.
+    Raises 404 for an unknown tree. `variant` names the page or item served,
+    so one page's ETag never validates another page of the same tree.
+    """
+    version = await TreeService(db).get_tree_version(tree_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
+    etag = f'W/"{tree_id}-{version}-{variant}"' if variant else f'W/"{tree_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+@router.get("/{tree_id}", response_model=TreeSummaryResponse)
+async def get_tree(tree_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    if not_modified := await check_tree_version(tree_id, request, response, db):
+        return not_modified
+    summary = await TreeService(db).get_tree_summary(tree_id)
+    if not summary:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
+    tree, member_count, relationship_count = summary
+    return TreeSummaryResponse(
+        id=tree.id, owner_id=tree.owner_id, created_at=tree.created_at, generation_limit=tree.generation_limit,
+        version=tree.version, member_count=member_count, relationship_count=relationship_count,
+    )
+
+@router.get("/{tree_id}/members", response_model=MemberPage)
+async def list_members(
+    tree_id: int, request: Request, response: Response,
+    after: Optional[int] = None, limit: int = PAGE_LIMIT,
+    db: AsyncSession = Depends(get_db)
+):
+    if not_modified := await check_tree_version(tree_id, request, response, db, f"m{after or 0}-{limit}"):
+        return not_modified
+    members, next_cursor = await MemberService(db).get_members_page(tree_id, after, limit)
+    return MemberPage(items=[MemberResponse.model_validate(m) for m in members], next_cursor=next_cursor)
+
+@router.get("/{tree_id}/members/{member_id}", response_model=MemberDetailResponse)
+async def get_member(
+    tree_id: int, member_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    if not_modified := await check_tree_version(tree_id, request, response, db, f"member{member_id}"):
+        return not_modified
+    member = await MemberService(db).get_member_with_events(tree_id, member_id)
+    if not member:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
+    detail = MemberDetailResponse.model_validate(member)
+    detail.events.sort(key=lambda e: e.event_date)
+    return detail
+
+@router.get("/{tree_id}/relationships", response_model=RelationshipPage)
+async def list_relationships(
+    tree_id: int, request: Request, response: Response,
+    after: Optional[int] = None, limit: int = PAGE_LIMIT,
+    db: AsyncSession = Depends(get_db)
+):
+    if not_modified := await check_tree_version(tree_id, request, response, db, f"r{after or 0}-{limit}"):
+        return not_modified
+    relationships, next_cursor = await MemberService(db).get_relationships_page(tree_id, after, limit)
+    return RelationshipPage(
+        items=[RelationshipResponse.model_validate(r) for r in relationships], next_cursor=next_cursor
+    )
+
+@router.get("/{tree_id}/changes", response_model=ChangeFeedResponse)
+async def list_changes(
+    tree_id: int, request: Request, response: Response,
+    since: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    if not_modified := await check_tree_version(tree_id, request, response, db, f"c{since}-{limit}"):
+        return not_modified
+    tree_service = TreeService(db)
+    changes, has_more, floor = await tree_service.get_changes(tree_id, since, limit)
+    if since < floor:
+        # The newest entry may itself have been compacted away, hence the floor
+        next_since = max(floor, await tree_service.get_latest_change_seq(tree_id))
+        return ChangeFeedResponse(tree_id=tree_id, changes=[], next_since=next_since, reset=True)
+    return ChangeFeedResponse(
+        tree_id=tree_id,
+        changes=[
+            TreeChangeResponse(
+                seq=c.seq, entity=c.entity, entity_id=c.entity_id, op=c.op, data=c.data, created_at=c.created_at
+            )
+            for c in changes
+        ],
+        next_since=changes[-1].seq if changes else since,
+        has_more=has_more,
+        reset=any(c.op == "reset" for c in changes),
+    )
+
+@router.get("/{tree_id}/export")
+async def export_tree(
+    tree_id: int,
+    format: str = Query("gedcom", pattern="^(gedcom|ndjson|csv)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    if await TreeService(db).get_tree_version(tree_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tree not found")
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        ExportService(db, batch_size=settings.EXPORT_BATCH_SIZE).stream(tree_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tree-{tree_id}.{extension}"'},
+    )
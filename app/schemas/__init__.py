@@ -1,3 +1,8 @@
 from .user import UserCreate, UserUpdate, UserResponse
-from .member import MemberCreate, MemberUpdate, MemberResponse
-from .tree import TreeCreate, TreeResponse
+from .event import EventResponse
+from .member import (
+    MemberCreate, MemberUpdate, MemberResponse, MemberDetailResponse, MemberPage,
+    RelationshipResponse, RelationshipPage,
+)
+from .tree import TreeCreate, TreeResponse, TreeSummaryResponse
+from .change import TreeChangeResponse, ChangeFeedResponse
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class TreeChangeResponse(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    op: str
+    data: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+class ChangeFeedResponse(BaseModel):
+    tree_id: int
+    changes: List[TreeChangeResponse]
+    next_since: int
+    has_more: bool = False
+    # True when the client is too far behind (or saw a `reset` entry): refetch the tree, then poll from next_since
+    reset: bool = False
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import Optional
+
+class EventResponse(BaseModel):
+    id: int
+    member_id: int
+    event_type: str
+    event_date: date
+    description: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 from app.models.member import Gender
+from app.schemas.event import EventResponse
 
 class MemberBase(BaseModel):
     name: str
@@ -9,9 +10,6 @@ class MemberBase(BaseModel):
     gender: Gender
     phone: Optional[str] = None
     generation_level: int
-    is_locked: bool = False
-    locked_by: Optional[int] = None
-    lock_expires_at: Optional[datetime] = None
 
 class MemberCreate(MemberBase):
     tree_id: int
@@ -21,9 +19,6 @@ class MemberUpdate(BaseModel):
     dob: Optional[date] = None
     gender: Optional[Gender] = None
     phone: Optional[str] = None
-    is_locked: Optional[bool] = None
-    locked_by: Optional[int] = None
-    lock_expires_at: Optional[datetime] = None
 
 class MemberResponse(MemberBase):
     id: int
@@ -32,3 +27,23 @@ class MemberResponse(MemberBase):
     updated_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+class MemberDetailResponse(MemberResponse):
+    events: List[EventResponse] = []
+
+class MemberPage(BaseModel):
+    items: List[MemberResponse]
+    next_cursor: Optional[int] = None  # pass as `after` to get the next page
+
+class RelationshipResponse(BaseModel):
+    id: int
+    tree_id: int
+    parent_id: int
+    child_id: int
+    relation_type: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+class RelationshipPage(BaseModel):
+    items: List[RelationshipResponse]
+    next_cursor: Optional[int] = None
@@ -17,3 +17,11 @@ class TreeResponse(TreeBase):
     members: List[MemberResponse] = []
     
     model_config = ConfigDict(from_attributes=True)
+
+class TreeSummaryResponse(TreeBase):
+    id: int
+    owner_id: Optional[int] = None
+    created_at: datetime
+    version: int
+    member_count: int
+    relationship_count: int
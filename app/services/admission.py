@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.config import get_settings
+from app.utils.deadline import remaining
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Why a request was turned away
+SHED_PHONE = "phone"
+SHED_OVERLOAD = "overload"
+
+
+class PhoneLimiter(ABC):
+    """Per-phone rate limit consulted before a webhook request is admitted."""
+
+    @abstractmethod
+    async def allow(self, phone: str) -> bool:
+        ...
+
+    async def close(self):
+        pass
+
+
+class InMemoryPhoneLimiter(PhoneLimiter):
+    """
+    One `TokenBucket` per phone, in this process. The least recently seen
+    phones are evicted past `max_phones`; a phone that comes back starts
+    with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_phones: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_phones = max_phones
+        self.clock = clock
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    async def allow(self, phone: str) -> bool:
+        bucket = self.buckets.get(phone)
+        if bucket is None:
+            bucket = self.buckets[phone] = TokenBucket(self.rate, self.burst, clock=self.clock)
+            if len(self.buckets) > self.max_phones:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(phone)
+        return bucket.try_acquire()
+
+
+class SharedPhoneLimiter(PhoneLimiter):
+    """
+    Fixed-window counter per phone in a store shared by all workers. `client`
+    needs Redis's `incr(key)` and `expire(key, seconds)`, which
+    `redis.asyncio.Redis` provides. It allows about `rate * window` messages
+    per window. If the store is unreachable it admits (fails open), since the
+    global concurrency cap still protects the database.
+    """
+
+    def __init__(self, client, rate: float, burst: float, window_seconds: int = 10, prefix: str = "admission:"):
+        self.client = client
+        self.limit = max(burst, rate * window_seconds)
+        self.window_seconds = window_seconds
+        self.prefix = prefix
+
+    async def allow(self, phone: str) -> bool:
+        key = f"{self.prefix}{phone}:{int(time.time()) // self.window_seconds}"
+        try:
+            count = await self.client.incr(key)
+            if count == 1:
+                await self.client.expire(key, self.window_seconds * 2)
+        except Exception as e:
+            logger.warning(f"Shared admission store unavailable, admitting: {e}")
+            return True
+        return count <= self.limit
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close:
+            await close()
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    shed_phone: int = 0
+    shed_overload: int = 0
+    queued: int = 0  # admitted after waiting for a slot
+    queue_wait_seconds_total: float = 0.0
+    queue_wait_seconds_max: float = 0.0
+
+
+class AdmissionController:
+    """
+    Decides whether a webhook request may run. First the phone's limiter is
+    checked, then one of `max_concurrency` slots is taken. `max_concurrency`
+    is sized to the DB pool, so admitted requests never queue inside
+    SQLAlchemy. A request waits at most `queue_timeout` seconds for a slot
+    (never past the request's deadline), and only `max_queue` may wait at once;
+    anything beyond that is shed at once rather than piling onto a saturated
+    pool.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[PhoneLimiter],
+        max_concurrency: int,
+        max_queue: int = 100,
+        queue_timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limiter = limiter
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = AdmissionStats()
+
+    async def acquire(self, phone: Optional[str]) -> Optional[str]:
+        """Takes a slot and returns None, or returns why the request is shed. Pair with `release`."""
+        if phone and self.limiter is not None and not await self.limiter.allow(phone):
+            self.stats.shed_phone += 1
+            return SHED_PHONE
+
+        if self.slots.locked():
+            if self.waiting >= self.max_queue:
+                self.stats.shed_overload += 1
+                return SHED_OVERLOAD
+            started = self.clock()
+            timeout = self.queue_timeout
+            left = remaining()
+            if left is not None:
+                timeout = max(0.0, min(timeout, left))  # no point waiting past the request's deadline
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.stats.shed_overload += 1
+                return SHED_OVERLOAD
+            finally:
+                self.waiting -= 1
+            waited = self.clock() - started
+            self.stats.queued += 1
+            self.stats.queue_wait_seconds_total += waited
+            self.stats.queue_wait_seconds_max = max(self.stats.queue_wait_seconds_max, waited)
+        else:
+            await self.slots.acquire()
+
+        self.in_flight += 1
+        self.stats.admitted += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+        self.slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats.__dict__,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    async def close(self):
+        if self.limiter is not None:
+            await self.limiter.close()
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """The process-wide controller, with the limiter selected by `ADMISSION_BACKEND` (memory or shared)."""
+    global _controller
+    if _controller is None:
+        settings = get_settings()
+        backend = settings.ADMISSION_BACKEND
+        if backend == "memory":
+            limiter = InMemoryPhoneLimiter(settings.ADMISSION_PHONE_RATE, settings.ADMISSION_PHONE_BURST)
+        elif backend == "shared":
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise ValueError("ADMISSION_BACKEND=shared needs the redis package")
+            limiter = SharedPhoneLimiter(
+                redis.from_url(settings.ADMISSION_REDIS_URL),
+                settings.ADMISSION_PHONE_RATE, settings.ADMISSION_PHONE_BURST,
+            )
+        else:
+            raise ValueError(f"Unknown ADMISSION_BACKEND: {backend}")
+        _controller = AdmissionController(
+            limiter,
+            settings.ADMISSION_MAX_CONCURRENCY,
+            settings.ADMISSION_MAX_QUEUE,
+            settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        )
+    return _controller
+
+
+async def close_admission_controller():
+    global _controller
+    if _controller is not None:
+        await _controller.close()
+        _controller = None
@@ -1,589 +1,824 @@
+import asyncio
 import logging
+import re
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import get_settings
+from app.database import AsyncSessionLocal, is_outage, record_pool_timeout
 from app.services.user_service import UserService
-from app.services.tree_service import TreeService
-from app.services.member_service import MemberService
+from app.services.tree_service import TreeService, delete_tree_in_background
+from app.services.member_service import MemberService, describe_occasion
+from app.services.state_store import ConversationStateStore, get_state_store
+from app.services.fsm import StateRegistry, StateContext, PrefetchSpec
 from app.models.user import User
 from app.models.tree import Role
-from app.models.member import Gender
+from app.models.member import Gender, RELATIONS, RELATION_CHOICES
 from app.models.event import Event
-from twilio.twiml.messaging_response import MessagingResponse
-from app.utils.validators import validate_dob, validate_gender
+from app.utils.deadline import remaining
+from app.utils.twiml import ChunkedResponse, StaticReply, response_xml
+from app.utils.validators import validate_dob, validate_gender, validate_phone
+from app.utils.commands import parse_command, AddMemberCommand, BulkImportCommand, ADD_USAGE, EVENT_USAGE
 from datetime import date
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+registry = StateRegistry()
+
+# Keeps fire-and-forget tasks (background tree deletes) referenced until they finish
+_background_tasks = set()
+
+# Fixed replies, serialized to TwiML once (see app/utils/twiml.py)
+MAIN_MENU = StaticReply(
+    "🌳 *Family Tree Bot* 🌳\n\n"
+    "1. 👁 View Tree\n"
+    "2. ➕ Add Member\n"
+    "3. ✏️ Edit Member\n"
+    "4. 📤 Share Tree\n"
+    "5. 🔄 Transfer Ownership\n"
+    "6. 🗑 Delete Tree\n"
+    "7. ℹ️ Help\n"
+    "8. 📅 Manage Events\n"
+    "9. 🎂 Upcoming Dates"
+)
+HELP = StaticReply(
+    "Send 'reset' anytime to return to the main menu.\n\n"
+    "*Shortcuts*\n"
+    f"{ADD_USAGE}\n"
+    f"{EVENT_USAGE}\n"
+    "Send 'bulk' followed by one member per line to add many at once.\n"
+    "Send 'notify on' to hear when others edit the tree ('notify off' to stop)."
+)
+ERROR_REPLY = StaticReply("An error occurred. Please try again or type 'reset'.")
+TOO_SLOW = StaticReply("⏳ That took too long. Please try again in a moment.")
+DB_UNAVAILABLE = StaticReply("⚠️ The family tree is temporarily unavailable. Please try again shortly.")
+VIEWER_CANNOT_ADD = StaticReply("🔒 You are a Viewer. You cannot add members.")
+NO_TREE = StaticReply("No tree found.")
+ASK_NAME = StaticReply("Enter the name of the new member:")
+INVALID_OPTION = StaticReply("Invalid option. Send 'menu' to see options.")
+ASK_DOB = StaticReply("Enter Date of Birth (DD-MM-YYYY):")
+ASK_GENDER = StaticReply("Enter Gender (Male/Female/Other):")
+ASK_PHONE = StaticReply("Enter Phone Number (optional, send 'skip' to skip):")
+# Served while the database is unreachable, without touching it
+DEGRADED_TWIML = response_xml([DB_UNAVAILABLE.fragment, MAIN_MENU.fragment])
+
+RELATION_TYPE_PROMPT = "1. Mother\n2. Father\n3. Child\n4. Spouse\n5. Brother\n6. Sister"
 
 class ChatbotService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, state_store: Optional[ConversationStateStore] = None):
         self.db = db
         self.user_service = UserService(db)
         self.tree_service = TreeService(db)
         self.member_service = MemberService(db)
+        self.state_store = state_store or get_state_store(db)
 
     async def handle_message(self, from_number: str, body: str) -> str:
         # Normalize phone number
         if not from_number.startswith("whatsapp:"):
             from_number = f"whatsapp:{from_number}"
-        
+
         db_phone = from_number.replace("whatsapp:", "") # Store without prefix? Or with?
         # Let's store consistent with incoming, but user service might strip it.
         # User service create_user stores as is for now.
-        
-        user = await self.user_service.get_or_create_user(db_phone)
-        response = MessagingResponse()
-        
-        state = user.current_state
-        data = (user.state_data or {}).copy()
-        
-        if body.lower() == "reset":
-             await self.user_service.clear_state(user.id)
-             await self.show_main_menu(response)
-             await self.user_service.update_state(user.id, "MAIN_MENU")
-             return str(response)
 
-        try:
-            if not state or state == "MAIN_MENU":
-                await self.handle_main_menu(user, body, response)
-            
-            # --- ADD MEMBER FLOW ---
-            elif state == "ADD_MEMBER_NAME":
-                await self.user_service.update_state(user.id, "ADD_MEMBER_DOB", {"name": body})
-                response.message("Enter Date of Birth (DD-MM-YYYY):")
-            
-            elif state == "ADD_MEMBER_DOB":
-                try:
-                    dob = validate_dob(body)
-                    data['dob'] = dob.isoformat()
-                    await self.user_service.update_state(user.id, "ADD_MEMBER_GENDER", data)
-                    response.message("Enter Gender (Male/Female/Other):")
-                except ValueError as e:
-                    response.message(str(e))
-
-            elif state == "ADD_MEMBER_GENDER":
-                try:
-                    gender = validate_gender(body)
-                    data['gender'] = gender.value
-                    await self.user_service.update_state(user.id, "ADD_MEMBER_PHONE", data)
-                    response.message("Enter Phone Number (optional, send 'skip' to skip):")
-                except ValueError as e:
-                    response.message(str(e))
-
-            elif state == "ADD_MEMBER_PHONE":
-                phone = body.strip()
-                if phone.lower() != 'skip':
-                    data['phone'] = phone # Validate?
-                await self.user_service.update_state(user.id, "ADD_MEMBER_RELATION", data)
-                # Fetch existing members to show options
-                tree, role = await self.tree_service.get_active_tree(user.id)
-                members = await self.member_service.get_members_by_tree(tree.id) if tree else []
-                
-                if not tree or not members:
-                     # First member (Root)
-                     await self.finalize_add_member(user, data, response, is_root=True)
-                else:
-                    msg = "Who is this member related to? Enter the ID of the relative:\n"
-                    for m in members:
-                        msg += f"{m.id}. {m.name} ({m.generation_level})\n"
-                    response.message(msg)
+        user = await self.user_service.get_or_create_user(db_phone, active=True)
+        # Edits committed on this session are attributed to the user (see notifier.py)
+        self.db.info["actor_id"] = user.id
+        response = ChunkedResponse(settings.REPLY_MAX_CHARS, settings.REPLY_MAX_BYTES, settings.REPLY_MAX_PARTS)
 
-            elif state == "ADD_MEMBER_RELATION":
-                if 'parent_id' not in data:
-                    try:
-                        relative_id = int(body)
-                        data['relative_id'] = relative_id
-                        await self.user_service.update_state(user.id, "ADD_MEMBER_RELATION_TYPE", data)
-                        response.message("What is the relationship of the NEW member to the relative?\n1. Mother\n2. Father\n3. Child\n4. Spouse\n5. Brother\n6. Sister")
-                    except ValueError:
-                        response.message("Invalid ID. Please enter a number.")
-                
-            elif state == "ADD_MEMBER_RELATION_TYPE":
-                try:
-                    choice = int(body.strip())
-                    relative_id = data['relative_id']
-                    relative = await self.member_service.get_member(relative_id)
-                    
-                    if not relative:
-                         response.message("Relative not found. Aborting.")
-                         await self.user_service.clear_state(user.id)
-                         return str(response)
-
-                    if choice == 1: # Mother
-                        new_gen = relative.generation_level - 1
-                        relationship_type = "parent"
-                        data['gender'] = Gender.FEMALE.value
-                    elif choice == 2: # Father
-                        new_gen = relative.generation_level - 1
-                        relationship_type = "parent"
-                        data['gender'] = Gender.MALE.value
-                    elif choice == 3: # Child
-                        new_gen = relative.generation_level + 1
-                        relationship_type = "child"
-                    elif choice == 4: # Spouse
-                        new_gen = relative.generation_level
-                        relationship_type = "spouse"
-                    elif choice == 5: # Brother
-                        new_gen = relative.generation_level
-                        relationship_type = "sibling"
-                        data['gender'] = Gender.MALE.value
-                    elif choice == 6: # Sister
-                        new_gen = relative.generation_level
-                        relationship_type = "sibling"
-                        data['gender'] = Gender.FEMALE.value
-                    else:
-                        response.message("Invalid choice. Enter 1-6.")
-                        return str(response)
-
-                    data['generation'] = new_gen
-                    data['relationship_type'] = relationship_type
-                    
-                    await self.finalize_add_member(user, data, response)
-                except ValueError:
-                     response.message("Invalid input. Please enter a number.")
-
-            # --- EDIT MEMBER FLOW ---
-            elif state == "EDIT_SELECT_MEMBER":
-                 try:
-                     member_id = int(body.strip())
-                     # Check if member exists in user's tree
-                     tree, role = await self.tree_service.get_active_tree(user.id)
-                     if not tree:
-                          response.message("Tree not found.")
-                          return str(response)
-                     
-                     member = await self.member_service.get_member(member_id)
-                     if not member or member.tree_id != tree.id:
-                          response.message("Member not found in your tree.")
-                          return str(response)
-                     
-                     if role not in [Role.OWNER, Role.EDITOR]:
-                          response.message("Permission denied. Viewers cannot edit.")
-                          await self.user_service.clear_state(user.id)
-                          return str(response)
-                     
-                     # Check locking
-                     if await self.tree_service.is_member_locked(member_id):
-                          if member.locked_by != user.id:
-                               response.message(f"Member is currently being edited by another user. Try again later.")
-                               await self.user_service.clear_state(user.id)
-                               return str(response)
-
-                     # Lock member
-                     await self.member_service.lock_member(member_id, user.id)
-                     data['member_id'] = member_id
-                     await self.user_service.update_state(user.id, "EDIT_SELECT_FIELD", data)
-                     response.message(f"Editing {member.name}. What do you want to change?\n1. Name\n2. DOB\n3. Gender\n4. Phone\n5. Relation")
-                 except ValueError:
-                      response.message("Invalid ID.")
-
-            elif state == "EDIT_SELECT_FIELD":
-                 choice = body.strip()
-                 data['edit_field'] = choice
-                 
-                 if choice == '5':
-                      # Editing relation
-                      tree, role = await self.tree_service.get_active_tree(user.id)
-                      members = await self.member_service.get_members_by_tree(tree.id) if tree else []
-                      msg = "Select the relative to link to:\n"
-                      for m in members:
-                           if m.id != data['member_id']:
-                               msg += f"{m.id}. {m.name}\n"
-                      await self.user_service.update_state(user.id, "EDIT_RELATION_TARGET", data)
-                      response.message(msg)
-                 else:
-                      await self.user_service.update_state(user.id, "EDIT_ENTER_VALUE", data)
-                      if choice == '1': response.message("Enter new Name:")
-                      elif choice == '2': response.message("Enter new DOB (DD-MM-YYYY):")
-                      elif choice == '3': response.message("Enter new Gender (Male/Female/Other):")
-                      elif choice == '4': response.message("Enter new Phone:")
-                      else:
-                           response.message("Invalid choice.")
-            
-            elif state == "EDIT_RELATION_TARGET":
-                 try:
-                     target_id = int(body.strip())
-                     data['edit_relation_target'] = target_id
-                     await self.user_service.update_state(user.id, "EDIT_RELATION_TYPE", data)
-                     response.message("What is the relationship of the edited member to this relative?\n1. Mother\n2. Father\n3. Child\n4. Spouse\n5. Brother\n6. Sister")
-                 except ValueError:
-                     response.message("Invalid ID. Enter a number.")
-
-            elif state == "EDIT_RELATION_TYPE":
-                 try:
-                     choice = int(body.strip())
-                     member_id = data['member_id']
-                     target_id = data['edit_relation_target']
-                     
-                     target = await self.member_service.get_member(target_id)
-                     if not target:
-                          response.message("Relative not found.")
-                          return str(response)
-
-                     # Delete old relationships where this member is a child (assuming single parent linkage usually, or just drop all and reset)
-                     # For simplicity, we just add the new relationship
-                     rel_type = ""
-                     updates = {}
-                     if choice == 1:
-                         rel_type = "parent"
-                         updates['gender'] = Gender.FEMALE
-                     elif choice == 2:
-                         rel_type = "parent"
-                         updates['gender'] = Gender.MALE
-                     elif choice == 3:
-                         rel_type = "child"
-                     elif choice == 4:
-                         rel_type = "spouse"
-                     elif choice == 5:
-                         rel_type = "sibling"
-                         updates['gender'] = Gender.MALE
-                     elif choice == 6:
-                         rel_type = "sibling"
-                         updates['gender'] = Gender.FEMALE
-                     
-                     if updates:
-                          await self.member_service.update_member(member_id, **updates)
-                     
-                     if rel_type == "child":
-                          await self.member_service.add_relationship(target.tree_id, target_id, member_id, "parent")
-                     elif rel_type == "parent":
-                          await self.member_service.add_relationship(target.tree_id, member_id, target_id, "parent")
-                     elif rel_type in ["spouse", "sibling"]:
-                          await self.member_service.add_relationship(target.tree_id, target_id, member_id, rel_type)
-
-                     await self.member_service.unlock_member(member_id, user.id)
-                     response.message("✅ Relationship updated successfully!")
-                     await self.user_service.clear_state(user.id)
-                     await self.show_main_menu(response)
-                 except ValueError:
-                     response.message("Invalid choice. Enter 1-6.")
-            
-            elif state == "EDIT_ENTER_VALUE":
-                 member_id = data['member_id']
-                 field_choice = data['edit_field']
-                 new_value = body.strip()
-                 
-                 updates = {}
-                 try:
-                     if field_choice == '1':
-                          updates['name'] = new_value
-                     elif field_choice == '2':
-                          updates['dob'] = validate_dob(new_value)
-                     elif field_choice == '3':
-                          updates['gender'] = validate_gender(new_value)
-                     elif field_choice == '4':
-                          # Phone validation
-                          updates['phone'] = new_value
-                     
-                     await self.member_service.update_member(member_id, **updates)
-                     await self.member_service.unlock_member(member_id, user.id)
-                     response.message("✅ Member updated successfully!")
-                     await self.user_service.clear_state(user.id)
-                     await self.show_main_menu(response)
-                 except ValueError as e:
-                      response.message(str(e))
-
-            # --- SHARE TREE FLOW ---
-            elif state == "SHARE_ENTER_PHONE":
-                 phone = body.strip()
-                 if not phone.startswith('+'): phone = '+' + phone 
-                 
-                 target_user = await self.user_service.get_or_create_user(phone)
-                 tree, role = await self.tree_service.get_active_tree(user.id)
-                 
-                 if tree and role == Role.OWNER:
-                     await self.tree_service.grant_access(tree.id, target_user.id, Role.VIEWER)
-                     response.message(f"✅ Access granted to {phone} as Viewer.")
-                 else:
-                     response.message("You do not have permission to share this tree.")
-                 
-                 await self.user_service.clear_state(user.id)
-                 await self.show_main_menu(response)
+        # Read before dispatch: handlers commit, which expires the loaded user
+        user_id, pending = user.id, user.pending_reply
 
-            # --- TRANSFER OWNERSHIP FLOW ---
-            elif state == "TRANSFER_ENTER_PHONE":
-                 phone = body.strip()
-                 if not phone.startswith('+'): phone = '+' + phone
-                 
-                 target_user = await self.user_service.get_or_create_user(phone)
-                 tree, role = await self.tree_service.get_active_tree(user.id)
-                 
-                 if tree and role == Role.OWNER:
-                     if target_user.id == user.id:
-                          response.message("You already own this tree.")
-                     else:
-                          await self.tree_service.transfer_ownership(tree, target_user)
-                          response.message(f"✅ Ownership transferred to {phone}. You are now an Editor.")
-                 else:
-                     response.message("You do not have permission to transfer ownership.")
-                 
-                 await self.user_service.clear_state(user.id)
-                 await self.show_main_menu(response)
-
-            # --- DELETE TREE FLOW ---
-            elif state == "DELETE_CONFIRM":
-                 if body.lower() == "yes":
-                     tree, role = await self.tree_service.get_active_tree(user.id)
-                     if tree and role == Role.OWNER:
-                         await self.tree_service.delete_tree(tree)
-                         response.message("✅ Tree deleted successfully.")
-                     else:
-                         response.message("Permission denied or tree not found.")
-                 else:
-                     response.message("Deletion cancelled.")
-                 
-                 await self.user_service.clear_state(user.id)
-                 await self.show_main_menu(response)
-
-
-            # --- EVENT FLOW ---
-            elif state == "EVENT_SELECT_MEMBER":
-                 try:
-                     member_id = int(body.strip())
-                     tree, role = await self.tree_service.get_active_tree(user.id)
-                     if not tree:
-                          response.message("Tree not found.")
-                          return str(response)
-                     
-                     member = await self.member_service.get_member(member_id)
-                     if not member or member.tree_id != tree.id:
-                          response.message("Member not found in your tree.")
-                          return str(response)
-
-                     # Store selected member
-                     data['member_id'] = member_id
-                     await self.user_service.update_state(user.id, "EVENT_ACTION", data)
-                     response.message(f"Selected {member.name}. What would you like to do?\n1. Add Special Date\n2. View Special Dates")
-                 except ValueError:
-                      response.message("Invalid ID. Please enter a number.")
-
-            elif state == "EVENT_ACTION":
-                 choice = body.strip()
-                 if choice == "1":
-                      # Add Event
-                      tree, role = await self.tree_service.get_active_tree(user.id)
-                      if role not in [Role.OWNER, Role.EDITOR]:
-                           response.message("🔒 Only Owners and Editors can add events.")
-                           await self.user_service.clear_state(user.id)
-                           await self.show_main_menu(response)
-                           return str(response)
-
-                      await self.user_service.update_state(user.id, "EVENT_TYPE", data)
-                      response.message("Enter the Event Type (e.g. Birthday, Anniversary, Death Anniversary):")
-                 elif choice == "2":
-                      # View Events
-                      member_id = data['member_id']
-                      events = await self.member_service.get_events(member_id)
-                      if not events:
-                           response.message("No special dates found for this member.")
-                      else:
-                           msg = "*Special Dates:*\n"
-                           for e in events:
-                                msg += f"📅 {e.event_date.strftime('%d-%m-%Y')}: {e.event_type}\n"
-                           response.message(msg)
-                      
-                      await self.user_service.clear_state(user.id)
-                      await self.show_main_menu(response)
-                 else:
-                      response.message("Invalid choice. Enter 1 or 2.")
-            
-            elif state == "EVENT_TYPE":
-                 data['event_type'] = body.strip()
-                 await self.user_service.update_state(user.id, "EVENT_DATE", data)
-                 response.message("Enter the Date (DD-MM-YYYY):")
-
-            elif state == "EVENT_DATE":
-                 try:
-                      event_date = validate_dob(body) # Reuse DOB validator for date format
-                      member_id = data['member_id']
-                      event_type = data['event_type']
-                      
-                      await self.member_service.add_event(member_id, event_type, event_date)
-                      response.message(f"✅ Added {event_type} on {event_date.strftime('%d-%m-%Y')}!")
-                      await self.user_service.clear_state(user.id)
-                      await self.show_main_menu(response)
-                 except ValueError as e:
-                      response.message(str(e))
+        if body.strip().lower() == "more" and pending:
+            # Parts were split when the long reply was built; send them as they are
+            twiml, rest = response.render(pending)
+            await self.user_service.set_pending_reply(user_id, rest)
+            return twiml
+
+        await self._dispatch(user, body, response)
+        twiml, rest = response.render()
+        if rest or pending:
+            await self.user_service.set_pending_reply(user_id, rest)
+        return twiml
+
+    async def _dispatch(self, user: User, body: str, response: ChunkedResponse):
+        state, data = await self.state_store.get(user)
+        data = data.copy()
+
+        if body.lower() == "reset":
+             await self.state_store.clear(user.id)
+             await self.show_main_menu(response)
+             await self.state_store.set(user.id, "MAIN_MENU")
+             return
+
+        handler = registry.get(state or "MAIN_MENU")
+        if handler is None:
+            logger.warning(f"Unknown state {state!r} for user {user.id}, falling back to main menu")
+            handler = registry.get("MAIN_MENU")
 
+        user_id = user.id
+        ctx = StateContext(user=user, body=body, data=data, response=response)
+        try:
+            # Cancelled once the request's deadline passes (None: no deadline)
+            async with asyncio.timeout(remaining()):
+                if (state or "MAIN_MENU") == "MAIN_MENU" and await self.handle_command(ctx):
+                    return
+
+                with registry.timer(handler.state):
+                    await self._prefetch(handler.prefetch, ctx)
+                    await handler.func(self, ctx)
+        except TimeoutError:
+            registry.stats[handler.state].deadline_exceeded += 1
+            logger.warning(f"Deadline exceeded in state {handler.state} for user {user_id}")
+            await self._abandon_transaction()
+            response.message(TOO_SLOW)
         except Exception as e:
             import traceback
             traceback.print_exc()
             logger.error(f"Error handling message: {e}")
-            response.message("An error occurred. Please try again or type 'reset'.")
-
-        return str(response)
-
-
-    async def show_main_menu(self, response: MessagingResponse):
-        msg = response.message()
-        msg.body(
-            "🌳 *Family Tree Bot* 🌳\n\n"
-            "1. 👁 View Tree\n"
-            "2. ➕ Add Member\n"
-            "3. ✏️ Edit Member\n"
-            "4. 📤 Share Tree\n"
-            "5. 🔄 Transfer Ownership\n"
-            "6. 🗑 Delete Tree\n"
-            "7. ℹ️ Help\n"
-            "8. 📅 Manage Events"
-        )
-
-    async def handle_main_menu(self, user: User, body: str, response: MessagingResponse):
+            outage = is_outage(e)
+            record_pool_timeout(e)
+            stats = registry.stats[handler.state]
+            stats.errors += 1
+            stats.outages += outage
+            response.message(DB_UNAVAILABLE if outage else ERROR_REPLY)
+
+    async def _abandon_transaction(self):
+        """Rolls back what a cancelled handler left open; a connection cut mid-statement is discarded."""
+        try:
+            await self.db.rollback()
+        except Exception:
+            await self.db.invalidate()
+
+    async def _prefetch(self, spec: PrefetchSpec, ctx: StateContext):
+        """Loads everything the handler declared, in as few queries as possible."""
+        member_id = ctx.data.get(spec.member_key) if spec.needs_member else None
+
+        if spec.needs_tree_role or spec.needs_member or spec.needs_member_list:
+            # The member rides along on the tree query
+            ctx.tree, ctx.role, ctx.member = await self.tree_service.get_tree_and_role(ctx.user.id, member_id)
+
+        if spec.needs_member_list and ctx.tree:
+            ctx.members = await self.member_service.get_member_rows(ctx.tree.id)
+
+    async def handle_command(self, ctx: StateContext) -> bool:
+        """
+        Runs a one-shot text command typed at the main menu, replacing a whole
+        multi-message flow. Returns False if the body is not a command.
+        """
+        try:
+            command = parse_command(ctx.body)
+        except ValueError as e:
+            ctx.response.message(str(e))
+            return True
+        if command is None:
+            return False
+
+        if isinstance(command, AddMemberCommand):
+            await self._run_add_member_command(command, ctx)
+        elif isinstance(command, BulkImportCommand):
+            await self._run_bulk_import_command(command, ctx)
+        else:
+            await self._run_add_event_command(command, ctx)
+        return True
+
+    async def _run_add_member_command(self, command: AddMemberCommand, ctx: StateContext):
+        user, response = ctx.user, ctx.response
+        tree, role, relative = await self.tree_service.get_tree_and_role(user.id, command.relative_id)
+        if tree and role not in [Role.OWNER, Role.EDITOR]:
+            response.message(VIEWER_CANNOT_ADD)
+            return
+
+        gender = command.gender
+        if command.relation is None:
+            if tree and await self.member_service.has_members(tree.id):
+                response.message(f"Say how this member is related, e.g. child-of 14.\n{ADD_USAGE}")
+                return
+            generation = 1
+        else:
+            if not relative:
+                response.message("Relative not found in your tree.")
+                return
+            relation = RELATIONS[command.relation]
+            generation = relative.generation_level + relation.generation_delta
+            gender = relation.gender or gender
+
+        try:
+            if not tree:
+                tree = await self.tree_service.create_tree(user, commit=False)
+            member = await self.member_service.create_member(
+                tree_id=tree.id,
+                name=command.name,
+                dob=command.dob,
+                gender=gender,
+                generation_level=generation,
+                phone=command.phone,
+                commit=False
+            )
+            if relative:
+                await self.member_service.link_to_relative(
+                    tree.id, member.id, relative.id, RELATIONS[command.relation].relationship_type, commit=False
+                )
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        response.message(f"✅ Added {member.name} to the tree! (ID {member.id})")
+
+    async def _run_bulk_import_command(self, command: BulkImportCommand, ctx: StateContext):
+        user, response = ctx.user, ctx.response
+        tree, role, _ = await self.tree_service.get_tree_and_role(user.id)
+        if tree and role not in [Role.OWNER, Role.EDITOR]:
+            response.message(VIEWER_CANNOT_ADD)
+            return
+
+        try:
+            if not tree:
+                tree = await self.tree_service.create_tree(user, commit=False)
+            ids = await self.member_service.bulk_create_members(tree.id, command.lines, commit=False)
+            await self.db.commit()
+        except ValueError as e:
+            await self.db.rollback()
+            response.message(str(e))
+            return
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        response.message(f"✅ Added {len(ids)} members to the tree! (IDs {ids[0]}-{ids[-1]})")
+
+    async def _run_add_event_command(self, command, ctx: StateContext):
+        response = ctx.response
+        tree, role, member = await self.tree_service.get_tree_and_role(ctx.user.id, command.member_id)
+        if not tree:
+            response.message(NO_TREE)
+        elif role not in [Role.OWNER, Role.EDITOR]:
+            response.message("🔒 Only Owners and Editors can add events.")
+        elif not member:
+            response.message("Member not found in your tree.")
+        else:
+            await self.member_service.add_event(member.id, command.event_type, command.event_date)
+            response.message(f"✅ Added {command.event_type} on {command.event_date.strftime('%d-%m-%Y')} for {member.name}!")
+
+    async def show_main_menu(self, response: ChunkedResponse):
+        response.message(MAIN_MENU)
+
+    # --- MAIN MENU ---
+
+    @registry.state("MAIN_MENU", needs_tree_role=True)
+    async def handle_main_menu(self, ctx: StateContext):
+        user, body, response = ctx.user, ctx.body, ctx.response
+        tree, role = ctx.tree, ctx.role
         choice = body.strip()
-        tree, role = await self.tree_service.get_active_tree(user.id)
 
         if choice == "1":
             if not tree:
-                 response.message("You don't have a tree yet. Select 'Add Member' to start!")
+                response.message("You don't have a tree yet. Select 'Add Member' to start!")
             else:
-                members = await self.member_service.get_members_by_tree(tree.id)
-                relationships = await self.member_service.get_relationships_by_tree(tree.id)
+                members = await self.member_service.get_member_rows(tree.id)
+                relationships = await self.member_service.get_relationship_rows(tree.id)
                 tree_text = self._build_tree_text(members, relationships)
                 response.message(tree_text)
-            
+
             await self.show_main_menu(response)
-                
+
         elif choice == "2":
             # Add Member
             if tree and role not in [Role.OWNER, Role.EDITOR]:
-                response.message("🔒 You are a Viewer. You cannot add members.")
+                response.message(VIEWER_CANNOT_ADD)
                 return
 
             if not tree:
                 tree = await self.tree_service.create_tree(user)
-                
-            await self.user_service.update_state(user.id, "ADD_MEMBER_NAME")
-            response.message("Enter the name of the new member:")
-            
+
+            await self.state_store.set(user.id, "ADD_MEMBER_NAME")
+            response.message(ASK_NAME)
+
         elif choice == "3":
-             # Edit Member
-             if not tree:
-                  response.message("No tree found.")
-                  return
-             
-             if role not in [Role.OWNER, Role.EDITOR]:
-                  response.message("🔒 You are a Viewer. You cannot edit members.")
-                  return
-
-             members = await self.member_service.get_members_by_tree(tree.id) if tree else []
-             
-             if not members:
-                  response.message("No members to edit.")
-             else:
-                  msg = "Enter the ID of the member to edit:\n"
-                  for m in members:
-                       msg += f"{m.id}. {m.name}\n"
-                  response.message(msg)
-                  await self.user_service.update_state(user.id, "EDIT_SELECT_MEMBER")
-             
+            # Edit Member
+            if not tree:
+                response.message(NO_TREE)
+                return
+
+            if role not in [Role.OWNER, Role.EDITOR]:
+                response.message("🔒 You are a Viewer. You cannot edit members.")
+                return
+
+            members = await self.member_service.get_member_rows(tree.id)
+            if not members:
+                response.message("No members to edit.")
+            else:
+                msg = "Enter the ID of the member to edit:\n"
+                for m in members:
+                    msg += f"{m.id}. {m.name}\n"
+                response.message(msg)
+                await self.state_store.set(user.id, "EDIT_SELECT_MEMBER")
+
+        elif choice == "4":
+            # Share Tree
+            if not tree:
+                response.message("You do not own a tree to share.")
+                await self.show_main_menu(response)
+            elif role != Role.OWNER:
+                response.message("🔒 Only the Owner can share the tree.")
+                await self.show_main_menu(response)
+            else:
+                await self.state_store.set(user.id, "SHARE_ENTER_PHONE")
+                response.message(
+                    "Enter the phone number to share with (e.g. +1234567890). "
+                    "To invite several people, separate the numbers with commas or new lines."
+                )
+
+        elif choice == "5":
+            # Transfer
+            if not tree:
+                response.message("You do not own a tree.")
+                await self.show_main_menu(response)
+            elif role != Role.OWNER:
+                response.message("🔒 Only the Owner can transfer ownership.")
+                await self.show_main_menu(response)
+            else:
+                await self.state_store.set(user.id, "TRANSFER_ENTER_PHONE")
+                response.message("Enter the phone number of the new owner:")
+
+        elif choice == "6":
+            # Delete
+            if not tree:
+                response.message("You do not own a tree.")
+                await self.show_main_menu(response)
+            elif role != Role.OWNER:
+                response.message("🔒 Only the Owner can delete the tree.")
+                await self.show_main_menu(response)
+            else:
+                await self.state_store.set(user.id, "DELETE_CONFIRM")
+                response.message("Are you sure you want to delete your tree? This cannot be undone. Reply 'yes' to confirm.")
+
         elif choice == "7":
-             response.message("Send 'reset' anytime to return to the main menu.")
-             await self.show_main_menu(response)
-        
+            response.message(HELP)
+            await self.show_main_menu(response)
+
+        elif choice == "8":
+            # Manage Events
+            if not tree:
+                response.message(NO_TREE)
+            else:
+                members = await self.member_service.get_member_rows(tree.id)
+                if not members:
+                    response.message("No members found. Add members first.")
+                else:
+                    msg = "Select a member to manage events for:\n"
+                    for m in members:
+                        msg += f"{m.id}. {m.name}\n"
+                    response.message(msg)
+                    await self.state_store.set(user.id, "EVENT_SELECT_MEMBER")
+
+        elif choice.lower() in ("notify on", "notify off"):
+            enabled = choice.lower() == "notify on"
+            await self.user_service.set_notify_changes(user.id, enabled)
+            response.message(
+                "🔔 You will get a summary when others edit your family tree."
+                if enabled else "🔕 Edit notifications are off."
+            )
+
+        elif choice == "9":
+            if not tree:
+                response.message(NO_TREE)
+            else:
+                days = get_settings().UPCOMING_DAYS
+                upcoming = await self.member_service.get_upcoming_dates(tree.id, date.today(), days)
+                response.message(self._build_upcoming_text(upcoming, days))
+            await self.show_main_menu(response)
+
+        elif body.lower() in ["hi", "hello", "menu", "start"]:
+            await self.show_main_menu(response)
         else:
-             if choice == "4":
-                 # Share Tree
-                 if not tree:
-                      response.message("You do not own a tree to share.")
-                      await self.show_main_menu(response)
-                 elif role != Role.OWNER:
-                      response.message("🔒 Only the Owner can share the tree.")
-                      await self.show_main_menu(response)
-                 else:
-                      await self.user_service.update_state(user.id, "SHARE_ENTER_PHONE")
-                      response.message("Enter the phone number to share with (e.g. +1234567890):")
-
-             elif choice == "5":
-                 # Transfer
-                 if not tree:
-                      response.message("You do not own a tree.")
-                      await self.show_main_menu(response)
-                 elif role != Role.OWNER:
-                      response.message("🔒 Only the Owner can transfer ownership.")
-                      await self.show_main_menu(response)
-                 else:
-                      await self.user_service.update_state(user.id, "TRANSFER_ENTER_PHONE")
-                      response.message("Enter the phone number of the new owner:")
-
-             elif choice == "6":
-                 # Delete
-                 if not tree:
-                      response.message("You do not own a tree.")
-                      await self.show_main_menu(response)
-                 elif role != Role.OWNER:
-                      response.message("🔒 Only the Owner can delete the tree.")
-                      await self.show_main_menu(response)
-                 else:
-                      await self.user_service.update_state(user.id, "DELETE_CONFIRM")
-                      response.message("Are you sure you want to delete your tree? This cannot be undone. Reply 'yes' to confirm.")
-              
-             elif choice == "8":
-                  # Manage Events
-                  if not tree:
-                       response.message("No tree found.")
-                  else:
-                       members = await self.member_service.get_members_by_tree(tree.id)
-                       if not members:
-                            response.message("No members found. Add members first.")
-                       else:
-                            msg = "Select a member to manage events for:\n"
-                            for m in members:
-                                 msg += f"{m.id}. {m.name}\n"
-                            response.message(msg)
-                            await self.user_service.update_state(user.id, "EVENT_SELECT_MEMBER")
-
-             elif body.lower() in ["hi", "hello", "menu", "start"]:
-                  await self.show_main_menu(response)
-             else:
-                  response.message("Invalid option. Send 'menu' to see options.")
-
-    async def finalize_add_member(self, user, data, response, is_root=False):
-         user_id = user.id
-         tree, role = await self.tree_service.get_active_tree(user_id)
-         if not tree or role not in [Role.OWNER, Role.EDITOR]:
-              response.message("Permission denied.")
-              await self.user_service.clear_state(user_id)
-              return
-
-         tree_id = tree.id
-         try:
-             # Create member
-             member = await self.member_service.create_member(
-                 tree_id=tree_id,
-                 name=data['name'],
-                 dob=date.fromisoformat(data['dob']),
-                 gender=Gender(data['gender']),
-                 generation_level=1 if is_root else data.get('generation'),
-                 phone=data.get('phone')
-             )
-             member_name = member.name
-             member_id = member.id
-             
-             if not is_root and 'relative_id' in data:
-                  # Add relationship
-                  relative_id = data['relative_id']
-                  rel_type = data['relationship_type']
-                  
-                  if rel_type == "child":
-                       await self.member_service.add_relationship(tree_id, relative_id, member_id, "parent")
-                  elif rel_type == "parent":
-                       await self.member_service.add_relationship(tree_id, member_id, relative_id, "parent")
-                  elif rel_type == "sibling":
-                       parents = await self.member_service.get_parents(tree_id, relative_id)
-                       if parents:
-                           for p_id in parents:
-                               await self.member_service.add_relationship(tree_id, p_id, member_id, "parent")
-                       else:
-                           await self.member_service.add_relationship(tree_id, relative_id, member_id, "sibling")
-                  elif rel_type == "spouse":
-                       await self.member_service.add_relationship(tree_id, relative_id, member_id, "spouse")
-                  
-             response.message(f"✅ Added {member_name} to the tree!")
-             await self.user_service.clear_state(user_id)
-             await self.show_main_menu(response)
-         except Exception as e:
-             response.message(f"❌ Failed to add member: {str(e)}")
-             await self.user_service.clear_state(user_id)
+            response.message(INVALID_OPTION)
+
+    # --- ADD MEMBER FLOW ---
+
+    @registry.state("ADD_MEMBER_NAME")
+    async def handle_add_member_name(self, ctx: StateContext):
+        await self.state_store.set(ctx.user.id, "ADD_MEMBER_DOB", {"name": ctx.body})
+        ctx.response.message(ASK_DOB)
+
+    @registry.state("ADD_MEMBER_DOB")
+    async def handle_add_member_dob(self, ctx: StateContext):
+        try:
+            dob = validate_dob(ctx.body)
+            ctx.data['dob'] = dob.isoformat()
+            await self.state_store.set(ctx.user.id, "ADD_MEMBER_GENDER", ctx.data)
+            ctx.response.message(ASK_GENDER)
+        except ValueError as e:
+            ctx.response.message(str(e))
+
+    @registry.state("ADD_MEMBER_GENDER")
+    async def handle_add_member_gender(self, ctx: StateContext):
+        try:
+            gender = validate_gender(ctx.body)
+            ctx.data['gender'] = gender.value
+            await self.state_store.set(ctx.user.id, "ADD_MEMBER_PHONE", ctx.data)
+            ctx.response.message(ASK_PHONE)
+        except ValueError as e:
+            ctx.response.message(str(e))
+
+    @registry.state("ADD_MEMBER_PHONE", needs_member_list=True)
+    async def handle_add_member_phone(self, ctx: StateContext):
+        data = ctx.data
+        phone = ctx.body.strip()
+        if phone.lower() != 'skip':
+            data['phone'] = phone # Validate?
+        await self.state_store.set(ctx.user.id, "ADD_MEMBER_RELATION", data)
+
+        if not ctx.tree or not ctx.members:
+            # First member (Root)
+            await self.finalize_add_member(ctx, is_root=True)
+        else:
+            msg = "Who is this member related to? Enter the ID of the relative:\n"
+            for m in ctx.members:
+                msg += f"{m.id}. {m.name} ({m.generation_level})\n"
+            ctx.response.message(msg)
+
+    @registry.state("ADD_MEMBER_RELATION")
+    async def handle_add_member_relation(self, ctx: StateContext):
+        data = ctx.data
+        if 'parent_id' not in data:
+            try:
+                relative_id = int(ctx.body)
+                data['relative_id'] = relative_id
+                await self.state_store.set(ctx.user.id, "ADD_MEMBER_RELATION_TYPE", data)
+                ctx.response.message(f"What is the relationship of the NEW member to the relative?\n{RELATION_TYPE_PROMPT}")
+            except ValueError:
+                ctx.response.message("Invalid ID. Please enter a number.")
+
+    @registry.state("ADD_MEMBER_RELATION_TYPE", needs_member=True, member_key="relative_id")
+    async def handle_add_member_relation_type(self, ctx: StateContext):
+        data, response = ctx.data, ctx.response
+        try:
+            choice = int(ctx.body.strip())
+            relative = ctx.member
+
+            if not relative:
+                response.message("Relative not found. Aborting.")
+                await self.state_store.clear(ctx.user.id)
+                return
+
+            relation = RELATIONS.get(RELATION_CHOICES.get(choice))
+            if relation is None:
+                response.message("Invalid choice. Enter 1-6.")
+                return
+
+            new_gen = relative.generation_level + relation.generation_delta
+            relationship_type = relation.relationship_type
+            if relation.gender:
+                data['gender'] = relation.gender.value
+
+            data['generation'] = new_gen
+            data['relationship_type'] = relationship_type
+
+            await self.finalize_add_member(ctx)
+        except ValueError:
+            response.message("Invalid input. Please enter a number.")
+
+    async def finalize_add_member(self, ctx: StateContext, is_root=False):
+        user_id, data, response = ctx.user.id, ctx.data, ctx.response
+        tree, role = ctx.tree, ctx.role
+        if not tree or role not in [Role.OWNER, Role.EDITOR]:
+            response.message("Permission denied.")
+            await self.state_store.clear(user_id)
+            return
+
+        tree_id = tree.id
+        try:
+            # Create member and its relationship in one transaction
+            member = await self.member_service.create_member(
+                tree_id=tree_id,
+                name=data['name'],
+                dob=date.fromisoformat(data['dob']),
+                gender=Gender(data['gender']),
+                generation_level=1 if is_root else data.get('generation'),
+                phone=data.get('phone'),
+                commit=False
+            )
+            member_name = member.name
+
+            if not is_root and 'relative_id' in data:
+                await self.member_service.link_to_relative(
+                    tree_id, member.id, data['relative_id'], data['relationship_type'], commit=False
+                )
+            await self.db.commit()
+
+            response.message(f"✅ Added {member_name} to the tree!")
+            await self.state_store.clear(user_id)
+            await self.show_main_menu(response)
+        except Exception as e:
+            await self.db.rollback()
+            response.message(f"❌ Failed to add member: {str(e)}")
+            await self.state_store.clear(user_id)
+
+    # --- EDIT MEMBER FLOW ---
+
+    @registry.state("EDIT_SELECT_MEMBER", needs_tree_role=True)
+    async def handle_edit_select_member(self, ctx: StateContext):
+        user, response, tree, role = ctx.user, ctx.response, ctx.tree, ctx.role
+        try:
+            member_id = int(ctx.body.strip())
+            # Check if member exists in user's tree
+            if not tree:
+                response.message("Tree not found.")
+                return
+
+            member = await self.member_service.get_member(member_id)
+            if not member or member.tree_id != tree.id:
+                response.message("Member not found in your tree.")
+                return
+
+            if role not in [Role.OWNER, Role.EDITOR]:
+                response.message("Permission denied. Viewers cannot edit.")
+                await self.state_store.clear(user.id)
+                return
+
+            # Take the edit lock; fails if another user holds an unexpired one
+            if not await self.member_service.lock_member(member_id, user.id):
+                response.message(f"Member is currently being edited by another user. Try again later.")
+                await self.state_store.clear(user.id)
+                return
+            ctx.data['member_id'] = member_id
+            await self.state_store.set(user.id, "EDIT_SELECT_FIELD", ctx.data)
+            response.message(f"Editing {member.name}. What do you want to change?\n1. Name\n2. DOB\n3. Gender\n4. Phone\n5. Relation")
+        except ValueError:
+            response.message("Invalid ID.")
+
+    # The relatives list for choice 5 is prefetched with the tree, whichever field is picked
+    @registry.state("EDIT_SELECT_FIELD", needs_member_list=True)
+    async def handle_edit_select_field(self, ctx: StateContext):
+        data, response = ctx.data, ctx.response
+        choice = ctx.body.strip()
+        data['edit_field'] = choice
+
+        if choice == '5':
+            # Editing relation
+            msg = "Select the relative to link to:\n"
+            for m in ctx.members:
+                if m.id != data['member_id']:
+                    msg += f"{m.id}. {m.name}\n"
+            await self.state_store.set(ctx.user.id, "EDIT_RELATION_TARGET", data)
+            response.message(msg)
+        else:
+            await self.state_store.set(ctx.user.id, "EDIT_ENTER_VALUE", data)
+            if choice == '1': response.message("Enter new Name:")
+            elif choice == '2': response.message("Enter new DOB (DD-MM-YYYY):")
+            elif choice == '3': response.message("Enter new Gender (Male/Female/Other):")
+            elif choice == '4': response.message("Enter new Phone:")
+            else:
+                response.message("Invalid choice.")
+
+    @registry.state("EDIT_RELATION_TARGET")
+    async def handle_edit_relation_target(self, ctx: StateContext):
+        try:
+            target_id = int(ctx.body.strip())
+            ctx.data['edit_relation_target'] = target_id
+            await self.state_store.set(ctx.user.id, "EDIT_RELATION_TYPE", ctx.data)
+            ctx.response.message(f"What is the relationship of the edited member to this relative?\n{RELATION_TYPE_PROMPT}")
+        except ValueError:
+            ctx.response.message("Invalid ID. Enter a number.")
+
+    @registry.state("EDIT_RELATION_TYPE", needs_member=True, member_key="edit_relation_target")
+    async def handle_edit_relation_type(self, ctx: StateContext):
+        user, data, response = ctx.user, ctx.data, ctx.response
+        try:
+            choice = int(ctx.body.strip())
+            member_id = data['member_id']
+            target_id = data['edit_relation_target']
+
+            target = ctx.member
+            if not target:
+                response.message("Relative not found.")
+                return
+
+            # Delete old relationships where this member is a child (assuming single parent linkage usually, or just drop all and reset)
+            # For simplicity, we just add the new relationship
+            relation = RELATIONS.get(RELATION_CHOICES.get(choice))
+            if relation is None:
+                response.message("Invalid choice. Enter 1-6.")
+                return
+
+            rel_type = relation.relationship_type
+            updates = {}
+            if relation.gender:
+                updates['gender'] = relation.gender
+
+            if updates:
+                await self.member_service.update_member(member_id, **updates)
+
+            if rel_type == "child":
+                await self.member_service.add_relationship(target.tree_id, target_id, member_id, "parent")
+            elif rel_type == "parent":
+                await self.member_service.add_relationship(target.tree_id, member_id, target_id, "parent")
+            elif rel_type in ["spouse", "sibling"]:
+                await self.member_service.add_relationship(target.tree_id, target_id, member_id, rel_type)
+
+            await self.member_service.unlock_member(member_id, user.id)
+            response.message("✅ Relationship updated successfully!")
+            await self.state_store.clear(user.id)
+            await self.show_main_menu(response)
+        except ValueError:
+            response.message("Invalid choice. Enter 1-6.")
+
+    @registry.state("EDIT_ENTER_VALUE")
+    async def handle_edit_enter_value(self, ctx: StateContext):
+        user, data, response = ctx.user, ctx.data, ctx.response
+        member_id = data['member_id']
+        field_choice = data['edit_field']
+        new_value = ctx.body.strip()
+
+        updates = {}
+        try:
+            if field_choice == '1':
+                updates['name'] = new_value
+            elif field_choice == '2':
+                updates['dob'] = validate_dob(new_value)
+            elif field_choice == '3':
+                updates['gender'] = validate_gender(new_value)
+            elif field_choice == '4':
+                # Phone validation
+                updates['phone'] = new_value
+
+            await self.member_service.update_member(member_id, **updates)
+            await self.member_service.unlock_member(member_id, user.id)
+            response.message("✅ Member updated successfully!")
+            await self.state_store.clear(user.id)
+            await self.show_main_menu(response)
+        except ValueError as e:
+            response.message(str(e))
+
+    # --- SHARE TREE FLOW ---
+
+    @registry.state("SHARE_ENTER_PHONE", needs_tree_role=True)
+    async def handle_share_enter_phone(self, ctx: StateContext):
+        user, response = ctx.user, ctx.response
+        # One number may be typed with spaces ("+91 98765 43210"), so only these separate numbers
+        entries = [e for e in re.split(r"[,;\n]+", ctx.body) if e.strip()]
+        phones, invalid = [], []
+        for entry in entries:
+            try:
+                phones.append(validate_phone(entry))
+            except ValueError as e:
+                invalid.append(str(e))
+
+        if not entries:
+            response.message("Please enter at least one phone number.")
+            return
+        if invalid:
+            response.message("Nothing was shared. Please fix:\n" + "\n".join(invalid))
+            return
+        if ctx.tree and ctx.role == Role.OWNER:
+            granted, existing = await self.tree_service.share_with_phones(ctx.tree.id, phones, Role.VIEWER)
+            if len(phones) == 1:
+                response.message(f"✅ Access granted to {phones[0]} as Viewer.")
+            else:
+                msg = f"✅ Shared with {granted} people as Viewers."
+                if existing:
+                    msg += f" {existing} already had access."
+                response.message(msg)
+        else:
+            response.message("You do not have permission to share this tree.")
+
+        await self.state_store.clear(user.id)
+        await self.show_main_menu(response)
+
+    # --- TRANSFER OWNERSHIP FLOW ---
+
+    @registry.state("TRANSFER_ENTER_PHONE", needs_tree_role=True)
+    async def handle_transfer_enter_phone(self, ctx: StateContext):
+        user, response = ctx.user, ctx.response
+        phone = ctx.body.strip()
+        if not phone.startswith('+'): phone = '+' + phone
+
+        target_user = await self.user_service.get_or_create_user(phone)
+
+        if ctx.tree and ctx.role == Role.OWNER:
+            if target_user.id == user.id:
+                response.message("You already own this tree.")
+            else:
+                await self.tree_service.transfer_ownership(ctx.tree, target_user)
+                response.message(f"✅ Ownership transferred to {phone}. You are now an Editor.")
+        else:
+            response.message("You do not have permission to transfer ownership.")
+
+        await self.state_store.clear(user.id)
+        await self.show_main_menu(response)
+
+    # --- DELETE TREE FLOW ---
+
+    @registry.state("DELETE_CONFIRM", needs_tree_role=True)
+    async def handle_delete_confirm(self, ctx: StateContext):
+        user, response, tree = ctx.user, ctx.response, ctx.tree
+        if ctx.body.lower() == "yes":
+            if tree and ctx.role == Role.OWNER:
+                _, member_count, _ = await self.tree_service.get_tree_summary(tree.id)
+                if member_count > settings.TREE_DELETE_CHUNK_THRESHOLD:
+                    await self.tree_service.detach_tree(tree.id)
+                    task = asyncio.create_task(
+                        delete_tree_in_background(AsyncSessionLocal, tree.id, settings.TREE_DELETE_BATCH_SIZE)
+                    )
+                    _background_tasks.add(task)
+                    task.add_done_callback(_background_tasks.discard)
+                    response.message("✅ Tree removed. Its members are being deleted in the background.")
+                else:
+                    await self.tree_service.delete_tree(tree.id)
+                    response.message("✅ Tree deleted successfully.")
+            else:
+                response.message("Permission denied or tree not found.")
+        else:
+            response.message("Deletion cancelled.")
+
+        await self.state_store.clear(user.id)
+        await self.show_main_menu(response)
+
+    # --- EVENT FLOW ---
+
+    @registry.state("EVENT_SELECT_MEMBER", needs_tree_role=True)
+    async def handle_event_select_member(self, ctx: StateContext):
+        response, tree = ctx.response, ctx.tree
+        try:
+            member_id = int(ctx.body.strip())
+            if not tree:
+                response.message("Tree not found.")
+                return
+
+            member = await self.member_service.get_member(member_id)
+            if not member or member.tree_id != tree.id:
+                response.message("Member not found in your tree.")
+                return
+
+            # Store selected member
+            ctx.data['member_id'] = member_id
+            await self.state_store.set(ctx.user.id, "EVENT_ACTION", ctx.data)
+            response.message(f"Selected {member.name}. What would you like to do?\n1. Add Special Date\n2. View Special Dates")
+        except ValueError:
+            response.message("Invalid ID. Please enter a number.")
+
+    @registry.state("EVENT_ACTION", needs_tree_role=True)
+    async def handle_event_action(self, ctx: StateContext):
+        user, data, response = ctx.user, ctx.data, ctx.response
+        choice = ctx.body.strip()
+        if choice == "1":
+            # Add Event
+            if ctx.role not in [Role.OWNER, Role.EDITOR]:
+                response.message("🔒 Only Owners and Editors can add events.")
+                await self.state_store.clear(user.id)
+                await self.show_main_menu(response)
+                return
+
+            await self.state_store.set(user.id, "EVENT_TYPE", data)
+            response.message("Enter the Event Type (e.g. Birthday, Anniversary, Death Anniversary):")
+        elif choice == "2":
+            # View Events
+            member_id = data['member_id']
+            events = await self.member_service.get_events(member_id)
+            if not events:
+                response.message("No special dates found for this member.")
+            else:
+                msg = "*Special Dates:*\n"
+                for e in events:
+                    msg += f"📅 {e.event_date.strftime('%d-%m-%Y')}: {e.event_type}\n"
+                response.message(msg)
+
+            await self.state_store.clear(user.id)
+            await self.show_main_menu(response)
+        else:
+            response.message("Invalid choice. Enter 1 or 2.")
+
+    @registry.state("EVENT_TYPE")
+    async def handle_event_type(self, ctx: StateContext):
+        ctx.data['event_type'] = ctx.body.strip()
+        await self.state_store.set(ctx.user.id, "EVENT_DATE", ctx.data)
+        ctx.response.message("Enter the Date (DD-MM-YYYY):")
+
+    @registry.state("EVENT_DATE")
+    async def handle_event_date(self, ctx: StateContext):
+        user, data, response = ctx.user, ctx.data, ctx.response
+        try:
+            event_date = validate_dob(ctx.body) # Reuse DOB validator for date format
+            member_id = data['member_id']
+            event_type = data['event_type']
+
+            await self.member_service.add_event(member_id, event_type, event_date)
+            response.message(f"✅ Added {event_type} on {event_date.strftime('%d-%m-%Y')}!")
+            await self.state_store.clear(user.id)
+            await self.show_main_menu(response)
+        except ValueError as e:
+            response.message(str(e))
+
+    def _build_upcoming_text(self, upcoming, days: int) -> str:
+        if not upcoming:
+            return f"Nothing coming up in the next {days} days."
+        lines = [f"🎂 *Coming up in the next {days} days*\n"]
+        for u in upcoming:
+            lines.append(f"{u.on.strftime('%d-%m')} {describe_occasion(u)}")
+        return "\n".join(lines)
 
     def _build_tree_text(self, members, relationships) -> str:
         if not members:
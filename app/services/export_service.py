@@ -0,0 +1,153 @@
+import csv
+import io
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import case, func, null, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from app.models.member import Member, Relationship, Gender, UNKNOWN_DOB
+from app.schemas.member import MemberResponse
+
+EXPORT_FORMATS = {
+    "gedcom": ("text/plain; charset=utf-8", "ged"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+CSV_COLUMNS = list(MemberResponse.model_fields)
+GEDCOM_MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+GEDCOM_SEX = {Gender.MALE: "M", Gender.FEMALE: "F", Gender.OTHER: "U"}
+
+
+class ExportService:
+    """
+    Streams a whole tree without loading it. Every query runs through a
+    server-side cursor (`stream` + `yield_per`) and each fetched partition is
+    encoded and yielded as one text chunk, so memory stays at roughly one
+    partition regardless of tree size.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 500):
+        self.db = db
+        self.batch_size = batch_size
+
+    def stream(self, tree_id: int, fmt: str) -> AsyncIterator[str]:
+        if fmt == "gedcom":
+            return self.stream_gedcom(tree_id)
+        if fmt == "ndjson":
+            return self.stream_ndjson(tree_id)
+        if fmt == "csv":
+            return self.stream_csv(tree_id)
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    async def _member_partitions(self, tree_id: int) -> AsyncIterator[List[Member]]:
+        stmt = (
+            select(Member)
+            .filter(Member.tree_id == tree_id)
+            .order_by(Member.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        result = await self.db.stream_scalars(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+    async def stream_ndjson(self, tree_id: int) -> AsyncIterator[str]:
+        async for members in self._member_partitions(tree_id):
+            yield "".join(MemberResponse.model_validate(m).model_dump_json() + "\n" for m in members)
+
+    async def stream_csv(self, tree_id: int) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        async for members in self._member_partitions(tree_id):
+            writer.writerows(MemberResponse.model_validate(m).model_dump(mode="json") for m in members)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    async def stream_gedcom(self, tree_id: int) -> AsyncIterator[str]:
+        yield "0 HEAD\n1 SOUR FamilyTreeBot\n1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n"
+        async for members in self._member_partitions(tree_id):
+            yield "".join(gedcom_individual(m) for m in members)
+
+        family_no = 0
+        chunk = []
+        current = None
+        result = await self.db.stream(
+            self._family_rows(tree_id).execution_options(yield_per=self.batch_size)
+        )
+        async for partition in result.partitions():
+            for first, second, first_gender, child_id in partition:
+                if (first, second) != current:
+                    current = (first, second)
+                    family_no += 1
+                    chunk.append(f"0 @F{family_no}@ FAM\n")
+                    chunk.extend(gedcom_partners(first, second, first_gender))
+                if child_id is not None:
+                    chunk.append(f"1 CHIL @I{child_id}@\n")
+            yield "".join(chunk)
+            chunk = []
+        yield "0 TRLR\n"
+
+    def _family_rows(self, tree_id: int):
+        """
+        One row per (partner, partner, child) ordered by the couple, so families
+        can be emitted while streaming. A child's parents are collapsed to
+        min/max of its parent ids; couples without children come from spouse links.
+        """
+        parent_links = (
+            select(
+                func.min(Relationship.parent_id).label("first"),
+                func.max(Relationship.parent_id).label("second"),
+                Relationship.child_id.label("child_id"),
+            )
+            .filter(Relationship.tree_id == tree_id, Relationship.relation_type == "parent")
+            .group_by(Relationship.child_id)
+        )
+        spouse_links = select(
+            case((Relationship.parent_id < Relationship.child_id, Relationship.parent_id),
+                 else_=Relationship.child_id).label("first"),
+            case((Relationship.parent_id < Relationship.child_id, Relationship.child_id),
+                 else_=Relationship.parent_id).label("second"),
+            null().label("child_id"),
+        ).filter(Relationship.tree_id == tree_id, Relationship.relation_type == "spouse")
+
+        families = union_all(parent_links, spouse_links).subquery()
+        first_member = aliased(Member)
+        return (
+            select(families.c.first, families.c.second, first_member.gender, families.c.child_id)
+            .join(first_member, first_member.id == families.c.first)
+            .order_by(families.c.first, families.c.second, families.c.child_id)
+        )
+
+
+def gedcom_date(value) -> Optional[str]:
+    if value is None or value == UNKNOWN_DOB:
+        return None
+    return f"{value.day} {GEDCOM_MONTHS[value.month - 1]} {value.year}"
+
+
+def gedcom_individual(member: Member) -> str:
+    lines = [
+        f"0 @I{member.id}@ INDI\n",
+        f"1 NAME {member.name}\n",
+        f"1 SEX {GEDCOM_SEX.get(member.gender, 'U')}\n",
+    ]
+    birth = gedcom_date(member.dob)
+    if birth:
+        lines.append(f"1 BIRT\n2 DATE {birth}\n")
+    if member.phone:
+        lines.append(f"1 PHON {member.phone}\n")
+    return "".join(lines)
+
+
+def gedcom_partners(first: int, second: int, first_gender: Gender) -> List[str]:
+    if first == second:
+        tag = "WIFE" if first_gender == Gender.FEMALE else "HUSB"
+        return [f"1 {tag} @I{first}@\n"]
+    if first_gender == Gender.FEMALE:
+        return [f"1 HUSB @I{second}@\n", f"1 WIFE @I{first}@\n"]
+    return [f"1 HUSB @I{first}@\n", f"1 WIFE @I{second}@\n"]
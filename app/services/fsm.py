@@ -0,0 +1,102 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import Row
+
+from app.models.member import Member
+from app.models.tree import Role, Tree
+from app.models.user import User
+from app.utils.metrics import Histogram
+from app.utils.twiml import ChunkedResponse
+
+
+@dataclass(frozen=True)
+class PrefetchSpec:
+    """
+    What a state handler needs loaded before it runs.
+
+    `needs_member` resolves `data[member_key]` to a `Member` of the active tree,
+    so it implies `needs_tree_role`; both are fetched in a single query.
+    `needs_member_list` loads `MemberService.get_member_rows` (read-only rows).
+    """
+    needs_tree_role: bool = False
+    needs_member: bool = False
+    needs_member_list: bool = False
+    member_key: str = "member_id"
+
+
+@dataclass
+class StateContext:
+    user: User
+    body: str
+    data: Dict[str, Any]
+    response: ChunkedResponse
+    tree: Optional[Tree] = None
+    role: Optional[Role] = None
+    member: Optional[Member] = None
+    members: List[Row] = field(default_factory=list)
+
+
+@dataclass
+class StateHandler:
+    state: str
+    func: Callable[..., Awaitable[None]]
+    prefetch: PrefetchSpec
+
+
+@dataclass
+class StateStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    deadline_exceeded: int = 0
+    errors: int = 0
+    outages: int = 0  # errors that were the database being unreachable
+    histogram: Histogram = field(default_factory=Histogram)
+
+    def observe(self, elapsed: float):
+        self.count += 1
+        self.total_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        self.histogram.observe(elapsed)
+
+
+class StateRegistry:
+    """Maps FSM state names to handlers and keeps per-state latency, deadline and error stats."""
+
+    def __init__(self):
+        self.handlers: Dict[str, StateHandler] = {}
+        self.stats: Dict[str, StateStats] = {}
+
+    def state(self, name: str, **prefetch):
+        """Decorator registering a `ChatbotService` method as the handler for `name`."""
+        def decorator(func):
+            if name in self.handlers:
+                raise ValueError(f"State {name} is already registered")
+            self.handlers[name] = StateHandler(name, func, PrefetchSpec(**prefetch))
+            self.stats[name] = StateStats()
+            return func
+        return decorator
+
+    def get(self, name: str) -> Optional[StateHandler]:
+        return self.handlers.get(name)
+
+    def timer(self, name: str) -> "_StateTimer":
+        return _StateTimer(self.stats[name])
+
+
+class _StateTimer:
+    __slots__ = ("stats", "started")
+
+    def __init__(self, stats: StateStats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.observe(time.perf_counter() - self.started)
+        return False
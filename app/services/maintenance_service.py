@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import and_, delete, exists, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from app.config import get_settings
+from app.models.change import TreeChange
+from app.models.member import Member
+from app.models.tree import Tree, TreeAccess
+from app.models.user import ArchivedUser, User
+from app.services.tree_service import TreeService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class GCStats:
+    batches: int = 0
+    states_reset: int = 0
+    users_archived: int = 0
+    changes_compacted: int = 0
+    trees_purged: int = 0
+
+
+class MaintenanceService:
+    """
+    Batched housekeeping for the `users` and `tree_changes` tables, plus
+    finishing background tree deletes.
+
+    Every job walks its table with keyset pagination on `id` and commits after
+    every chunk, so no transaction holds more than `batch_size` rows locked.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 500):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def _next_ids(self, last_id: int, *criteria) -> List[int]:
+        result = await self.db.execute(
+            select(User.id)
+            .filter(User.id > last_id, *criteria)
+            .order_by(User.id)
+            .limit(self.batch_size)
+        )
+        return result.scalars().all()
+
+    async def reset_stale_states(self, ttl_seconds: int, stats: GCStats) -> GCStats:
+        """Clears conversations abandoned for longer than `ttl_seconds`."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+        stale = User.state_updated_at < cutoff
+        last_id = 0
+        while True:
+            ids = await self._next_ids(last_id, stale)
+            if not ids:
+                break
+            # Checked again: a user who wrote since the SELECT keeps their state
+            result = await self.db.execute(
+                update(User)
+                .filter(User.id.in_(ids), stale)
+                .values(current_state=None, state_data={}, state_updated_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            stats.batches += 1
+            stats.states_reset += result.rowcount
+            last_id = ids[-1]
+        return stats
+
+    async def archive_inactive_users(self, min_age_seconds: int, stats: GCStats) -> GCStats:
+        """
+        Moves users that never messaged the bot, are older than `min_age_seconds`
+        and are no longer referenced by any tree into `archived_users`.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age_seconds)
+        unused = (
+            User.activated_at.is_(None),
+            User.created_at < cutoff,
+            ~exists().where(TreeAccess.user_id == User.id),
+            ~exists().where(Tree.owner_id == User.id),
+            ~exists().where(Member.locked_by == User.id),
+        )
+        last_id = 0
+        while True:
+            ids = await self._next_ids(last_id, *unused)
+            if not ids:
+                break
+            # The DELETE checks again and archives exactly the rows it removed, so
+            # a user activated, granted access or locking a member meanwhile stays
+            result = await self.db.execute(
+                delete(User)
+                .filter(User.id.in_(ids), *unused)
+                .returning(User.id, User.name, User.phone, User.created_at)
+                .execution_options(synchronize_session=False)
+            )
+            archived = [
+                {"user_id": row.id, "name": row.name, "phone": row.phone, "created_at": row.created_at}
+                for row in result.all()
+            ]
+            if archived:
+                await self.db.execute(insert(ArchivedUser), archived)
+            await self.db.commit()
+            stats.batches += 1
+            stats.users_archived += len(archived)
+            last_id = ids[-1]
+        return stats
+
+    async def _next_change_ids(self, last_id: int, *criteria) -> List[int]:
+        result = await self.db.execute(
+            select(TreeChange.id)
+            .filter(TreeChange.id > last_id, *criteria)
+            .order_by(TreeChange.id)
+            .limit(self.batch_size)
+        )
+        return result.scalars().all()
+
+    async def compact_changes(self, min_age_seconds: int, tombstone_age_seconds: int, stats: GCStats) -> GCStats:
+        """
+        Folds the change feed into per-entity snapshots. Every change carries the
+        full row, so entries older than `min_age_seconds` that are superseded by a
+        newer entry for the same entity (or by a later `reset` of the tree) are
+        dropped. Delete and reset entries older than `tombstone_age_seconds` are
+        dropped too; the tree's `change_floor` is raised past them so clients
+        syncing from before that point are told to resync.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=min_age_seconds)
+        newer = aliased(TreeChange)
+        superseded = exists().where(
+            newer.tree_id == TreeChange.tree_id,
+            newer.seq > TreeChange.seq,
+            or_(
+                newer.op == "reset",
+                and_(newer.entity == TreeChange.entity, newer.entity_id == TreeChange.entity_id,
+                     TreeChange.op != "reset"),
+            ),
+        )
+        last_id = 0
+        while True:
+            ids = await self._next_change_ids(last_id, TreeChange.created_at < cutoff, superseded)
+            if not ids:
+                break
+            await self.db.execute(delete(TreeChange).filter(TreeChange.id.in_(ids)))
+            await self.db.commit()
+            stats.batches += 1
+            stats.changes_compacted += len(ids)
+            last_id = ids[-1]
+
+        tombstone_cutoff = now - timedelta(seconds=tombstone_age_seconds)
+        last_id = 0
+        while True:
+            ids = await self._next_change_ids(
+                last_id, TreeChange.created_at < tombstone_cutoff, TreeChange.op.in_(("delete", "reset"))
+            )
+            if not ids:
+                break
+            result = await self.db.execute(
+                select(TreeChange.tree_id, func.max(TreeChange.seq))
+                .filter(TreeChange.id.in_(ids))
+                .group_by(TreeChange.tree_id)
+            )
+            # Never lower the floor: chunks walk ids, which need not follow seq order
+            for tree_id, seq in result.all():
+                await self.db.execute(
+                    update(Tree).filter(Tree.id == tree_id, Tree.change_floor < seq).values(change_floor=seq)
+                )
+            await self.db.execute(delete(TreeChange).filter(TreeChange.id.in_(ids)))
+            await self.db.commit()
+            stats.batches += 1
+            stats.changes_compacted += len(ids)
+            last_id = ids[-1]
+        return stats
+
+    async def purge_detached_trees(self, stats: GCStats) -> GCStats:
+        """Finishes chunked deletes of trees left without owner and access list."""
+        result = await self.db.execute(
+            select(Tree.id).filter(Tree.owner_id.is_(None), ~exists().where(TreeAccess.tree_id == Tree.id))
+        )
+        tree_service = TreeService(self.db)
+        for tree_id in result.scalars().all():
+            await tree_service.delete_tree_in_chunks(tree_id, settings.TREE_DELETE_BATCH_SIZE)
+            stats.trees_purged += 1
+        return stats
+
+    async def run_gc(self) -> GCStats:
+        stats = GCStats()
+        await self.reset_stale_states(settings.STATE_TTL_SECONDS, stats)
+        await self.archive_inactive_users(settings.USER_ARCHIVE_AFTER_DAYS * 86400, stats)
+        await self.compact_changes(
+            settings.CHANGE_COMPACT_AFTER_DAYS * 86400, settings.CHANGE_TOMBSTONE_DAYS * 86400, stats
+        )
+        await self.purge_detached_trees(stats)
+        logger.info(
+            f"GC finished: {stats.states_reset} states reset, "
+            f"{stats.users_archived} users archived, "
+            f"{stats.changes_compacted} changes compacted, "
+            f"{stats.trees_purged} trees purged in {stats.batches} batches"
+        )
+        return stats
+
+
+async def run_periodic_gc(session_factory, interval_seconds: int):
+    """Background loop started from the app lifespan."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with session_factory() as session:
+                await MaintenanceService(session, settings.GC_BATCH_SIZE).run_gc()
+        except Exception as e:
+            logger.error(f"GC run failed: {e}")
@@ -1,10 +1,61 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, insert, literal, or_, union_all, update
 from sqlalchemy.future import select
-from app.models.member import Member, Relationship, Gender
+from sqlalchemy.orm import selectinload
+from app.models.member import Member, Relationship, Gender, RELATIONS, month_day
 from app.models.event import Event
-from typing import Optional, List
+from typing import NamedTuple, Optional, List, Tuple
 from datetime import date, datetime, timedelta
+import calendar
+from collections import defaultdict
 from app.models.tree import Tree
+from app.models.versioning import insert_changes, record_changes, row_snapshot, row_snapshot_dict
+
+# Columns the chat listings and tree text actually use. Selecting them with Core
+# returns plain rows (attribute access, no identity map, no instance state).
+MEMBER_LIST_COLUMNS = (Member.id, Member.name, Member.gender, Member.dob, Member.generation_level)
+RELATIONSHIP_LINK_COLUMNS = (Relationship.parent_id, Relationship.child_id, Relationship.relation_type)
+
+class UpcomingDate(NamedTuple):
+    on: date          # next occurrence
+    name: str         # member's name
+    kind: str         # "Birthday" or the event type
+    years: int        # age reached / anniversary number on that day
+
+def describe_occasion(occasion: UpcomingDate) -> str:
+    """'Asha: Birthday (turns 76)' / 'Asha: Wedding (50 years)'."""
+    text = f"{occasion.name}: {occasion.kind}"
+    if occasion.years > 0:
+        text += f" (turns {occasion.years})" if occasion.kind == "Birthday" else f" ({occasion.years} years)"
+    return text
+
+def next_occurrence(original: date, start: date) -> date:
+    """First anniversary of `original` on or after `start` (29 Feb falls on 1 Mar in other years)."""
+    for year in (start.year, start.year + 1):
+        try:
+            candidate = original.replace(year=year)
+        except ValueError:
+            candidate = date(year, 3, 1)
+        if candidate >= start:
+            return candidate
+    return candidate
+
+def month_day_window(column, start: date, end: date):
+    """
+    Range filter on a `month_day` column for start..end, wrapping past 31 Dec.
+    29 Feb (229) is matched whenever the window covers 1 Mar of a common year,
+    where `next_occurrence` puts it.
+    """
+    if (end - start).days >= 365:
+        return column.isnot(None)
+    low, high = start.month * 100 + start.day, end.month * 100 + end.day
+    window = column.between(low, high) if low <= high else or_(column >= low, column <= high)
+    if any(
+        not calendar.isleap(year) and start <= date(year, 3, 1) <= end
+        for year in {start.year, end.year}
+    ):
+        window = or_(window, column == 229)
+    return window
 
 class MemberService:
     def __init__(self, db: AsyncSession):
@@ -18,12 +69,58 @@ class MemberService:
         result = await self.db.execute(select(Member).filter(Member.tree_id == tree_id))
         return result.scalars().all()
 
+    async def get_member_rows(self, tree_id: int) -> List[Row]:
+        """Read-only `MEMBER_LIST_COLUMNS` rows of a tree, by id. Use for listings, not for writes."""
+        result = await self.db.execute(
+            select(*MEMBER_LIST_COLUMNS).filter(Member.tree_id == tree_id).order_by(Member.id)
+        )
+        return result.all()
+
+    async def get_members_page(self, tree_id: int, after: Optional[int] = None, limit: int = 50) -> Tuple[List[Member], Optional[int]]:
+        """Keyset page of a tree's members by id. Returns (members, next cursor or None)."""
+        stmt = select(Member).filter(Member.tree_id == tree_id).order_by(Member.id).limit(limit + 1)
+        if after is not None:
+            stmt = stmt.filter(Member.id > after)
+        members = (await self.db.execute(stmt)).scalars().all()
+        if len(members) > limit:
+            return members[:limit], members[limit - 1].id
+        return members, None
+
+    async def get_relationships_page(
+        self, tree_id: int, after: Optional[int] = None, limit: int = 50
+    ) -> Tuple[List[Relationship], Optional[int]]:
+        stmt = select(Relationship).filter(Relationship.tree_id == tree_id).order_by(Relationship.id).limit(limit + 1)
+        if after is not None:
+            stmt = stmt.filter(Relationship.id > after)
+        relationships = (await self.db.execute(stmt)).scalars().all()
+        if len(relationships) > limit:
+            return relationships[:limit], relationships[limit - 1].id
+        return relationships, None
+
+    async def get_member_with_events(self, tree_id: int, member_id: int) -> Optional[Member]:
+        result = await self.db.execute(
+            select(Member)
+            .filter(Member.id == member_id, Member.tree_id == tree_id)
+            .options(selectinload(Member.events))
+        )
+        return result.scalars().first()
+
+    async def has_members(self, tree_id: int) -> bool:
+        result = await self.db.execute(select(Member.id).filter(Member.tree_id == tree_id).limit(1))
+        return result.first() is not None
+
     async def get_relationships_by_tree(self, tree_id: int) -> List[Relationship]:
         result = await self.db.execute(select(Relationship).filter(Relationship.tree_id == tree_id))
         return result.scalars().all()
 
+    async def get_relationship_rows(self, tree_id: int) -> List[Row]:
+        """Read-only `RELATIONSHIP_LINK_COLUMNS` rows of a tree."""
+        result = await self.db.execute(select(*RELATIONSHIP_LINK_COLUMNS).filter(Relationship.tree_id == tree_id))
+        return result.all()
+
     async def create_member(
-        self, tree_id: int, name: str, dob: date, gender: Gender, generation_level: int, phone: Optional[str] = None
+        self, tree_id: int, name: str, dob: date, gender: Gender, generation_level: int, phone: Optional[str] = None,
+        commit: bool = True
     ) -> Member:
         member = Member(
             tree_id=tree_id,
@@ -34,14 +131,158 @@ class MemberService:
             phone=phone
         )
         self.db.add(member)
+        if not commit:
+            # Caller owns the transaction; flush so the id is available
+            await self.db.flush()
+            return member
+        # id and created_at come back from INSERT ... RETURNING, no refresh needed
         await self.db.commit()
-        await self.db.refresh(member)
         return member
 
-    async def add_relationship(self, tree_id: int, parent_id: int, child_id: int, relation_type: str = "parent"):
+    async def add_relationship(self, tree_id: int, parent_id: int, child_id: int, relation_type: str = "parent", commit: bool = True):
         relationship = Relationship(tree_id=tree_id, parent_id=parent_id, child_id=child_id, relation_type=relation_type)
         self.db.add(relationship)
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
+
+    async def link_to_relative(self, tree_id: int, member_id: int, relative_id: int, relationship_type: str, commit: bool = True):
+        """
+        Records how `member_id` relates to `relative_id`. Siblings are attached to
+        the relative's parents when known, otherwise linked directly.
+        """
+        if relationship_type == "child":
+            await self.add_relationship(tree_id, relative_id, member_id, "parent", commit=False)
+        elif relationship_type == "parent":
+            await self.add_relationship(tree_id, member_id, relative_id, "parent", commit=False)
+        elif relationship_type == "sibling":
+            parents = await self.get_parents(tree_id, relative_id)
+            if parents:
+                for p_id in parents:
+                    await self.add_relationship(tree_id, p_id, member_id, "parent", commit=False)
+            else:
+                await self.add_relationship(tree_id, relative_id, member_id, "sibling", commit=False)
+        elif relationship_type == "spouse":
+            await self.add_relationship(tree_id, relative_id, member_id, "spouse", commit=False)
+        if commit:
+            await self.db.commit()
+
+    async def bulk_create_members(self, tree_id: int, lines, commit: bool = True) -> List[int]:
+        """
+        Inserts a parsed bulk paste (`BulkMemberLine`s, relatives referenced either
+        by existing id or by earlier line). Costs one query for the referenced
+        relatives, one for their parents, one multi-row INSERT ... RETURNING for
+        the members and one batched INSERT for the relationships, regardless of
+        how many lines were pasted. Raises ValueError before writing anything
+        if a relative is missing.
+        """
+        relative_ids = {l.relative_id for l in lines if l.relative_id is not None}
+        generations = {}
+        if relative_ids:
+            result = await self.db.execute(
+                select(Member.id, Member.generation_level)
+                .filter(Member.tree_id == tree_id, Member.id.in_(relative_ids))
+            )
+            generations = dict(result.all())
+
+        errors = [
+            f"Line {l.line_no}: member {l.relative_id} is not in your tree"
+            for l in lines if l.relative_id is not None and l.relative_id not in generations
+        ]
+        unlinked = [l for l in lines if l.relation is None]
+        if unlinked and await self.has_members(tree_id):
+            errors += [f"Line {l.line_no}: say how this member is related, e.g. child-of 14" for l in unlinked]
+        if errors:
+            raise ValueError("Nothing was added. Please fix:\n" + "\n".join(errors))
+
+        # Siblings of existing members are attached to those members' parents
+        parents_of = defaultdict(list)
+        sibling_of = {
+            l.relative_id for l in lines
+            if l.relative_id is not None and RELATIONS[l.relation].relationship_type == "sibling"
+        }
+        if sibling_of:
+            result = await self.db.execute(
+                select(Relationship.parent_id, Relationship.child_id)
+                .filter(
+                    Relationship.tree_id == tree_id,
+                    Relationship.child_id.in_(sibling_of),
+                    Relationship.relation_type == "parent",
+                )
+            )
+            for parent_id, child_id in result.all():
+                parents_of[child_id].append(parent_id)
+
+        line_generations = {}
+        rows = []
+        for l in lines:
+            spec = RELATIONS[l.relation] if l.relation else None
+            if spec is None:
+                generation = 1
+            elif l.relative_id is not None:
+                generation = generations[l.relative_id] + spec.generation_delta
+            else:
+                generation = line_generations[l.relative_line] + spec.generation_delta
+            line_generations[l.line_no] = generation
+            rows.append({
+                "tree_id": tree_id,
+                "name": l.name,
+                "dob": l.dob,
+                "gender": (spec.gender if spec and spec.gender else l.gender),
+                "generation_level": generation,
+                "phone": l.phone,
+            })
+
+        result = await self.db.execute(
+            insert(Member).returning(Member.id, sort_by_parameter_order=True), rows
+        )
+        ids = result.scalars().all()
+        id_by_line = {l.line_no: member_id for l, member_id in zip(lines, ids)}
+
+        relationships = []
+        def link(parent_id, child_id, relation_type):
+            relationships.append({
+                "tree_id": tree_id, "parent_id": parent_id, "child_id": child_id, "relation_type": relation_type
+            })
+            if relation_type == "parent":
+                parents_of[child_id].append(parent_id)
+
+        for l, member_id in zip(lines, ids):
+            if not l.relation:
+                continue
+            relative_id = l.relative_id if l.relative_id is not None else id_by_line[l.relative_line]
+            relationship_type = RELATIONS[l.relation].relationship_type
+            if relationship_type == "child":
+                link(relative_id, member_id, "parent")
+            elif relationship_type == "parent":
+                link(member_id, relative_id, "parent")
+            elif relationship_type == "sibling":
+                parents = list(parents_of.get(relative_id, []))
+                if parents:
+                    for p_id in parents:
+                        link(p_id, member_id, "parent")
+                else:
+                    link(relative_id, member_id, "sibling")
+            elif relationship_type == "spouse":
+                link(relative_id, member_id, "spouse")
+
+        changes = [
+            {"tree_id": tree_id, "entity": "member", "entity_id": member_id, "op": "create",
+             "data": row_snapshot_dict(row, member_id)}
+            for row, member_id in zip(rows, ids)
+        ]
+        if relationships:
+            result = await self.db.execute(
+                insert(Relationship).returning(Relationship.id, sort_by_parameter_order=True), relationships
+            )
+            changes += [
+                {"tree_id": tree_id, "entity": "relationship", "entity_id": relationship_id, "op": "create",
+                 "data": row_snapshot_dict(row, relationship_id)}
+                for row, relationship_id in zip(relationships, result.scalars().all())
+            ]
+        await insert_changes(self.db, changes)
+        if commit:
+            await self.db.commit()
+        return ids
 
     async def get_parents(self, tree_id: int, child_id: int) -> List[int]:
         result = await self.db.execute(
@@ -50,52 +291,63 @@ class MemberService:
         )
         return result.scalars().all()
 
-    async def update_member(self, member_id: int, **kwargs):
-        member = await self.get_member(member_id)
+    async def _update_returning(self, criteria, values: dict, log: bool = True) -> Optional[Member]:
+        """
+        Single UPDATE ... RETURNING on members; the returned row refreshes any
+        loaded instance. Logs the change feed itself since no flush happens,
+        except for lock-only updates (`log=False`, see `LOCK_COLUMNS`).
+        """
+        result = await self.db.execute(
+            update(Member).filter(*criteria).values(**values).returning(Member),
+            execution_options={"populate_existing": True, "synchronize_session": False},
+        )
+        member = result.scalars().first()
         if member:
-            for key, value in kwargs.items():
-                setattr(member, key, value)
+            if log:
+                await record_changes(self.db, member.tree_id, [("member", "update", row_snapshot(member))])
             await self.db.commit()
-            await self.db.refresh(member)
         return member
 
+    async def update_member(self, member_id: int, **kwargs) -> Optional[Member]:
+        if "dob" in kwargs:
+            # Core UPDATE skips the model's validator
+            kwargs["month_day"] = month_day(kwargs["dob"])
+        return await self._update_returning([Member.id == member_id], kwargs)
+
     async def lock_member(self, member_id: int, user_id: int, duration_minutes: int = 5) -> bool:
-        member = await self.get_member(member_id)
-        if not member:
-            return False
-            
-        now = datetime.now(member.lock_expires_at.tzinfo if member.lock_expires_at else None)
-        
-        # Check if already locked by someone else
-        if member.is_locked and member.locked_by != user_id:
-             if member.lock_expires_at and member.lock_expires_at > now:
-                 return False # Locked by someone else and valid
-        
-        # Lock or renew lock
-        member.is_locked = True
-        member.locked_by = user_id
-        member.lock_expires_at = datetime.now() + timedelta(minutes=duration_minutes)
-        await self.db.commit()
-        return True
+        """
+        Takes or renews the edit lock in one conditional UPDATE, so two editors
+        racing for the same member cannot both win. False if someone else holds it.
+        """
+        now = datetime.now()
+        member = await self._update_returning(
+            [
+                Member.id == member_id,
+                or_(
+                    Member.is_locked.isnot(True),
+                    Member.locked_by == user_id,
+                    Member.lock_expires_at.is_(None),
+                    Member.lock_expires_at <= now,
+                ),
+            ],
+            {"is_locked": True, "locked_by": user_id, "lock_expires_at": now + timedelta(minutes=duration_minutes)},
+            log=False,
+        )
+        return member is not None
 
     async def unlock_member(self, member_id: int, user_id: int) -> bool:
-        member = await self.get_member(member_id)
-        if not member:
-            return False
-            
-        if member.is_locked and member.locked_by == user_id:
-            member.is_locked = False
-            member.locked_by = None
-            member.lock_expires_at = None
-            await self.db.commit()
-            return True
-        return False # Not locked by this user or not locked
+        member = await self._update_returning(
+            [Member.id == member_id, Member.is_locked.is_(True), Member.locked_by == user_id],
+            {"is_locked": False, "locked_by": None, "lock_expires_at": None},
+            log=False,
+        )
+        return member is not None
 
     async def get_member_by_phone(self, phone: str) -> Optional[Member]:
         result = await self.db.execute(select(Member).filter(Member.phone == phone))
         return result.scalars().first()
 
-    async def add_event(self, member_id: int, event_type: str, event_date: date, description: str = None) -> Event:
+    async def add_event(self, member_id: int, event_type: str, event_date: date, description: str = None, commit: bool = True) -> Event:
         event = Event(
             member_id=member_id,
             event_type=event_type,
@@ -103,10 +355,34 @@ class MemberService:
             description=description
         )
         self.db.add(event)
+        if not commit:
+            await self.db.flush()
+            return event
         await self.db.commit()
-        await self.db.refresh(event)
         return event
 
+    async def get_upcoming_dates(self, tree_id: int, start: date, days: int) -> List[UpcomingDate]:
+        """
+        Birthdays and event anniversaries in the tree from `start` to `days` later,
+        soonest first. One query: both halves are range scans on a `month_day` index.
+        """
+        end = start + timedelta(days=days)
+        birthdays = select(
+            Member.name, literal("Birthday").label("kind"), Member.dob.label("original")
+        ).filter(Member.tree_id == tree_id, month_day_window(Member.month_day, start, end))
+        anniversaries = select(
+            Member.name, Event.event_type.label("kind"), Event.event_date.label("original")
+        ).join(Member, Event.member_id == Member.id).filter(
+            Member.tree_id == tree_id, month_day_window(Event.month_day, start, end)
+        )
+        upcoming = []
+        for name, kind, original in (await self.db.execute(union_all(birthdays, anniversaries))).all():
+            on = next_occurrence(original, start)
+            if on <= end:
+                upcoming.append(UpcomingDate(on, name, kind, on.year - original.year))
+        upcoming.sort(key=lambda u: (u.on, u.name))
+        return upcoming
+
     async def get_events(self, member_id: int) -> List[Event]:
         # Using execute/scalars for consistency with other methods, though could use relationship lazy loading if instance available
         result = await self.db.execute(
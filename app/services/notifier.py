@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.models.tree import TreeAccess
+from app.models.user import User
+from app.services.outbound import OutboundMessage, OutboundSender
+
+logger = logging.getLogger(__name__)
+
+# Entities whose edits are worth telling collaborators about
+NOTIFY_ENTITIES = {"member", "relationship", "event"}
+MAX_NAMES = 5
+
+
+def _names(names: List[str]) -> str:
+    shown = ", ".join(names[:MAX_NAMES])
+    return shown + (f" +{len(names) - MAX_NAMES} more" if len(names) > MAX_NAMES else "")
+
+
+@dataclass
+class TreeDigest:
+    """Edits to one tree, collected until its window closes."""
+    tree_id: int
+    first_at: float
+    actors: Set[int] = field(default_factory=set)
+    names: Dict[int, str] = field(default_factory=dict)  # member id -> latest name
+    created: Set[int] = field(default_factory=set)
+    removed: int = 0
+    other: int = 0
+
+    def add(self, change: dict):
+        member_id = change["entity_id"]
+        if change["entity"] != "member":
+            self.other += 1
+        elif change["op"] == "delete":
+            self.names.pop(member_id, None)
+            self.created.discard(member_id)
+            self.removed += 1
+        else:
+            self.names[member_id] = change["data"].get("name")
+            if change["op"] == "create":
+                self.created.add(member_id)
+
+    @property
+    def added(self) -> List[str]:
+        return [name for member_id, name in self.names.items() if member_id in self.created]
+
+    @property
+    def edited(self) -> List[str]:
+        return [name for member_id, name in self.names.items() if member_id not in self.created]
+
+    def text(self) -> str:
+        lines = ["🌳 *Your family tree was updated*"]
+        if self.added:
+            lines.append(f"• Added: {_names(self.added)}")
+        if self.edited:
+            lines.append(f"• Edited: {_names(self.edited)}")
+        if self.removed:
+            lines.append(f"• Removed: {self.removed} member(s)")
+        if self.other:
+            lines.append(f"• {self.other} relationship/event change(s)")
+        lines.append("Send 1 to view the tree, or 'notify off' to stop these messages.")
+        return "\n".join(lines)
+
+
+@dataclass
+class NotifierStats:
+    changes_enqueued: int = 0
+    digests_flushed: int = 0
+    messages_queued: int = 0
+    messages_sent: int = 0
+    messages_failed: int = 0
+    messages_dropped: int = 0
+
+
+class ChangeNotifier:
+    """
+    Fans tree edits out to collaborators who opted in (`User.notify_changes`).
+
+    Committed chat edits are handed over by the `after_commit` hook below.
+    `enqueue` only updates the in-memory digest of the tree, so the webhook
+    never waits on fan-out. Edits to a tree are coalesced for `window_seconds`
+    after the first one, so ten quick edits become one message per recipient.
+    Then `flush_due` resolves the recipients with one query and puts the
+    messages on a bounded queue. `drain` sends them in batches.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        sender: OutboundSender,
+        window_seconds: float = 60.0,
+        batch_size: int = 50,
+        max_queue: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.session_factory = session_factory
+        self.sender = sender
+        self.window_seconds = window_seconds
+        self.batch_size = batch_size
+        self.clock = clock
+        self.pending: Dict[int, TreeDigest] = {}
+        self.queue: "asyncio.Queue[OutboundMessage]" = asyncio.Queue(max_queue)
+        self.stats = NotifierStats()
+
+    def enqueue(self, actor_id: int, changes: List[dict]):
+        for change in changes:
+            if change["entity"] not in NOTIFY_ENTITIES:
+                continue
+            digest = self.pending.get(change["tree_id"])
+            if digest is None:
+                digest = self.pending[change["tree_id"]] = TreeDigest(change["tree_id"], self.clock())
+            digest.actors.add(actor_id)
+            digest.add(change)
+            self.stats.changes_enqueued += 1
+
+    async def flush_due(self, force: bool = False) -> int:
+        """Turns digests whose window has closed into queued messages. Returns the number queued."""
+        cutoff = self.clock() - self.window_seconds
+        due = [d for d in self.pending.values() if force or d.first_at <= cutoff]
+        queued = 0
+        for digest in due:
+            del self.pending[digest.tree_id]
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(User.phone)
+                    .join(TreeAccess, TreeAccess.user_id == User.id)
+                    .filter(
+                        TreeAccess.tree_id == digest.tree_id,
+                        User.notify_changes.is_(True),
+                        User.activated_at.isnot(None),
+                        User.id.notin_(digest.actors),
+                    )
+                )
+                phones = result.scalars().all()
+            body = digest.text()
+            for phone in phones:
+                try:
+                    self.queue.put_nowait(OutboundMessage(phone, body))
+                    queued += 1
+                except asyncio.QueueFull:
+                    self.stats.messages_dropped += 1
+            self.stats.digests_flushed += 1
+        self.stats.messages_queued += queued
+        return queued
+
+    async def _send(self, batch: List[OutboundMessage]):
+        results = await self.sender.send_batch(batch)
+        sent = sum(results)
+        self.stats.messages_sent += sent
+        self.stats.messages_failed += len(batch) - sent
+
+    async def drain(self):
+        """Sends everything currently queued, `batch_size` messages at a time."""
+        while not self.queue.empty():
+            batch = [self.queue.get_nowait() for _ in range(min(self.batch_size, self.queue.qsize()))]
+            await self._send(batch)
+
+    def snapshot(self) -> dict:
+        """Queue metrics: counters plus current depth and age of the oldest open digest."""
+        now = self.clock()
+        oldest = min((d.first_at for d in self.pending.values()), default=now)
+        return {
+            **self.stats.__dict__,
+            "queue_depth": self.queue.qsize(),
+            "pending_trees": len(self.pending),
+            "oldest_pending_seconds": round(now - oldest, 3),
+        }
+
+    async def _flush_loop(self, tick: float):
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self.flush_due()
+            except Exception as e:
+                logger.error(f"Notification flush failed: {e}")
+
+    async def _send_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._send(batch)
+            except Exception as e:
+                self.stats.messages_failed += len(batch)
+                logger.error(f"Notification batch failed: {e}")
+
+    async def run(self):
+        """Background loops started from the app lifespan."""
+        tick = min(5.0, max(0.1, self.window_seconds / 4))
+        await asyncio.gather(self._flush_loop(tick), self._send_loop())
+
+
+_notifier: Optional[ChangeNotifier] = None
+
+
+def get_notifier() -> Optional[ChangeNotifier]:
+    return _notifier
+
+
+def set_notifier(notifier: Optional[ChangeNotifier]):
+    global _notifier
+    _notifier = notifier
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session):
+    edits = session.info.pop("tree_edits", None)
+    if edits and _notifier is not None:
+        _notifier.enqueue(session.info["actor_id"], edits)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("tree_edits", None)
@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable, List, Sequence
+
+from app.config import get_settings
+from app.services.twilio_client import TwilioClient
+
+
+@dataclass(frozen=True)
+class OutboundMessage:
+    to: str    # phone as stored on `User`, without the "whatsapp:" prefix
+    body: str
+
+
+class OutboundSender(ABC):
+    """
+    Delivers bot-initiated WhatsApp messages. `send_batch` never raises for a
+    single bad message; it returns one success flag per message instead.
+    """
+
+    @abstractmethod
+    async def send_batch(self, messages: Sequence[OutboundMessage]) -> List[bool]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class TwilioSender(OutboundSender):
+    """Sends from `from_number` through a shared `TwilioClient` (pooled, rate limited, retrying)."""
+
+    def __init__(self, client: TwilioClient, from_number: str):
+        self.client = client
+        self.from_number = from_number
+
+    async def send_batch(self, messages: Sequence[OutboundMessage]) -> List[bool]:
+        results = await self.client.send_many(self.from_number, [(m.to, m.body) for m in messages])
+        return [result.ok for result in results]
+
+    async def close(self):
+        await self.client.close()
+
+
+class FakeSender(OutboundSender):
+    """Records messages instead of sending them (tests, local runs). Numbers in `fail_to` fail."""
+
+    def __init__(self, fail_to: Iterable[str] = ()):
+        self.sent: List[OutboundMessage] = []
+        self.batches = 0
+        self.fail_to = set(fail_to)
+
+    async def send_batch(self, messages: Sequence[OutboundMessage]) -> List[bool]:
+        self.batches += 1
+        results = []
+        for message in messages:
+            ok = message.to not in self.fail_to
+            if ok:
+                self.sent.append(message)
+            results.append(ok)
+        return results
+
+
+def get_outbound_sender() -> OutboundSender:
+    settings = get_settings()
+    if settings.OUTBOUND_SENDER == "fake":
+        return FakeSender()
+    client = TwilioClient(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_AUTH_TOKEN,
+        base_url=settings.TWILIO_API_URL,
+        rate_per_second=settings.OUTBOUND_RATE_PER_SECOND,
+        burst=settings.OUTBOUND_BURST,
+        max_connections=settings.OUTBOUND_MAX_CONNECTIONS,
+        max_retries=settings.OUTBOUND_MAX_RETRIES,
+    )
+    return TwilioSender(client, settings.TWILIO_PHONE_NUMBER)
@@ -0,0 +1,216 @@
+import asyncio
+import calendar
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, literal, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models.event import Event
+from app.models.member import Member
+from app.models.reminder import ReminderDelivery
+from app.models.tree import TreeAccess
+from app.models.user import User
+from app.services.member_service import UpcomingDate, describe_occasion
+from app.services.outbound import OutboundMessage, OutboundSender
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class ReminderStats:
+    trees: int = 0
+    planned: int = 0
+    sent: int = 0
+    failed: int = 0
+    # Claimed by a run that crashed mid-send; never retried, so nobody gets a message twice
+    abandoned: int = 0
+
+
+def reminder_text(occasions: List[UpcomingDate]) -> str:
+    lines = ["🎂 *Today in your family tree*"]
+    lines += [f"• {describe_occasion(o)}" for o in occasions]
+    return "\n".join(lines)
+
+
+class ReminderService:
+    """
+    Daily birthday / anniversary reminders, in two resumable steps:
+
+    1. `plan` finds today's occasions across all trees with one query on the
+       `month_day` indexes, so the cost follows the matches, not the number
+       of members or events. It writes one `ReminderDelivery` per tree and
+       recipient. Re-planning the same day inserts nothing new.
+    2. `deliver` sends pending rows in batches of `batch_size`. Each batch is
+       claimed (committed as `sending`) before it is handed to the sender.
+    """
+
+    def __init__(self, db: AsyncSession, sender: OutboundSender, batch_size: int = 100):
+        self.db = db
+        self.sender = sender
+        self.batch_size = batch_size
+
+    async def find_occasions(self, day: date) -> Dict[int, List[UpcomingDate]]:
+        """Birthdays and anniversaries falling on `day`, grouped by tree."""
+        keys = [day.month * 100 + day.day]
+        if (day.month, day.day) == (3, 1) and not calendar.isleap(day.year):
+            keys.append(229)  # 29 Feb is celebrated on 1 Mar in other years
+        birthdays = select(
+            Member.tree_id, Member.name, literal("Birthday").label("kind"), Member.dob.label("original")
+        ).filter(Member.month_day.in_(keys))
+        anniversaries = select(
+            Member.tree_id, Member.name, Event.event_type.label("kind"), Event.event_date.label("original")
+        ).join(Member, Event.member_id == Member.id).filter(Event.month_day.in_(keys))
+
+        occasions = defaultdict(list)
+        for tree_id, name, kind, original in (await self.db.execute(union_all(birthdays, anniversaries))).all():
+            occasions[tree_id].append(UpcomingDate(day, name, kind, day.year - original.year))
+        for tree_occasions in occasions.values():
+            tree_occasions.sort(key=lambda o: (o.kind != "Birthday", o.name))
+        return occasions
+
+    async def _planned_rows(self, day: date, stats: ReminderStats) -> List[dict]:
+        """One outbox row per tree with an occasion on `day` and recipient."""
+        occasions = await self.find_occasions(day)
+        if not occasions:
+            return []
+        # Only people who have talked to the bot can be messaged first
+        result = await self.db.execute(
+            select(TreeAccess.tree_id, TreeAccess.user_id)
+            .join(User, User.id == TreeAccess.user_id)
+            .filter(TreeAccess.tree_id.in_(occasions), User.activated_at.isnot(None))
+        )
+        stats.trees += len(occasions)
+        return [
+            {"reminder_date": day, "tree_id": tree_id, "user_id": user_id, "body": reminder_text(occasions[tree_id])}
+            for tree_id, user_id in result.all()
+        ]
+
+    async def plan(self, day: date, stats: ReminderStats) -> ReminderStats:
+        rows = await self._planned_rows(day, stats)
+        if rows:
+            insert = dialect_insert(self.db)
+            await self.db.execute(
+                insert(ReminderDelivery).on_conflict_do_nothing(
+                    index_elements=["reminder_date", "tree_id", "user_id"]
+                ),
+                rows,
+            )
+            await self.db.commit()
+            stats.planned += len(rows)
+        return stats
+
+    async def preview(self, day: date) -> Tuple[ReminderStats, List[OutboundMessage]]:
+        """
+        The messages `run(day)` would send now, without writing anything: planned
+        rows not in the outbox yet plus the ones still pending. For dry runs.
+        """
+        stats = ReminderStats()
+        planned = {(row["tree_id"], row["user_id"]): row["body"] for row in await self._planned_rows(day, stats)}
+        result = await self.db.execute(
+            select(ReminderDelivery.tree_id, ReminderDelivery.user_id, ReminderDelivery.status, ReminderDelivery.body)
+            .filter(ReminderDelivery.reminder_date == day)
+        )
+        outbox = {(tree_id, user_id): (status, body) for tree_id, user_id, status, body in result.all()}
+        due = [(key, body) for key, body in planned.items() if key not in outbox]
+        stats.planned = len(due)
+        due += [(key, body) for key, (status, body) in outbox.items() if status == "pending"]
+        due.sort()
+
+        user_ids = {user_id for (_, user_id), _ in due}
+        phones = dict((await self.db.execute(select(User.id, User.phone).filter(User.id.in_(user_ids)))).all())
+        return stats, [OutboundMessage(phones[user_id], body) for (_, user_id), body in due]
+
+    async def _set_status(self, ids: List[int], status: str, **values):
+        if ids:
+            await self.db.execute(
+                update(ReminderDelivery).filter(ReminderDelivery.id.in_(ids)).values(status=status, **values)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _claim_batch(self, day: date) -> List:
+        """
+        Moves up to `batch_size` pending rows to `sending` in one statement and
+        returns only those rows. Every worker runs the daily loop, so the claim
+        re-checks `status` (and skips rows another worker has locked on
+        PostgreSQL): a row can be claimed, and sent, by one worker only.
+        """
+        pending = (
+            select(ReminderDelivery.id)
+            .filter(ReminderDelivery.reminder_date == day, ReminderDelivery.status == "pending")
+            .order_by(ReminderDelivery.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        phone = select(User.phone).filter(User.id == ReminderDelivery.user_id).scalar_subquery()
+        result = await self.db.execute(
+            update(ReminderDelivery)
+            .filter(ReminderDelivery.id.in_(pending), ReminderDelivery.status == "pending")
+            .values(status="sending")
+            .returning(ReminderDelivery.id, phone.label("phone"), ReminderDelivery.body)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(result.all(), key=lambda row: row.id)
+
+    async def deliver(self, day: date, stats: ReminderStats) -> ReminderStats:
+        while True:
+            # Claim first: if the process dies while sending, this batch is not sent again
+            batch = await self._claim_batch(day)
+            await self.db.commit()
+            if not batch:
+                break
+
+            results = await self.sender.send_batch([OutboundMessage(row.phone, row.body) for row in batch])
+            sent = [row.id for row, ok in zip(batch, results) if ok]
+            failed = [row.id for row, ok in zip(batch, results) if not ok]
+            await self._set_status(sent, "sent", sent_at=datetime.now(timezone.utc))
+            await self._set_status(failed, "failed")
+            await self.db.commit()
+            stats.sent += len(sent)
+            stats.failed += len(failed)
+
+        stats.abandoned = (await self.db.execute(
+            select(func.count()).select_from(ReminderDelivery)
+            .filter(ReminderDelivery.reminder_date == day, ReminderDelivery.status == "sending")
+        )).scalar()
+        return stats
+
+    async def run(self, day: date) -> ReminderStats:
+        stats = ReminderStats()
+        await self.plan(day, stats)
+        await self.deliver(day, stats)
+        logger.info(
+            f"Reminders for {day}: {stats.trees} trees, {stats.planned} planned, "
+            f"{stats.sent} sent, {stats.failed} failed, {stats.abandoned} abandoned"
+        )
+        return stats
+
+
+def next_run_at(now: datetime, hour: int) -> datetime:
+    run_at = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    return run_at if run_at > now else run_at + timedelta(days=1)
+
+
+async def run_daily_reminders(session_factory, sender: OutboundSender, hour: int):
+    """
+    Background loop started from the app lifespan. On startup it catches up on
+    today's run if `hour` (UTC) has already passed. Planning and delivery are
+    idempotent, so a restart never sends the same reminder twice.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        if now.hour >= hour:
+            try:
+                async with session_factory() as session:
+                    await ReminderService(session, sender, settings.REMINDER_BATCH_SIZE).run(now.date())
+            except Exception as e:
+                logger.error(f"Reminder run failed: {e}")
+        now = datetime.now(timezone.utc)
+        await asyncio.sleep((next_run_at(now, hour) - now).total_seconds())
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.user import User
+from app.services.user_service import UserService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ConversationState(NamedTuple):
+    state: Optional[str]
+    data: Dict[str, Any]
+
+
+EMPTY_STATE = ConversationState(None, {})
+
+
+def as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they were written as UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def is_state_expired(state_updated_at: Optional[datetime], ttl_seconds: float) -> bool:
+    if state_updated_at is None:
+        return False
+    return datetime.now(timezone.utc) - as_utc(state_updated_at) > timedelta(seconds=ttl_seconds)
+
+
+def state_from_row(user: User) -> ConversationState:
+    """State stored on the `users` row, or an empty state once it is older than `STATE_TTL_SECONDS`."""
+    if is_state_expired(user.state_updated_at, settings.STATE_TTL_SECONDS):
+        return EMPTY_STATE
+    return ConversationState(user.current_state, user.state_data or {})
+
+
+class ConversationStateStore(ABC):
+    """
+    Where the FSM keeps each user's `current_state` / `state_data`.
+
+    `get` receives the already-loaded `User` row so that backends which keep
+    state on the row never need an extra query. `set` with `data=None` keeps
+    the existing data, mirroring `UserService.update_state`.
+    """
+
+    @abstractmethod
+    async def get(self, user: User) -> ConversationState:
+        ...
+
+    @abstractmethod
+    async def set(self, user_id: int, state: Optional[str], data: Dict[str, Any] = None):
+        ...
+
+    async def clear(self, user_id: int):
+        await self.set(user_id, None, {})
+
+    async def close(self):
+        pass
+
+
+class DatabaseStateStore(ConversationStateStore):
+    """Stores state on the `users` row, one commit per transition (original behaviour)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.user_service = UserService(db)
+
+    async def get(self, user: User) -> ConversationState:
+        return state_from_row(user)
+
+    async def set(self, user_id: int, state: Optional[str], data: Dict[str, Any] = None):
+        await self.user_service.update_state(user_id, state, data)
+
+
+class InMemoryStateStore(ConversationStateStore):
+    """
+    Process-local store with a sliding TTL. State is lost on restart, so this is
+    only suitable for single-worker deployments and tests.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: Dict[int, tuple] = {}
+
+    async def get(self, user: User) -> ConversationState:
+        entry = self._entries.get(user.id)
+        if entry is None:
+            return EMPTY_STATE
+        state, data, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[user.id]
+            return EMPTY_STATE
+        return ConversationState(state, data)
+
+    async def set(self, user_id: int, state: Optional[str], data: Dict[str, Any] = None):
+        if data is None:
+            entry = self._entries.get(user_id)
+            data = entry[1] if entry else {}
+        self._entries[user_id] = (state, data, self.clock() + self.ttl_seconds)
+
+    async def clear(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def purge_expired(self) -> int:
+        now = self.clock()
+        expired = [uid for uid, entry in self._entries.items() if entry[2] <= now]
+        for uid in expired:
+            del self._entries[uid]
+        return len(expired)
+
+
+class CachedState(NamedTuple):
+    value: ConversationState
+    updated_at: Optional[datetime]  # the `state_updated_at` this value was written with
+
+
+class WriteBehindStateStore(ConversationStateStore):
+    """
+    Serves reads and writes from memory and flushes dirty states to the `users`
+    table in one batched UPDATE every `flush_interval_ms`.
+
+    Only the latest value per user is written, so a user stepping through five
+    states between flushes costs one row update instead of five commits.
+    `close()` performs a final flush; nothing is lost on a clean shutdown.
+
+    Cached states expire after `ttl_seconds` like rows do (and as the GC resets
+    them). A cached state is also dropped when the loaded user row carries a
+    newer `state_updated_at`, i.e. something else wrote it. The cache is still
+    per process: another worker's writes are only seen once flushed, and a
+    state it clears may be served from here until it expires, so this backend
+    needs a single worker.
+    """
+
+    def __init__(self, session_factory, flush_interval_ms: int = 200, max_entries: int = 10000, ttl_seconds: float = 86400):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, CachedState]" = OrderedDict()
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flush_count = 0
+        self.hits = 0
+        self.misses = 0  # read from the loaded user row instead
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"State flush failed: {e}")
+
+    def _is_current(self, cached: CachedState, user: User) -> bool:
+        if is_state_expired(cached.updated_at, self.ttl_seconds):
+            return False
+        row_at = user.state_updated_at
+        return row_at is None or cached.updated_at is None or as_utc(row_at) <= as_utc(cached.updated_at)
+
+    async def get(self, user: User) -> ConversationState:
+        cached = self._entries.get(user.id)
+        if cached is not None and self._is_current(cached, user):
+            self.hits += 1
+            self._entries.move_to_end(user.id)
+            return cached.value
+        self.misses += 1
+        loaded = state_from_row(user)
+        self._remember(user.id, CachedState(loaded, user.state_updated_at))
+        return loaded
+
+    async def set(self, user_id: int, state: Optional[str], data: Dict[str, Any] = None):
+        now = datetime.now(timezone.utc)
+        pending = self._pending.setdefault(user_id, {})
+        pending["current_state"] = state
+        pending["state_updated_at"] = now
+        cached = self._entries.get(user_id)
+        if data is not None:
+            pending["state_data"] = data
+        else:
+            data = cached.value.data if cached is not None else {}
+        self._remember(user_id, CachedState(ConversationState(state, data), now))
+        self.start()
+
+    def _remember(self, user_id: int, value: CachedState):
+        self._entries[user_id] = value
+        self._entries.move_to_end(user_id)
+        # Evict least recently used entries that have nothing left to flush
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            if oldest in self._pending:
+                break
+            del self._entries[oldest]
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+            # Rows with the same set of columns can share one executemany
+            groups: Dict[tuple, list] = {}
+            for user_id, values in batch.items():
+                groups.setdefault(tuple(sorted(values)), []).append({"id": user_id, **values})
+
+            try:
+                async with self.session_factory() as session:
+                    for rows in groups.values():
+                        await session.execute(update(User), rows)
+                    await session.commit()
+            except Exception:
+                # Put the batch back unless a newer value arrived meanwhile
+                for user_id, values in batch.items():
+                    newer = self._pending.get(user_id, {})
+                    self._pending[user_id] = {**values, **newer}
+                raise
+
+            self.flush_count += 1
+            return len(batch)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+_shared_store: Optional[ConversationStateStore] = None
+
+
+def get_state_store(db: AsyncSession) -> ConversationStateStore:
+    """Returns the store selected by `STATE_STORE_BACKEND` (database, memory or write_behind)."""
+    global _shared_store
+    backend = settings.STATE_STORE_BACKEND
+    if backend == "database":
+        return DatabaseStateStore(db)
+
+    if _shared_store is None:
+        if backend == "memory":
+            _shared_store = InMemoryStateStore(ttl_seconds=settings.STATE_TTL_SECONDS)
+        elif backend == "write_behind":
+            from app.database import AsyncSessionLocal
+            _shared_store = WriteBehindStateStore(
+                AsyncSessionLocal, flush_interval_ms=settings.STATE_FLUSH_INTERVAL_MS,
+                ttl_seconds=settings.STATE_TTL_SECONDS,
+            )
+        else:
+            raise ValueError(f"Unknown STATE_STORE_BACKEND: {backend}")
+    return _shared_store
+
+
+def get_shared_state_store() -> Optional[ConversationStateStore]:
+    """The process-wide store, if one has been created (None for the database backend)."""
+    return _shared_store
+
+
+async def close_state_store():
+    global _shared_store
+    if _shared_store is not None:
+        await _shared_store.close()
+        _shared_store = None
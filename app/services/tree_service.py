@@ -1,117 +1,259 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Boolean, and_, case, delete, func, literal_column, or_, update
+from sqlalchemy.orm import lazyload
 from app.models.tree import Tree, TreeAccess, Role
 from app.models.user import User
 from app.models.member import Member, Relationship
+from app.models.change import TreeChange
+from app.models.event import Event
+from app.models.reminder import ReminderDelivery
+from app.models.versioning import record_changes, row_snapshot, row_snapshot_dict
+from app.database import dialect_insert
 from typing import Optional, List, Tuple
-from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class TreeService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create_tree(self, owner: User) -> Tree:
+    async def create_tree(self, owner: User, commit: bool = True) -> Tree:
         tree = Tree(owner_id=owner.id)
         self.db.add(tree)
         
         # Add owner to access list with OWNER role
         access = TreeAccess(tree=tree, user=owner, role=Role.OWNER)
         self.db.add(access)
-        
+
+        if not commit:
+            await self.db.flush()
+            return tree
+        # id and server defaults are filled in by INSERT ... RETURNING, no refresh needed
         await self.db.commit()
-        await self.db.refresh(tree)
         return tree
 
-    async def get_tree_by_owner(self, owner_id: int) -> Optional[Tree]:
-        result = await self.db.execute(
-            select(Tree)
-            .filter(Tree.owner_id == owner_id)
-            .options(selectinload(Tree.members))
-        )
-        return result.scalars().first()
+    async def get_tree_version(self, tree_id: int) -> Optional[int]:
+        result = await self.db.execute(select(Tree.version).filter(Tree.id == tree_id))
+        return result.scalar()
 
-    async def get_tree_by_id(self, tree_id: int) -> Optional[Tree]:
-         result = await self.db.execute(
-            select(Tree)
+    async def get_tree_summary(self, tree_id: int) -> Optional[Tuple[Tree, int, int]]:
+        """Returns (Tree, member count, relationship count) without loading members."""
+        member_count = select(func.count(Member.id)).filter(Member.tree_id == Tree.id).scalar_subquery()
+        relationship_count = (
+            select(func.count(Relationship.id)).filter(Relationship.tree_id == Tree.id).scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(Tree, member_count, relationship_count)
             .filter(Tree.id == tree_id)
-            .options(selectinload(Tree.members))
+            .options(lazyload(Tree.owner))
         )
-         return result.scalars().first()
+        return result.first()
 
-    async def get_active_tree(self, user_id: int) -> Tuple[Optional[Tree], Optional[Role]]:
+    async def get_changes(
+        self, tree_id: int, since: int = 0, limit: int = 100
+    ) -> Tuple[List[TreeChange], bool, int]:
         """
-        Get the tree that the user either owns or has access to (viewer/editor).
-        Returns (Tree, Role) or (None, None).
+        Change-feed entries after sequence `since`. Returns (changes, has_more,
+        floor). When `since` is below the tree's compaction floor the entries
+        are incomplete and the caller has to resync from scratch instead.
         """
-        # 1. Check owned
-        owned = await self.get_tree_by_owner(user_id)
-        if owned:
-             return owned, Role.OWNER
-        
-        # 2. Check shared
+        floor = (await self.db.execute(select(Tree.change_floor).filter(Tree.id == tree_id))).scalar() or 0
+        if since < floor:
+            return [], False, floor
         result = await self.db.execute(
-            select(TreeAccess)
-            .filter(TreeAccess.user_id == user_id)
-            .options(selectinload(TreeAccess.tree).selectinload(Tree.members))
+            select(TreeChange)
+            .filter(TreeChange.tree_id == tree_id, TreeChange.seq > since)
+            .order_by(TreeChange.seq)
+            .limit(limit + 1)
         )
-        access = result.scalars().first()
-        if access:
-             return access.tree, access.role
-             
-        return None, None
-
-    async def grant_access(self, tree_id: int, user_id: int, role: Role = Role.VIEWER):
-        # Check if access already exists
-        result = await self.db.execute(
-            select(TreeAccess).filter(TreeAccess.tree_id == tree_id, TreeAccess.user_id == user_id)
+        changes = result.scalars().all()
+        return changes[:limit], len(changes) > limit, floor
+
+    async def get_latest_change_seq(self, tree_id: int) -> int:
+        result = await self.db.execute(select(func.max(TreeChange.seq)).filter(TreeChange.tree_id == tree_id))
+        return result.scalar() or 0
+
+    async def get_tree_and_role(
+        self, user_id: int, member_id: Optional[int] = None
+    ) -> Tuple[Optional[Tree], Optional[Role], Optional[Member]]:
+        """
+        The tree the user owns or else one shared with them, and their role, in a
+        single query that skips loading members. When `member_id` is given the
+        member is joined in as well, but only if it belongs to the same tree.
+        Returns (Tree, Role, Member) with Nones for anything not found.
+        """
+        stmt = (
+            select(Tree, TreeAccess.role)
+            .join(TreeAccess, TreeAccess.tree_id == Tree.id)
+            .filter(TreeAccess.user_id == user_id)
+            # Prefer the owned tree over shared ones
+            .order_by(case((Tree.owner_id == user_id, 0), else_=1))
+            .limit(1)
+            .options(lazyload(Tree.owner))
         )
-        access = result.scalars().first()
-        if access:
-            if access.role != role:
-                access.role = role
-                await self.db.commit()
-            return access
-        
-        access = TreeAccess(tree_id=tree_id, user_id=user_id, role=role)
-        self.db.add(access)
-        await self.db.commit()
-        return access
+        if member_id is not None:
+            stmt = stmt.add_columns(Member).outerjoin(
+                Member, and_(Member.id == member_id, Member.tree_id == Tree.id)
+            )
+        row = (await self.db.execute(stmt)).first()
+        if not row:
+            return None, None, None
+
+        tree, role = row[0], row[1]
+        member = row[2] if member_id is not None else None
+        if tree.owner_id == user_id:
+            role = Role.OWNER
+        return tree, role, member
+
+    async def _upsert_access(self, tree_id: int, grants: List[Tuple[int, Role]], overwrite: bool = True):
+        """
+        Writes (user_id, role) grants for a tree in one INSERT ... ON CONFLICT on
+        (tree_id, user_id). With `overwrite=False` existing grants are left alone.
+        Returns change-feed entries for the rows actually written: `create` for
+        new grants, `update` for changed ones.
+        """
+        upsert = dialect_insert(self.db)
+        stmt = upsert(TreeAccess).values([
+            {"tree_id": tree_id, "user_id": user_id, "role": role} for user_id, role in grants
+        ])
+        returning = [TreeAccess.id, TreeAccess.user_id, TreeAccess.role]
+        existing = set()
+        if not overwrite:
+            # DO NOTHING returns only the rows it inserted
+            stmt = stmt.on_conflict_do_nothing(index_elements=["tree_id", "user_id"])
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["tree_id", "user_id"], set_={"role": stmt.excluded.role}
+            )
+            if self.db.get_bind().dialect.name == "postgresql":
+                # xmax is 0 only on a row version this statement inserted
+                returning.append(literal_column("xmax = 0", Boolean))
+            else:
+                result = await self.db.execute(
+                    select(TreeAccess.user_id).filter(
+                        TreeAccess.tree_id == tree_id, TreeAccess.user_id.in_([user_id for user_id, _ in grants])
+                    )
+                )
+                existing = set(result.scalars().all())
+        result = await self.db.execute(stmt.returning(*returning))
+        changes = []
+        for row in result.all():
+            access_id, user_id, role = row[:3]
+            created = row[3] if len(row) > 3 else user_id not in existing
+            changes.append((
+                "access", "create" if created else "update",
+                row_snapshot_dict({"tree_id": tree_id, "user_id": user_id, "role": role}, access_id),
+            ))
+        return changes
+
+    async def grant_access(self, tree_id: int, user_id: int, role: Role = Role.VIEWER, commit: bool = True):
+        """Creates or updates the user's access with a single upsert."""
+        await record_changes(self.db, tree_id, await self._upsert_access(tree_id, [(user_id, role)]))
+        if commit:
+            await self.db.commit()
 
     async def transfer_ownership(self, tree: Tree, new_owner: User):
+        """
+        Hands the tree to `new_owner` and demotes the old owner to editor in one
+        transaction: one UPDATE, one two-row access upsert and the change log.
+        """
         old_owner_id = tree.owner_id
-        
-        # Update tree owner
-        tree.owner_id = new_owner.id
-        
-        # Update old owner to Editor
-        await self.grant_access(tree.id, old_owner_id, Role.EDITOR)
-        
-        # Update new owner to Owner in access list (or just ensure they have access)
-        # Usually owner is implicit, but we track in access list too
-        await self.grant_access(tree.id, new_owner.id, Role.OWNER)
-        
+        await self.db.execute(update(Tree).filter(Tree.id == tree.id).values(owner_id=new_owner.id))
+        changes = await self._upsert_access(tree.id, [(old_owner_id, Role.EDITOR), (new_owner.id, Role.OWNER)])
+        await record_changes(self.db, tree.id, [("tree", "update", row_snapshot(tree))] + changes)
         await self.db.commit()
 
-    async def delete_tree(self, tree: Tree):
-        # Cascading delete should handle members and access list if configured
-        await self.db.delete(tree)
+    async def share_with_phones(self, tree_id: int, phones: List[str], role: Role = Role.VIEWER) -> Tuple[int, int]:
+        """
+        Invites many people at once: one INSERT ... ON CONFLICT DO NOTHING creates
+        any missing users, one SELECT reads all their ids and one more
+        INSERT ... ON CONFLICT DO NOTHING grants access. People who already have
+        access keep their current role. Returns (granted, already_had_access).
+        """
+        phones = list(dict.fromkeys(phones))
+        upsert = dialect_insert(self.db)
+        await self.db.execute(
+            upsert(User).values([{"phone": phone} for phone in phones]).on_conflict_do_nothing(index_elements=["phone"])
+        )
+        # Existing users are read back rather than rewritten by a no-op DO UPDATE
+        user_ids = (await self.db.execute(select(User.id).filter(User.phone.in_(phones)))).scalars().all()
+
+        granted = await self._upsert_access(tree_id, [(user_id, role) for user_id in user_ids], overwrite=False)
+        await record_changes(self.db, tree_id, granted)
         await self.db.commit()
+        return len(granted), len(user_ids) - len(granted)
 
-    async def is_member_locked(self, member_id: int) -> bool:
-        result = await self.db.execute(select(Member).filter(Member.id == member_id))
-        member = result.scalars().first()
-        if not member:
-            return False
-        
-        if member.is_locked and member.lock_expires_at > datetime.now(member.lock_expires_at.tzinfo):
-             return True
-        
-        # Auto-unlock if expired
-        if member.is_locked:
-             member.is_locked = False
-             member.locked_by = None
-             member.lock_expires_at = None
-             await self.db.commit()
-             
-        return False
+    async def delete_tree(self, tree_id: int, commit: bool = True):
+        """
+        Deletes a tree and everything in it with one set-based DELETE per table,
+        instead of the ORM cascade that loads every member, relationship and event.
+        """
+        member_ids = select(Member.id).filter(Member.tree_id == tree_id)
+        for stmt in (
+            delete(Event).filter(Event.member_id.in_(member_ids)),
+            delete(Relationship).filter(Relationship.tree_id == tree_id),
+            delete(Member).filter(Member.tree_id == tree_id),
+            delete(TreeChange).filter(TreeChange.tree_id == tree_id),
+            delete(ReminderDelivery).filter(ReminderDelivery.tree_id == tree_id),
+            delete(TreeAccess).filter(TreeAccess.tree_id == tree_id),
+            delete(Tree).filter(Tree.id == tree_id),
+        ):
+            await self.db.execute(stmt.execution_options(synchronize_session=False))
+        if commit:
+            await self.db.commit()
+
+    async def detach_tree(self, tree_id: int):
+        """
+        First step of a background delete: the tree loses its owner and access
+        list right away, so nobody sees it any more and the owner can start a new
+        one. A tree without owner and access is what `purge_detached_trees` sweeps.
+        """
+        await self.db.execute(
+            delete(TreeAccess).filter(TreeAccess.tree_id == tree_id).execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            update(Tree).filter(Tree.id == tree_id).values(owner_id=None).execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def delete_tree_in_chunks(self, tree_id: int, batch_size: int = 1000) -> int:
+        """
+        Deletes a (detached) tree `batch_size` members at a time, committing per
+        chunk so no transaction grows with the tree. Safe to resume after a crash.
+        Returns the number of members deleted.
+        """
+        deleted = 0
+        while True:
+            result = await self.db.execute(
+                select(Member.id).filter(Member.tree_id == tree_id).order_by(Member.id).limit(batch_size)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                break
+            for stmt in (
+                delete(Event).filter(Event.member_id.in_(ids)),
+                delete(Relationship).filter(
+                    Relationship.tree_id == tree_id,
+                    or_(Relationship.parent_id.in_(ids), Relationship.child_id.in_(ids)),
+                ),
+                delete(Member).filter(Member.id.in_(ids)),
+            ):
+                await self.db.execute(stmt.execution_options(synchronize_session=False))
+            await self.db.commit()
+            deleted += len(ids)
+
+        # Whatever is left (change log, stray relationships) goes in one go
+        await self.delete_tree(tree_id)
+        return deleted
+
+
+async def delete_tree_in_background(session_factory, tree_id: int, batch_size: int):
+    """Runs `delete_tree_in_chunks` on its own session; GC finishes the job if this dies."""
+    try:
+        async with session_factory() as session:
+            deleted = await TreeService(session).delete_tree_in_chunks(tree_id, batch_size)
+        logger.info(f"Tree {tree_id} deleted in background ({deleted} members)")
+    except Exception as e:
+        logger.error(f"Background delete of tree {tree_id} failed: {e}")
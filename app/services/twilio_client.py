@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_URL = "https://api.twilio.com"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def whatsapp_address(number: str) -> str:
+    """`+1555...` or `whatsapp:+1555...` -> `whatsapp:+1555...`."""
+    return number if number.startswith("whatsapp:") else f"whatsapp:{number}"
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    status_code: Optional[int] = None
+    sid: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+class TwilioClient:
+    """
+    Async client for Twilio's Messages API.
+
+    -   One `httpx.AsyncClient` is shared by every send, so connections are
+        kept alive and reused (at most `max_connections`).
+    -   Each sender number has its own token bucket (`rate_per_second`, bursts
+        of `burst`), matching Twilio's per-number throughput limits.
+    -   429 and 5xx responses and transport errors are retried up to
+        `max_retries` times with full-jitter exponential backoff. A 429's
+        `Retry-After` header is honoured. Other 4xx responses fail at once.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        base_url: str = TWILIO_API_URL,
+        rate_per_second: float = 10.0,
+        burst: Optional[float] = None,
+        max_connections: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.path = f"/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Callers queue here rather than inside httpx, whose pool wait counts against the timeout
+        self._in_flight = asyncio.Semaphore(max_connections)
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(account_sid, auth_token),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    def _bucket(self, from_number: str) -> TokenBucket:
+        if from_number not in self._buckets:
+            self._buckets[from_number] = TokenBucket(self.rate_per_second, self.burst)
+        return self._buckets[from_number]
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    async def send(self, from_number: str, to: str, body: str) -> SendResult:
+        from_number, to = whatsapp_address(from_number), whatsapp_address(to)
+        bucket = self._bucket(from_number)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            response = None
+            try:
+                async with self._in_flight:
+                    response = await self._http.post(self.path, data={"From": from_number, "To": to, "Body": body})
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 300:
+                    return SendResult(True, response.status_code, response.json().get("sid"), attempts=attempt + 1)
+                error = response.text
+                if response.status_code not in RETRY_STATUSES:
+                    return SendResult(False, response.status_code, error=error, attempts=attempt + 1)
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, response))
+        logger.warning(f"Giving up on message to {to} after {self.max_retries + 1} attempts: {error}")
+        return SendResult(False, response.status_code if response is not None else None,
+                          error=error, attempts=self.max_retries + 1)
+
+    async def send_many(self, from_number: str, messages: Sequence[Tuple[str, str]]) -> List[SendResult]:
+        """Sends (to, body) pairs concurrently; pacing comes from the number's bucket and the pool size."""
+        return list(await asyncio.gather(*(self.send(from_number, to, body) for to, body in messages)))
+
+    async def close(self):
+        await self._http.aclose()
@@ -1,7 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
 from sqlalchemy.future import select
 from app.models.user import User
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
 
 class UserService:
     def __init__(self, db: AsyncSession):
@@ -11,29 +13,46 @@ class UserService:
         result = await self.db.execute(select(User).filter(User.phone == phone))
         return result.scalars().first()
 
-    async def create_user(self, phone: str, name: Optional[str] = None) -> User:
-        user = User(phone=phone, name=name)
+    async def create_user(self, phone: str, name: Optional[str] = None, active: bool = False) -> User:
+        user = User(phone=phone, name=name, activated_at=datetime.now(timezone.utc) if active else None)
         self.db.add(user)
+        # id and created_at come back from INSERT ... RETURNING, no refresh needed
         await self.db.commit()
-        await self.db.refresh(user)
         return user
 
-    async def update_state(self, user_id: int, state: str, data: Dict[str, Any] = None):
-        result = await self.db.execute(select(User).filter(User.id == user_id))
+    async def update_state(self, user_id: int, state: str, data: Dict[str, Any] = None) -> Optional[User]:
+        """One UPDATE ... RETURNING; a loaded `User` for this id is refreshed from the returned row."""
+        values = {"current_state": state, "state_updated_at": datetime.now(timezone.utc)}
+        if data is not None:
+            values["state_data"] = data
+        result = await self.db.execute(
+            update(User).filter(User.id == user_id).values(**values).returning(User),
+            execution_options={"populate_existing": True, "synchronize_session": False},
+        )
         user = result.scalars().first()
-        if user:
-            user.current_state = state
-            if data is not None:
-                user.state_data = data
-            await self.db.commit()
-            await self.db.refresh(user)
+        await self.db.commit()
         return user
     
+    async def set_notify_changes(self, user_id: int, enabled: bool):
+        await self.db.execute(update(User).filter(User.id == user_id).values(notify_changes=enabled))
+        await self.db.commit()
+
+    async def set_pending_reply(self, user_id: int, parts: Optional[List[str]]):
+        await self.db.execute(update(User).filter(User.id == user_id).values(pending_reply=parts or None))
+        await self.db.commit()
+
     async def clear_state(self, user_id: int):
         await self.update_state(user_id, None, {})
 
-    async def get_or_create_user(self, phone: str, name: Optional[str] = None) -> User:
+    async def get_or_create_user(self, phone: str, name: Optional[str] = None, active: bool = False) -> User:
+        """
+        `active=True` marks the user as someone who has messaged the bot. Users created
+        only as share/transfer targets stay inactive and are eligible for archiving.
+        """
         user = await self.get_user_by_phone(phone)
         if not user:
-            user = await self.create_user(phone, name)
+            user = await self.create_user(phone, name, active=active)
+        elif active and user.activated_at is None:
+            user.activated_at = datetime.now(timezone.utc)
+            await self.db.commit()
         return user
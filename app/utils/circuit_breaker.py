@@ -0,0 +1,76 @@
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class BreakerStats:
+    failures: int = 0
+    opened: int = 0
+    rejected: int = 0
+    trials: int = 0
+
+
+class CircuitBreaker:
+    """
+    Closed: everything is allowed, and consecutive failures are counted.
+    `failure_threshold` of them in a row open the breaker. While open,
+    `allow()` refuses at once. After `reset_timeout` seconds it goes
+    half-open and lets `half_open_trials` callers through. A success closes
+    it again and a failure re-opens it. If the trials never report back, new
+    trials are allowed after another `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        half_open_trials: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_trials = half_open_trials
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.changed_at = clock()
+        self.trials_started = 0
+        self.stats = BreakerStats()
+
+    def _move(self, state: str):
+        self.state = state
+        self.changed_at = self.clock()
+        self.trials_started = 0
+        if state == OPEN:
+            self.stats.opened += 1
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.clock() - self.changed_at >= self.reset_timeout:
+            self._move(HALF_OPEN)
+        if self.state == HALF_OPEN and self.trials_started < self.half_open_trials:
+            self.trials_started += 1
+            self.stats.trials += 1
+            return True
+        self.stats.rejected += 1
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self._move(CLOSED)
+
+    def record_failure(self):
+        self.stats.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self._move(OPEN)
+
+    def snapshot(self) -> dict:
+        return {**self.stats.__dict__, "state": self.state, "consecutive_failures": self.consecutive_failures}
@@ -0,0 +1,176 @@
+import csv
+import shlex
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Set, Union
+from app.models.member import Gender, RELATIONS
+from app.utils.validators import validate_dob, validate_gender
+
+ADD_USAGE = 'Usage: add "Name" DD-MM-YYYY M/F/O [child-of ID] [+phone]'
+EVENT_USAGE = "Usage: event MEMBER_ID Type DD-MM-YYYY"
+BULK_USAGE = (
+    "Usage: send 'bulk' on the first line, then one member per line:\n"
+    "Name, DD-MM-YYYY, M/F/O, child-of ID (or child-of #LINE for an earlier line), +phone"
+)
+MAX_BULK_ERRORS = 10
+
+@dataclass
+class AddMemberCommand:
+    name: str
+    dob: date
+    gender: Gender
+    relation: Optional[str] = None
+    relative_id: Optional[int] = None
+    phone: Optional[str] = None
+
+@dataclass
+class AddEventCommand:
+    member_id: int
+    event_type: str
+    event_date: date
+
+@dataclass
+class BulkMemberLine:
+    line_no: int
+    name: str
+    dob: date
+    gender: Gender
+    relation: Optional[str] = None
+    relative_id: Optional[int] = None    # existing member
+    relative_line: Optional[int] = None  # earlier line of the same paste
+    phone: Optional[str] = None
+
+@dataclass
+class BulkImportCommand:
+    lines: List[BulkMemberLine] = field(default_factory=list)
+
+def parse_relation(token: str) -> Optional[str]:
+    """Turns `child-of` / `child_of` into `child` if it names a known relation."""
+    token = token.lower().replace("_", "-")
+    if token.endswith("-of") and token[:-3] in RELATIONS:
+        return token[:-3]
+    return None
+
+def parse_command(body: str) -> Optional[Union[AddMemberCommand, AddEventCommand]]:
+    """
+    Parses one-shot commands such as `add "Asha" 12-03-1990 F child-of 14`,
+    `event 14 Anniversary 01-06-2001` or a multi-line `bulk` paste. Returns None if the body is not a
+    command and raises ValueError with a usage hint if it is malformed.
+    """
+    stripped = body.strip()
+    keyword = stripped.split(None, 1)[0].lower() if stripped else ""
+    if keyword == "bulk":
+        return parse_bulk(stripped.splitlines()[1:])
+    if keyword not in ("add", "event"):
+        return None
+
+    try:
+        tokens = shlex.split(stripped)[1:]
+    except ValueError:
+        raise ValueError("Unbalanced quotes in command.")
+
+    if keyword == "add":
+        return _parse_add(tokens)
+    return _parse_event(tokens)
+
+def _parse_add(tokens) -> AddMemberCommand:
+    if len(tokens) < 3:
+        raise ValueError(ADD_USAGE)
+    name, dob_str, gender_str, *rest = tokens
+    command = AddMemberCommand(name=name, dob=validate_dob(dob_str), gender=validate_gender(gender_str))
+
+    while rest:
+        token = rest.pop(0)
+        relation = parse_relation(token)
+        if relation:
+            if not rest:
+                raise ValueError(f"Missing relative ID after {token}.")
+            try:
+                command.relative_id = int(rest.pop(0))
+            except ValueError:
+                raise ValueError(f"Invalid relative ID after {token}.")
+            command.relation = relation
+        elif token.startswith("+"):
+            command.phone = token
+        else:
+            raise ValueError(f"Unexpected '{token}'. {ADD_USAGE}")
+    return command
+
+def _parse_event(tokens) -> AddEventCommand:
+    if len(tokens) < 3:
+        raise ValueError(EVENT_USAGE)
+    try:
+        member_id = int(tokens[0])
+    except ValueError:
+        raise ValueError(f"Invalid member ID. {EVENT_USAGE}")
+    return AddEventCommand(
+        member_id=member_id,
+        event_type=" ".join(tokens[1:-1]),
+        event_date=validate_dob(tokens[-1]),
+    )
+
+def parse_bulk(lines: List[str]) -> BulkImportCommand:
+    """
+    Validates every line of a bulk paste in one pass. All problems are reported
+    together (up to MAX_BULK_ERRORS) so the user can fix the paste in one go.
+    Lines are numbered by their position in the paste, blank ones included, so
+    "Line N" and "#N" match what the user sees.
+    """
+    command = BulkImportCommand()
+    errors = []
+    member_lines = set()
+    reader = csv.reader(lines, skipinitialspace=True)
+    for row in reader:
+        line_no = reader.line_num
+        row = [cell.strip() for cell in row]
+        if not any(row):
+            continue
+        try:
+            command.lines.append(_parse_bulk_line(line_no, row, member_lines))
+        except ValueError as e:
+            errors.append(f"Line {line_no}: {e}")
+        member_lines.add(line_no)
+
+    if not command.lines and not errors:
+        raise ValueError(BULK_USAGE)
+    if errors:
+        shown = errors[:MAX_BULK_ERRORS]
+        if len(errors) > MAX_BULK_ERRORS:
+            shown.append(f"...and {len(errors) - MAX_BULK_ERRORS} more")
+        raise ValueError("Nothing was added. Please fix:\n" + "\n".join(shown))
+    return command
+
+def _parse_bulk_line(line_no: int, row: List[str], earlier_lines: Set[int]) -> BulkMemberLine:
+    if len(row) < 3:
+        raise ValueError("expected Name, DD-MM-YYYY, Gender")
+    name, dob_str, gender_str, *rest = row
+    if not name:
+        raise ValueError("name is empty")
+    line = BulkMemberLine(line_no=line_no, name=name, dob=validate_dob(dob_str), gender=validate_gender(gender_str))
+
+    for cell in rest:
+        if not cell:
+            continue
+        if cell.startswith("+"):
+            line.phone = cell
+            continue
+        parts = cell.split()
+        relation = parse_relation(parts[0])
+        if not relation or len(parts) != 2:
+            raise ValueError(f"unexpected '{cell}'")
+        target = parts[1]
+        line.relation = relation
+        if target.startswith("#"):
+            ref = _parse_ref(target[1:], target)
+            if ref not in earlier_lines:
+                raise ValueError(f"{target} must refer to an earlier line")
+            line.relative_line = ref
+        else:
+            line.relative_id = _parse_ref(target, target)
+    return line
+
+def _parse_ref(value: str, original: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"invalid relative '{original}'")
@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Monotonic time by which the current request must be answered. A ContextVar
+# follows the request through every await, into ChatbotService and the services.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline (negative once it has passed), or None outside one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def statement_timeout_ms() -> Optional[int]:
+    """Remaining budget as a database statement timeout, at least 1 ms. None without a deadline."""
+    left = remaining()
+    return None if left is None else max(1, int(left * 1000))
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Runs the block under a deadline `seconds` from now. An enclosing, earlier deadline wins."""
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(outer, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
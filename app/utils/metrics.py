@@ -0,0 +1,91 @@
+import bisect
+from typing import Dict, Optional, Sequence
+
+# Seconds; the same bounds for every latency histogram so dashboards can compare them
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 20, 50)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram. `observe` bumps a single slot of a preallocated
+    list, so it allocates nothing; buckets are made cumulative only when
+    rendered. Every observation happens on the event loop thread (SQLAlchemy's
+    sync hooks included), so plain increments need no lock.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class PathMetrics:
+    """Wall time, statements, DB time and response status of each request to one path."""
+
+    __slots__ = ("seconds", "queries", "db_seconds", "statuses")
+
+    def __init__(self):
+        self.seconds = Histogram()
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram()
+        self.statuses: Dict[int, int] = {}
+
+    def observe(self, elapsed: float, queries: int, db_seconds: float, status: int):
+        self.seconds.observe(elapsed)
+        self.queries.observe(queries)
+        self.db_seconds.observe(db_seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+# Every statement on an instrumented engine (see `query_counter.instrument_engine`)
+db_query_seconds = Histogram()
+# Keyed by path; entries are created when the middleware is built, never per request
+path_metrics: Dict[str, PathMetrics] = {}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[Dict[str, str]], le: Optional[str] = None) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in (labels or {}).items()]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsWriter:
+    """Builds the Prometheus text exposition format (version 0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help: str):
+        self.lines.append(f"# HELP {name} {help}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, histogram: Histogram, labels: Optional[Dict[str, str]] = None):
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            self.lines.append(f"{name}_bucket{_labels(labels, repr(float(bound)))} {cumulative}")
+        self.lines.append(f"{name}_bucket{_labels(labels, '+Inf')} {histogram.count}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        self.lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
@@ -0,0 +1,78 @@
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.utils.metrics import db_query_seconds
+
+_current: ContextVar[Optional["QueryCounter"]] = ContextVar("query_counter", default=None)
+
+
+class QueryCounter:
+    """
+    Counts the statements, and the time spent in them, that the current task
+    runs on an instrumented engine (see `instrument_engine`). Use it as a
+    context manager around a request or a block of code. Counters nest: an
+    outer counter also sees what inner ones count. With `trace=True` it keeps
+    each statement and its duration for `report()`.
+    """
+
+    __slots__ = ("queries", "db_seconds", "statements", "parent", "_token")
+
+    def __init__(self, trace: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Optional[List[Tuple[str, float]]] = [] if trace else None
+        self.parent: Optional[QueryCounter] = None
+
+    def __enter__(self) -> "QueryCounter":
+        self.parent = _current.get()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+    def record(self, statement: str, elapsed: float):
+        counter = self
+        while counter is not None:
+            counter.queries += 1
+            counter.db_seconds += elapsed
+            if counter.statements is not None:
+                counter.statements.append((statement, elapsed))
+            counter = counter.parent
+
+    def summary(self) -> str:
+        return f"{self.queries} statements, {self.db_seconds * 1000:.1f} ms in DB"
+
+    def report(self) -> str:
+        """The summary followed by each traced statement, one per line."""
+        lines = [self.summary()]
+        for statement, elapsed in self.statements or ():
+            lines.append(f"  {elapsed * 1000:7.2f} ms  {' '.join(statement.split())}")
+        return "\n".join(lines)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    return _current.get()
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    db_query_seconds.observe(elapsed)
+    counter = _current.get()
+    if counter is not None:
+        counter.record(statement, elapsed)
+
+
+def instrument_engine(sync_engine):
+    """Times every statement on `sync_engine` for `db_query_seconds` and the active `QueryCounter`."""
+    if not event.contains(sync_engine, "after_cursor_execute", _stop_timer):
+        event.listen(sync_engine, "before_cursor_execute", _start_timer)
+        event.listen(sync_engine, "after_cursor_execute", _stop_timer)
@@ -0,0 +1,201 @@
+import unicodedata
+from typing import List, Tuple, Union
+
+# WhatsApp rejects bodies over 1600 characters; Twilio counts UTF-16 code units,
+# so an emoji outside the BMP costs two of them (and four UTF-8 bytes)
+WHATSAPP_MAX_CHARS = 1600
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+# Never cut right before these: they attach to the previous code point
+ZWJ = "\u200d"
+_JOINERS = {ZWJ, "\ufe0e", "\ufe0f", "\u20e3"}  # joiner, variation selectors, keycap
+
+
+def text_size(text: str) -> Tuple[int, int]:
+    """(UTF-16 code units, UTF-8 bytes) of `text`."""
+    if text.isascii():
+        return len(text), len(text)
+    return len(text.encode("utf-16-le")) // 2, len(text.encode("utf-8"))
+
+
+def _fits(text: str, max_chars: int, max_bytes: int) -> bool:
+    chars, size = text_size(text)
+    return chars <= max_chars and size <= max_bytes
+
+
+def _attached(text: str, i: int) -> bool:
+    """Whether a cut before text[i] would split a grapheme (ZWJ sequence, modifier, flag)."""
+    char, prev = text[i], text[i - 1]
+    if char in _JOINERS or prev == ZWJ or unicodedata.combining(char):
+        return True
+    if "\U0001F3FB" <= char <= "\U0001F3FF" or "\U000E0020" <= char <= "\U000E007F":
+        return True  # skin tone modifier, tag sequence
+    if "\U0001F1E6" <= char <= "\U0001F1FF":
+        # Regional indicators pair up into flags: keep an odd run together
+        run = 0
+        while i - run - 1 >= 0 and "\U0001F1E6" <= text[i - run - 1] <= "\U0001F1FF":
+            run += 1
+        return run % 2 == 1
+    return False
+
+
+def _cut_line(line: str, max_chars: int, max_bytes: int) -> List[str]:
+    """Splits a single line that is too long on its own, preferring spaces."""
+    pieces = []
+    while line and not _fits(line, max_chars, max_bytes):
+        # Largest prefix that fits; widths vary per code point, so count up
+        end, chars, size = 0, 0, 0
+        for char in line:
+            c, b = text_size(char)
+            if chars + c > max_chars or size + b > max_bytes:
+                break
+            end, chars, size = end + 1, chars + c, size + b
+        cut = end
+        while cut > 0 and _attached(line, cut):
+            cut -= 1
+        space = line.rfind(" ", 0, cut)
+        if space > cut // 2:
+            cut = space + 1
+        if cut == 0:
+            cut = max(end, 1)  # a single grapheme wider than the budget
+        pieces.append(line[:cut].rstrip(" "))
+        line = line[cut:]
+    if line:
+        pieces.append(line)
+    return pieces
+
+
+def split_text(text: str, max_chars: int = WHATSAPP_MAX_CHARS, max_bytes: int = 4096) -> List[str]:
+    """
+    Splits `text` into parts that each fit both budgets. Parts break on line
+    boundaries; only a line longer than a whole part is cut inside, at a space
+    where possible and never through an emoji sequence.
+    """
+    parts, start = [], 0
+    # A code point is 1-2 UTF-16 units and 1-4 bytes, so anything longer than
+    # max_chars code points cannot fit and needs no measuring
+    while len(text) - start > max_chars or not _fits(text[start:], max_chars, max_bytes):
+        # Scale the window down by how far over budget it is (by at least one
+        # code point) until it fits, then grow it by whole lines while they fit
+        end = start + min(len(text) - start, max_chars, max_bytes)
+        chars, size = text_size(text[start:end])
+        while chars > max_chars or size > max_bytes:
+            scale = min(max_chars / chars, max_bytes / size)
+            end = start + min(int((end - start) * scale), end - start - 1)
+            chars, size = text_size(text[start:end])
+        while True:
+            following = text.find("\n", end + 1)
+            if following < 0 or not _fits(text[start:following], max_chars, max_bytes):
+                break
+            end = following
+        newline = text.rfind("\n", start, end + 1)
+        if newline == start:
+            start += 1  # blank line at a part boundary
+        elif newline > start:
+            parts.append(text[start:newline])
+            start = newline + 1
+        else:
+            # The first line alone is longer than a part
+            line_end = text.find("\n", start)
+            line_end = len(text) if line_end < 0 else line_end
+            pieces = _cut_line(text[start:line_end], max_chars, max_bytes)
+            parts.extend(pieces[:-1])
+            text, start = pieces[-1] + text[line_end:], 0
+    if text[start:].strip() or not parts:
+        parts.append(text[start:])
+    return parts
+
+
+def escape_text(text: str) -> str:
+    """Escapes element text exactly as ElementTree (and so `MessagingResponse`) does."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def message_xml(body: str) -> str:
+    return f"<Message>{escape_text(body)}</Message>" if body else "<Message />"
+
+
+def response_xml(fragments: List[str]) -> str:
+    """The document `str(MessagingResponse())` produces around the given `<Message>`s."""
+    if not fragments:
+        return f"{XML_DECLARATION}<Response />"
+    return f"{XML_DECLARATION}<Response>{''.join(fragments)}</Response>"
+
+
+def continuation_footer(remaining: int) -> str:
+    return f"\n\n➡️ Reply *more* for the rest ({remaining} more message{'s' if remaining != 1 else ''})"
+
+
+FOOTER_CHARS, FOOTER_BYTES = text_size(continuation_footer(999))
+
+
+class StaticReply:
+    """
+    A fixed message, serialized once at import. A reply that is only this
+    message is served as the precomputed `twiml`. When it is one of several
+    messages, its `fragment` is reused.
+    """
+    __slots__ = ("text", "chars", "size", "fragment", "twiml")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.chars, self.size = text_size(text)
+        self.fragment = message_xml(text)
+        self.twiml = response_xml([self.fragment])
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class ChunkedResponse:
+    """
+    Collects the messages of one reply and renders them as TwiML, split to fit
+    WhatsApp's body limit.
+
+    Handlers call `message(text)` with a string or a `StaticReply`. `render()`
+    splits every body and emits at most `max_parts` `<Message>` elements. It
+    returns the remaining parts, already split, so a later "more" can send
+    them as they are (`render(parts=...)`) without building the reply again.
+    """
+
+    def __init__(self, max_chars: int = WHATSAPP_MAX_CHARS, max_bytes: int = 4096, max_parts: int = 4):
+        self.messages: List[Union[str, StaticReply]] = []
+        self.max_parts = max(1, max_parts)
+        # Every part keeps room for the footer in case it ends up last
+        self.max_chars = max_chars - FOOTER_CHARS
+        self.max_bytes = max_bytes - FOOTER_BYTES
+
+    def message(self, body: Union[str, StaticReply]):
+        self.messages.append(body)
+
+    def bodies(self) -> List[str]:
+        return [str(body) for body in self.messages]
+
+    def _parts(self) -> List[Union[str, StaticReply]]:
+        parts = []
+        for body in self.messages:
+            if isinstance(body, StaticReply) and body.chars <= self.max_chars and body.size <= self.max_bytes:
+                parts.append(body)
+            else:
+                parts.extend(split_text(str(body), self.max_chars, self.max_bytes))
+        return parts
+
+    def parts(self) -> List[str]:
+        return [str(part) for part in self._parts()]
+
+    def render(self, parts: List[str] = None) -> Tuple[str, List[str]]:
+        """TwiML for the first `max_parts` parts, and the parts left over."""
+        parts = self._parts() if parts is None else parts
+        shown, rest = parts[:self.max_parts], [str(part) for part in parts[self.max_parts:]]
+        if rest:
+            shown[-1] = str(shown[-1]) + continuation_footer(len(rest))
+        elif len(shown) == 1 and isinstance(shown[0], StaticReply):
+            return shown[0].twiml, rest
+        return response_xml([p.fragment if isinstance(p, StaticReply) else message_xml(p) for p in shown]), rest
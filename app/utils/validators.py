@@ -33,6 +33,14 @@ def normalize_phone(phone: str) -> str:
     return clean
 
 def validate_phone(phone: str) -> str:
-    # Use phonenumbers lib if strictly required, but regex is lighter for now
-    # if valid, return normalized
-    return normalize_phone(phone)
+    """
+    E.164 form of a typed number ("+91 98765-43210", "1 (555) 010-0123"):
+    spaces, dashes, dots and brackets are dropped and '+' is added if missing.
+    Anything but 8 to 15 digits is rejected.
+    """
+    clean = re.sub(r"[\s\-.()]", "", phone)
+    if not clean.startswith("+"):
+        clean = "+" + clean
+    if not re.fullmatch(r"\+\d{8,15}", clean):
+        raise ValueError(f"'{phone.strip()}' is not a valid phone number.")
+    return clean
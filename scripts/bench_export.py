@@ -0,0 +1,86 @@
+"""
+Benchmark for the streaming tree export.
+
+Seeds a throwaway SQLite database with N members (parents and spouse links
+included) and streams the tree in every format, reporting throughput and peak
+Python memory. Peak memory should stay flat as --members grows.
+
+    python scripts/bench_export.py --members 50000
+"""
+import asyncio
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Tree, Member, Relationship
+from app.models.member import Gender
+from app.services.export_service import ExportService
+
+async def seed(session: AsyncSession, members: int, seed: int = 7) -> int:
+    rng = random.Random(seed)
+    tree = Tree(owner_id=None)
+    session.add(tree)
+    await session.commit()
+
+    rows = [
+        {"tree_id": tree.id, "name": f"Person {i}", "dob": date(1900 + i % 100, 1 + i % 12, 1 + i % 28),
+         "gender": Gender.MALE if i % 2 else Gender.FEMALE, "generation_level": 1}
+        for i in range(members)
+    ]
+    for start in range(0, members, 5000):
+        await session.execute(insert(Member), rows[start:start + 5000])
+    await session.commit()
+
+    # Couples of consecutive ids, each child gets a random earlier couple as parents
+    links = []
+    for i in range(1, members, 2):
+        links.append({"tree_id": tree.id, "parent_id": i, "child_id": i + 1, "relation_type": "spouse"})
+    for child in range(3, members + 1):
+        father = rng.randrange(1, min(child, members) - 1, 2)
+        links += [
+            {"tree_id": tree.id, "parent_id": father, "child_id": child, "relation_type": "parent"},
+            {"tree_id": tree.id, "parent_id": father + 1, "child_id": child, "relation_type": "parent"},
+        ]
+    for start in range(0, len(links), 5000):
+        await session.execute(insert(Relationship), links[start:start + 5000])
+    await session.commit()
+    return tree.id
+
+async def main(members: int, batch_size: int):
+    workdir = tempfile.mkdtemp()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as session:
+        tree_id = await seed(session, members)
+
+    for fmt in ("gedcom", "ndjson", "csv"):
+        async with Session() as session:
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = chunks = 0
+            async for chunk in ExportService(session, batch_size=batch_size).stream(tree_id, fmt):
+                size += len(chunk.encode())
+                chunks += 1
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{fmt:7} {size / 1e6:6.1f} MB in {elapsed:.2f}s  members/s={members / elapsed:,.0f}  "
+              f"MB/s={size / 1e6 / elapsed:.1f}  chunks={chunks}  peak_python_mem={peak / 1e6:.1f} MB")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.members, args.batch_size))
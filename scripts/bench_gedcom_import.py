@@ -0,0 +1,91 @@
+"""
+Benchmark for the streaming GEDCOM importer.
+
+Generates a synthetic GEDCOM file with N individuals spread over several
+generations and imports it into a throwaway SQLite database.
+
+    python scripts/bench_gedcom_import.py --individuals 20000
+"""
+import asyncio
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Tree
+from app.services.gedcom_service import GedcomImportService
+
+def write_synthetic_gedcom(path: str, individuals: int, seed: int = 7):
+    rng = random.Random(seed)
+    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    people, families = [], []
+    generation = [("M", 1900), ("F", 1902)]
+    next_id = 0
+    while len(people) < individuals:
+        ids = []
+        for sex, year in generation:
+            next_id += 1
+            people.append((next_id, sex, year))
+            ids.append(next_id)
+        # Pair people up and give each couple 2-4 children
+        next_generation = []
+        for i in range(0, len(ids) - 1, 2):
+            children = rng.randint(2, 4)
+            families.append((ids[i], ids[i + 1], list(range(next_id + len(next_generation) + 1,
+                                                            next_id + len(next_generation) + 1 + children))))
+            for _ in range(children):
+                next_generation.append((rng.choice("MF"), people[ids[i] - 1][2] + 25))
+        generation = next_generation[: individuals - len(people)]
+        if not generation:
+            break
+
+    known = {p[0] for p in people}
+    with open(path, "w") as f:
+        f.write("0 HEAD\n1 GEDC\n2 VERS 5.5\n")
+        for pid, sex, year in people:
+            f.write(f"0 @I{pid}@ INDI\n1 NAME Person{pid} /Bench/\n1 SEX {sex}\n")
+            f.write(f"1 BIRT\n2 DATE {rng.randint(1, 28)} {rng.choice(months)} {year}\n")
+        for fid, (husb, wife, children) in enumerate(families, start=1):
+            f.write(f"0 @F{fid}@ FAM\n1 HUSB @I{husb}@\n1 WIFE @I{wife}@\n")
+            for child in children:
+                if child in known:
+                    f.write(f"1 CHIL @I{child}@\n")
+        f.write("0 TRLR\n")
+
+async def main(individuals: int, chunk_size: int):
+    workdir = tempfile.mkdtemp()
+    ged_path = os.path.join(workdir, "bench.ged")
+    write_synthetic_gedcom(ged_path, individuals)
+    print(f"GEDCOM file: {os.path.getsize(ged_path) / 1e6:.1f} MB")
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as session:
+        tree = Tree(owner_id=None)
+        session.add(tree)
+        await session.commit()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        stats = await GedcomImportService(session, tree.id, chunk_size=chunk_size).import_file(ged_path)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"individuals={stats.individuals} relationships={stats.relationships} families={stats.families}")
+    print(f"elapsed={elapsed:.2f}s rows/s={stats.rows / elapsed:,.0f} peak_python_mem={peak / 1e6:.1f} MB")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--individuals", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.individuals, args.chunk_size))
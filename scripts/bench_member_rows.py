@@ -0,0 +1,65 @@
+"""
+Benchmark for the member listing reads.
+
+Seeds a throwaway SQLite database with N members and loads the tree with the
+full ORM entity query (`get_members_by_tree`) and the projected Core query
+(`get_member_rows`), reporting the best per-row time and peak Python memory.
+
+    python -m scripts.bench_member_rows --members 10000
+"""
+import asyncio
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.services.member_service import MemberService
+from scripts.bench_export import seed
+
+async def measure(Session, load, members: int, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        # Fresh session each time, so the identity map starts empty like a webhook request
+        async with Session() as session:
+            started = time.perf_counter()
+            rows = await load(MemberService(session))
+            best = min(best, time.perf_counter() - started)
+            assert len(rows) == members
+    async with Session() as session:
+        tracemalloc.start()
+        rows = await load(MemberService(session))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+async def main(members: int, repeat: int):
+    workdir = tempfile.mkdtemp()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as session:
+        tree_id = await seed(session, members)
+
+    results = {}
+    for label, load in (
+        ("orm", lambda service: service.get_members_by_tree(tree_id)),
+        ("rows", lambda service: service.get_member_rows(tree_id)),
+    ):
+        results[label] = await measure(Session, load, members, repeat)
+        elapsed, peak = results[label]
+        print(f"{label:5} {elapsed * 1e3:7.1f} ms  per_row={elapsed / members * 1e6:5.2f} us  "
+              f"peak_python_mem={peak / 1e6:.1f} MB")
+    print(f"speedup x{results['orm'][0] / results['rows'][0]:.1f}  memory x{results['orm'][1] / results['rows'][1]:.1f}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.members, args.repeat))
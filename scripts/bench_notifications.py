@@ -0,0 +1,102 @@
+"""
+Benchmark for collaborator edit notifications.
+
+Seeds a throwaway SQLite database with one tree shared with N opted-in
+viewers. It makes a burst of edits as the owner, first without and then with
+a notifier attached, to show the cost the webhook path pays. It then flushes
+the coalesced digest and fans it out through the pooled Twilio client to the
+local stand-in server.
+
+    python -m scripts.bench_notifications --viewers 500 --edits 10 --latency-ms 20
+"""
+import asyncio
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Tree, TreeAccess, User, Role
+from app.models.member import Gender
+from app.services.member_service import MemberService
+from app.services.notifier import ChangeNotifier, set_notifier
+from app.services.outbound import TwilioSender
+from app.services.twilio_client import TwilioClient
+from scripts.twilio_standin import StandIn, serve
+
+async def seed(session: AsyncSession, viewers: int):
+    now = datetime.now(timezone.utc)
+    owner = User(phone="+15550000000", activated_at=now)
+    session.add(owner)
+    await session.flush()
+    tree = Tree(owner_id=owner.id)
+    session.add(tree)
+    await session.flush()
+    result = await session.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"phone": f"+1556{i:07d}", "activated_at": now, "notify_changes": True} for i in range(viewers)],
+    )
+    await session.execute(insert(TreeAccess), [
+        {"tree_id": tree.id, "user_id": user_id, "role": Role.VIEWER} for user_id in result.scalars().all()
+    ])
+    await session.commit()
+    member = await MemberService(session).create_member(tree.id, "Root", date(1950, 1, 1), Gender.MALE, 1)
+    return owner.id, member.id
+
+async def edit_burst(Session, owner_id: int, member_id: int, edits: int) -> float:
+    async with Session() as session:
+        session.info["actor_id"] = owner_id
+        member_service = MemberService(session)
+        started = time.perf_counter()
+        for i in range(edits):
+            await member_service.update_member(member_id, name=f"Root {i}")
+        return (time.perf_counter() - started) / edits
+
+async def main(viewers: int, edits: int, latency_ms: float, port: int):
+    workdir = tempfile.mkdtemp()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as session:
+        owner_id, member_id = await seed(session, viewers)
+
+    baseline = await edit_burst(Session, owner_id, member_id, edits)
+
+    stand_in = StandIn(latency=latency_ms / 1000)
+    server, task = await serve(stand_in, "127.0.0.1", port)
+    client = TwilioClient("AC_TEST", "AUTH_TEST", base_url=f"http://127.0.0.1:{port}", rate_per_second=1e6)
+    notifier = ChangeNotifier(Session, TwilioSender(client, "+14155238886"), window_seconds=60)
+    set_notifier(notifier)
+    with_notifier = await edit_burst(Session, owner_id, member_id, edits)
+
+    started = time.perf_counter()
+    queued = await notifier.flush_due(force=True)
+    flushed = time.perf_counter() - started
+    started = time.perf_counter()
+    await notifier.drain()
+    sent = time.perf_counter() - started
+
+    print(f"edit commit     {baseline * 1e3:6.2f} ms without notifier, {with_notifier * 1e3:6.2f} ms with")
+    print(f"flush           {flushed * 1e3:6.1f} ms -> {queued} messages for {edits} edits")
+    print(f"fan-out         {sent:6.2f} s  msgs/s={len(stand_in.messages) / sent:,.0f}  "
+          f"connections={len(stand_in.connections)}")
+    print(f"metrics         {notifier.snapshot()}")
+
+    set_notifier(None)
+    await client.close()
+    server.should_exit = True
+    await task
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--viewers", type=int, default=500)
+    parser.add_argument("--edits", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main(args.viewers, args.edits, args.latency_ms, args.port))
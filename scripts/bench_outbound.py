@@ -0,0 +1,68 @@
+"""
+Benchmark for outbound messaging against the local Twilio stand-in.
+
+Serves `scripts.twilio_standin` on a local port with some per-request latency.
+It sends N messages three ways: through the pooled `TwilioClient`, through a
+fresh HTTP client per message (what a per-call REST client does), and through
+the pooled client with a token bucket, to show the rate is held.
+
+    python -m scripts.bench_outbound --messages 2000 --latency-ms 20
+"""
+import asyncio
+import argparse
+import time
+import httpx
+from app.services.twilio_client import TwilioClient
+from scripts.twilio_standin import StandIn, serve
+
+FROM = "whatsapp:+14155238886"
+
+async def pooled(base_url: str, messages: int, rate: float, connections: int):
+    client = TwilioClient("AC_TEST", "AUTH_TEST", base_url=base_url, rate_per_second=rate,
+                          burst=connections, max_connections=connections)
+    results = await client.send_many(FROM, [(f"+1555{i:07d}", f"Message {i}") for i in range(messages)])
+    await client.close()
+    return results
+
+async def unpooled(base_url: str, messages: int, connections: int):
+    gate = asyncio.Semaphore(connections)
+
+    async def send_one(i: int):
+        async with gate:
+            async with httpx.AsyncClient(base_url=base_url, auth=("AC_TEST", "AUTH_TEST")) as client:
+                response = await client.post(
+                    "/2010-04-01/Accounts/AC_TEST/Messages.json",
+                    data={"From": FROM, "To": f"whatsapp:+1555{i:07d}", "Body": f"Message {i}"},
+                )
+                return response.status_code < 300
+
+    return await asyncio.gather(*(send_one(i) for i in range(messages)))
+
+async def main(messages: int, latency_ms: float, connections: int, rate: float, port: int):
+    for label in ("pooled", "unpooled", f"rate={rate:g}/s"):
+        stand_in = StandIn(latency=latency_ms / 1000)
+        server, task = await serve(stand_in, "127.0.0.1", port)
+        base_url = f"http://127.0.0.1:{port}"
+        count = messages if label != f"rate={rate:g}/s" else int(rate * 3)
+        started = time.perf_counter()
+        if label == "pooled":
+            await pooled(base_url, count, 1e6, connections)
+        elif label == "unpooled":
+            await unpooled(base_url, count, connections)
+        else:
+            await pooled(base_url, count, rate, connections)
+        elapsed = time.perf_counter() - started
+        server.should_exit = True
+        await task
+        print(f"{label:12} {len(stand_in.messages):6} sent in {elapsed:6.2f}s  msgs/s={len(stand_in.messages) / elapsed:8.1f}  "
+              f"connections={len(stand_in.connections)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.latency_ms, args.connections, args.rate, args.port))
@@ -0,0 +1,81 @@
+"""
+Benchmark for tree deletion.
+
+Seeds the same tree (members, parent/spouse links and one event per member)
+three times into a throwaway SQLite database and deletes it with the old ORM
+cascade (`session.delete(tree)`), the set-based `TreeService.delete_tree` and
+the chunked background mode, reporting time and peak Python memory.
+
+    python scripts/bench_tree_delete.py --members 20000
+"""
+import asyncio
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker, selectinload
+from app.database import Base
+from app.models import Tree, Event
+from app.services.tree_service import TreeService
+from scripts.bench_export import seed
+
+async def seed_with_events(session: AsyncSession, members: int) -> int:
+    tree_id = await seed(session, members)
+    first = (await session.execute(select(Tree).filter(Tree.id == tree_id).options(selectinload(Tree.members)))).scalar_one()
+    events = [{"member_id": m.id, "event_type": "Birthday", "event_date": date(2000, 1, 1)} for m in first.members]
+    for start in range(0, len(events), 5000):
+        await session.execute(insert(Event), events[start:start + 5000])
+    await session.commit()
+    session.expunge_all()
+    return tree_id
+
+async def orm_cascade(session: AsyncSession, tree_id: int):
+    tree = (await session.execute(select(Tree).filter(Tree.id == tree_id))).scalar_one()
+    # The cascade loads every member, then their relationships and events, row by row
+    await session.delete(tree)
+    await session.commit()
+
+async def set_based(session: AsyncSession, tree_id: int):
+    await TreeService(session).delete_tree(tree_id)
+
+async def chunked(session: AsyncSession, tree_id: int, batch_size: int):
+    tree_service = TreeService(session)
+    await tree_service.detach_tree(tree_id)
+    await tree_service.delete_tree_in_chunks(tree_id, batch_size)
+
+async def main(members: int, batch_size: int):
+    workdir = tempfile.mkdtemp()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    modes = [
+        ("orm_cascade", orm_cascade),
+        ("set_based", set_based),
+        (f"chunked({batch_size})", lambda s, t: chunked(s, t, batch_size)),
+    ]
+    for name, delete in modes:
+        async with Session() as session:
+            tree_id = await seed_with_events(session, members)
+        async with Session() as session:
+            tracemalloc.start()
+            started = time.perf_counter()
+            await delete(session, tree_id)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{name:14} {elapsed:7.2f}s  peak_python_mem={peak / 1e6:7.1f} MB")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.members, args.batch_size))
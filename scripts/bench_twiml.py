@@ -0,0 +1,61 @@
+"""
+Microbenchmark for TwiML rendering.
+
+Times the reply shapes the webhook sends most often: the main menu alone, a
+prompt, and a member list followed by the menu. Each shape is split into the
+same parts, then serialized two ways: with `MessagingResponse` +
+`str(response)` (the ElementTree path) and with `ChunkedResponse.render()`
+(precompiled static replies, escaped string templates for the rest).
+
+    python -m scripts.bench_twiml --iterations 20000 --members 50
+"""
+import argparse
+import timeit
+from twilio.twiml.messaging_response import MessagingResponse
+from app.services.chatbot_service import ASK_NAME, MAIN_MENU
+from app.utils.twiml import ChunkedResponse, continuation_footer
+
+def element_tree(messages):
+    """How replies were rendered before: the same parts, serialized by MessagingResponse."""
+    def build():
+        chunked = ChunkedResponse()
+        for message in messages:
+            chunked.message(str(message))
+        parts = chunked.parts()
+        shown, rest = parts[:chunked.max_parts], parts[chunked.max_parts:]
+        if rest:
+            shown[-1] += continuation_footer(len(rest))
+        response = MessagingResponse()
+        for part in shown:
+            response.message(part)
+        return str(response)
+    return build
+
+def template(messages):
+    def build():
+        response = ChunkedResponse()
+        for message in messages:
+            response.message(message)
+        return response.render()[0]
+    return build
+
+def main(iterations: int, members: int):
+    listing = "Select a member to edit:\n" + "".join(f"{i}. Member & Co {i} 🎂\n" for i in range(members))
+    shapes = {
+        "main menu": [MAIN_MENU],
+        "prompt": [ASK_NAME],
+        f"list({members}) + menu": [listing, MAIN_MENU],
+    }
+    for label, messages in shapes.items():
+        old, new = element_tree(messages), template(messages)
+        assert old() == new()
+        old_us = timeit.timeit(old, number=iterations) / iterations * 1e6
+        new_us = timeit.timeit(new, number=iterations) / iterations * 1e6
+        print(f"{label:18} MessagingResponse {old_us:7.2f} µs   ChunkedResponse {new_us:7.2f} µs   x{old_us / new_us:5.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--members", type=int, default=50)
+    args = parser.parse_args()
+    main(args.iterations, args.members)
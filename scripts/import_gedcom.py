@@ -0,0 +1,43 @@
+import asyncio
+import argparse
+import sys
+from app.database import AsyncSessionLocal, engine
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.gedcom_service import GedcomImportService
+
+def print_progress(stats):
+    print(
+        f"\r{stats.individuals} individuals, {stats.relationships} relationships "
+        f"({stats.rows_per_second:,.0f} rows/s)",
+        end="", file=sys.stderr, flush=True,
+    )
+
+async def main(path: str, phone: str, chunk_size: int):
+    async with AsyncSessionLocal() as session:
+        user = await UserService(session).get_or_create_user(phone)
+        tree_service = TreeService(session)
+        tree, role, _ = await tree_service.get_tree_and_role(user.id)
+        if not tree:
+            tree = await tree_service.create_tree(user)
+            print(f"Created tree {tree.id} for {phone}")
+        elif role not in ("owner", "editor"):
+            print(f"{phone} cannot edit tree {tree.id}")
+            return
+
+        importer = GedcomImportService(session, tree.id, chunk_size=chunk_size, progress=print_progress)
+        stats = await importer.import_file(path)
+
+    print(file=sys.stderr)
+    print(f"Imported {stats.individuals} individuals and {stats.relationships} relationships "
+          f"from {stats.families} families into tree {tree.id}")
+    print(f"{stats.rows} rows in {stats.elapsed:.2f}s ({stats.rows_per_second:,.0f} rows/s)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a GEDCOM 5.5 file into a user's family tree.")
+    parser.add_argument("file", help="Path to the .ged file")
+    parser.add_argument("--phone", required=True, help="Phone of the tree owner/editor, e.g. +919310082225")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.file, args.phone, args.chunk_size))
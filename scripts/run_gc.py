@@ -0,0 +1,18 @@
+import asyncio
+import argparse
+from app.database import AsyncSessionLocal, engine
+from app.services.maintenance_service import MaintenanceService
+
+async def main(batch_size: int):
+    async with AsyncSessionLocal() as session:
+        stats = await MaintenanceService(session, batch_size).run_gc()
+    print(f"States reset: {stats.states_reset}")
+    print(f"Users archived: {stats.users_archived}")
+    print(f"Batches: {stats.batches}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reset abandoned conversations and archive never-active users.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
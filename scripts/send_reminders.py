@@ -0,0 +1,31 @@
+import asyncio
+import argparse
+from datetime import date
+from app.database import AsyncSessionLocal, engine
+from app.services.outbound import FakeSender, get_outbound_sender
+from app.services.reminder_service import ReminderService
+
+async def main(day: date, batch_size: int, dry_run: bool):
+    if dry_run:
+        async with AsyncSessionLocal() as session:
+            stats, messages = await ReminderService(session, FakeSender(), batch_size).preview(day)
+        print(f"Trees with occasions: {stats.trees}")
+        print(f"Would send: {len(messages)} ({stats.planned} not planned yet)")
+        for message in messages:
+            print(f"--- {message.to}\n{message.body}")
+    else:
+        sender = get_outbound_sender()
+        async with AsyncSessionLocal() as session:
+            stats = await ReminderService(session, sender, batch_size).run(day)
+        await sender.close()
+        print(f"Trees with occasions: {stats.trees}")
+        print(f"Sent: {stats.sent}, failed: {stats.failed}, abandoned: {stats.abandoned}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send (or resume) the birthday and anniversary reminders for a day.")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="print what would be sent; writes nothing")
+    args = parser.parse_args()
+    asyncio.run(main(args.date, args.batch_size, args.dry_run))
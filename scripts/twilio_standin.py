@@ -0,0 +1,84 @@
+"""
+Local stand-in for Twilio's Messages API, for tests and benchmarks.
+
+Accepts `POST /2010-04-01/Accounts/{sid}/Messages.json` with basic auth,
+records every message, and can be told to fail the next requests with given
+status codes or to add latency. Tests mount `StandIn().app` on an
+`httpx.ASGITransport`; benchmarks serve it over real HTTP:
+
+    python -m scripts.twilio_standin --port 8099 --latency-ms 20
+"""
+import argparse
+import asyncio
+import base64
+from collections import deque
+from typing import List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class StandIn:
+    def __init__(self, account_sid: str = "AC_TEST", auth_token: str = "AUTH_TEST", latency: float = 0.0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.latency = latency
+        self.messages: List[dict] = []
+        self.requests = 0
+        self.connections = set()
+        self._failures = deque()
+        self.app = self._build_app()
+
+    def fail_next(self, *status_codes: int, retry_after: str = None):
+        """Answers the next len(status_codes) requests with these errors."""
+        self._failures.extend((code, retry_after) for code in status_codes)
+
+    def _authorized(self, request: Request) -> bool:
+        expected = base64.b64encode(f"{self.account_sid}:{self.auth_token}".encode()).decode()
+        return request.headers.get("authorization") == f"Basic {expected}"
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+        async def create_message(account_sid: str, request: Request):
+            self.requests += 1
+            if request.client:
+                self.connections.add((request.client.host, request.client.port))
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if account_sid != self.account_sid or not self._authorized(request):
+                return JSONResponse({"code": 20003, "message": "Authenticate"}, status_code=401)
+            if self._failures:
+                code, retry_after = self._failures.popleft()
+                headers = {"Retry-After": retry_after} if retry_after else {}
+                return JSONResponse({"code": 20429, "message": "Injected failure"}, status_code=code, headers=headers)
+
+            form = await request.form()
+            to, from_, body = form.get("To", ""), form.get("From", ""), form.get("Body")
+            if not to.startswith("whatsapp:+") or not from_.startswith("whatsapp:+") or body is None:
+                return JSONResponse({"code": 21211, "message": f"Invalid 'To' Phone Number: {to}"}, status_code=400)
+            sid = f"SM{len(self.messages) + 1:032x}"
+            self.messages.append({"sid": sid, "from": from_, "to": to, "body": body})
+            return JSONResponse({"sid": sid, "status": "queued", "to": to, "from": from_}, status_code=201)
+
+        return app
+
+
+async def serve(stand_in: StandIn, host: str, port: int) -> Tuple["uvicorn.Server", asyncio.Task]:
+    """Starts the stand-in on a real socket in the running loop. Stop with `server.should_exit = True`."""
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(stand_in.app, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    uvicorn.run(StandIn(latency=args.latency_ms / 1000).app, host="127.0.0.1", port=args.port)
@@ -5,7 +5,10 @@ os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test.db"
 os.environ["TWILIO_ACCOUNT_SID"] = "AC_TEST"
 os.environ["TWILIO_AUTH_TOKEN"] = "AUTH_TEST"
 os.environ["TWILIO_PHONE_NUMBER"] = "whatsapp:+14155238886"
+# Scripted conversations type much faster than a person
+os.environ["ADMISSION_PHONE_RATE"] = "1000"
 
+from contextlib import contextmanager
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
@@ -14,6 +17,7 @@ from sqlalchemy.orm import sessionmaker
 from app.database import Base, get_db
 from app.main import app
 from app.config import get_settings
+from app.utils.query_counter import QueryCounter, instrument_engine
 # Import models to ensure they are registered with Base.metadata
 from app.models.user import User
 from app.models.tree import Tree, TreeAccess
@@ -26,6 +30,7 @@ SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+instrument_engine(engine.sync_engine)
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
 )
@@ -55,3 +60,27 @@ async def client(prepare_database):
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
+
+@pytest.fixture
+def real_get_db():
+    """Routes requests through the app's own engine and `get_db` (breaker, engine hooks) instead of the override."""
+    app.dependency_overrides.pop(get_db)
+    yield
+    app.dependency_overrides[get_db] = override_get_db
+
+@pytest_asyncio.fixture(scope="function")
+async def session_factory(prepare_database):
+    return TestingSessionLocal
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(2, "main menu"):` fails if the block runs more than two
+    statements, listing the ones it ran. Yields the `QueryCounter`.
+    """
+    @contextmanager
+    def budget(limit: int, label: str = "block"):
+        with QueryCounter(trace=True) as counter:
+            yield counter
+        assert counter.queries <= limit, f"{label} exceeded its budget of {limit}: {counter.report()}"
+    return budget
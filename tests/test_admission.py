@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.middleware.admission import AdmissionMiddleware, EMPTY_TWIML
+from app.middleware.twilio_signature import TwilioSignatureMiddleware
+from app.services.admission import (
+    SHED_OVERLOAD, AdmissionController, InMemoryPhoneLimiter, SharedPhoneLimiter,
+)
+
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+class Counters:
+    """The two Redis commands SharedPhoneLimiter uses."""
+    def __init__(self):
+        self.values, self.ttls = {}, {}
+
+    async def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+class Blocking:
+    """ASGI app that holds every request until `gate` opens."""
+    def __init__(self):
+        self.gate, self.calls = asyncio.Event(), 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"<Response />"})
+
+@pytest.mark.asyncio
+async def test_phone_limiters():
+    now = [0.0]
+    limiter = InMemoryPhoneLimiter(rate=1, burst=3, max_phones=2, clock=lambda: now[0])
+    assert [await limiter.allow("+1") for _ in range(4)] == [True, True, True, False]
+    assert await limiter.allow("+2")
+    now[0] += 1
+    assert await limiter.allow("+1") and not await limiter.allow("+1")
+    await limiter.allow("+3")
+    assert list(limiter.buckets) == ["+1", "+3"]
+
+    shared = SharedPhoneLimiter(Counters(), rate=0.5, burst=2, window_seconds=10)
+    assert [await shared.allow("+1") for _ in range(6)] == [True] * 5 + [False]
+    assert set(shared.client.ttls.values()) == {20}
+
+@pytest.mark.asyncio
+async def test_overload_waits_then_sheds():
+    controller = AdmissionController(None, max_concurrency=2, max_queue=1, queue_timeout=0.05)
+    assert await controller.acquire("+1") is None and await controller.acquire("+2") is None
+
+    waiter = asyncio.create_task(controller.acquire("+3"))
+    await asyncio.sleep(0)
+    # The queue is full: shed at once
+    assert await controller.acquire("+4") == SHED_OVERLOAD
+    controller.release()
+    assert await waiter is None
+    # Nobody releases this time, so the wait times out
+    assert await controller.acquire("+5") == SHED_OVERLOAD
+
+    snapshot = controller.snapshot()
+    assert (snapshot["admitted"], snapshot["queued"], snapshot["shed_overload"], snapshot["in_flight"]) == (3, 1, 2, 2)
+    assert snapshot["queue_wait_seconds_max"] > 0
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_before_the_app():
+    app = Blocking()
+    controller = AdmissionController(InMemoryPhoneLimiter(rate=1, burst=2), max_concurrency=2, max_queue=0)
+    stack = TwilioSignatureMiddleware(AdmissionMiddleware(app, controller), "AUTH_TEST", enforce=False)
+    async with AsyncClient(transport=ASGITransport(app=stack), base_url="http://test") as client:
+        post = lambda phone: client.post("/webhook", data={"From": phone, "Body": "Hi"}, headers=HEADERS)
+        held = [asyncio.create_task(post("+1")), asyncio.create_task(post("+2"))]
+        while app.calls < 2:
+            await asyncio.sleep(0.001)
+
+        busy = await post("+3")
+        assert (busy.status_code, busy.headers["retry-after"], busy.content) == (429, "1", EMPTY_TWIML)
+        app.gate.set()
+        assert [r.status_code for r in await asyncio.gather(*held)] == [200, 200]
+
+        # +1 has one token left in its burst of two
+        assert (await post("+1")).status_code == 200
+        limited = await post("+1")
+        assert (limited.status_code, limited.content) == (200, EMPTY_TWIML)
+    assert app.calls == 3
+    assert controller.snapshot()["shed_phone"] == 1
@@ -0,0 +1,128 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.models.change import TreeChange
+from app.models.member import Gender
+from app.models.tree import Role, Tree
+from app.models.versioning import insert_changes
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.services.maintenance_service import MaintenanceService, GCStats
+from app.utils.commands import parse_bulk
+
+async def seed_tree(db_session, phone):
+    owner = await UserService(db_session).get_or_create_user(phone, active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    return tree
+
+async def feed(client, tree_id, since=0):
+    response = await client.get(f"/trees/{tree_id}/changes", params={"since": since})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_mutations_are_logged_and_served_as_deltas(client, db_session):
+    tree = await seed_tree(db_session, "+8000000001")
+    member_service = MemberService(db_session)
+    mum = await member_service.create_member(tree.id, "Meena", date(1952, 7, 1), Gender.FEMALE, 1)
+    kid = await member_service.create_member(tree.id, "Arjun", date(1980, 1, 5), Gender.MALE, 2)
+    await member_service.add_relationship(tree.id, mum.id, kid.id)
+    await member_service.add_event(kid.id, "Graduation", date(2001, 6, 1))
+
+    body = await feed(client, tree.id)
+    assert [(c["entity"], c["op"]) for c in body["changes"]] == [
+        ("tree", "create"), ("access", "create"),
+        ("member", "create"), ("member", "create"), ("relationship", "create"), ("event", "create"),
+    ]
+    assert body["changes"][3]["data"]["name"] == "Arjun"
+    since = body["next_since"]
+    assert (await feed(client, tree.id, since))["changes"] == []
+
+    await member_service.update_member(kid.id, name="Arjun S")
+    friend = await UserService(db_session).get_or_create_user("+8000000002")
+    await TreeService(db_session).grant_access(tree.id, friend.id, Role.VIEWER)
+    await member_service.bulk_create_members(tree.id, parse_bulk([f"Kabir, 01-01-2005, M, child-of {kid.id}"]).lines)
+
+    body = await feed(client, tree.id, since)
+    assert [(c["entity"], c["op"]) for c in body["changes"]] == [
+        ("member", "update"), ("access", "create"), ("member", "create"), ("relationship", "create"),
+    ]
+    assert body["changes"][0]["data"]["name"] == "Arjun S"
+    assert body["changes"][1]["data"]["role"] == "viewer"
+
+@pytest.mark.asyncio
+async def test_compaction_folds_old_entries_and_raises_the_floor(client, db_session):
+    tree = await seed_tree(db_session, "+8000000003")
+    member_service = MemberService(db_session)
+    keep = await member_service.create_member(tree.id, "Asha", date(1950, 1, 1), Gender.FEMALE, 1)
+    gone = await member_service.create_member(tree.id, "Bela", date(1951, 1, 1), Gender.FEMALE, 1)
+    for name in ("Asha K", "Asha R"):
+        await member_service.update_member(keep.id, name=name)
+    await db_session.delete(gone)
+    await db_session.commit()
+
+    old = datetime.now(timezone.utc) - timedelta(days=2)
+    await db_session.execute(update(TreeChange).filter(TreeChange.tree_id == tree.id).values(created_at=old))
+    await db_session.commit()
+
+    stats = await MaintenanceService(db_session).compact_changes(86400, 30 * 86400, GCStats())
+    remaining = (await db_session.execute(
+        select(TreeChange.entity, TreeChange.op, TreeChange.data).filter(TreeChange.tree_id == tree.id)
+        .order_by(TreeChange.id)
+    )).all()
+    # Asha's create + 2 updates fold into the last update, Bela's create into her tombstone
+    assert stats.changes_compacted == 3
+    assert [(e, op) for e, op, _ in remaining] == [
+        ("tree", "create"), ("access", "create"), ("member", "update"), ("member", "delete"),
+    ]
+    assert remaining[2][2]["name"] == "Asha R"
+
+    # Once tombstones expire the feed can no longer be replayed from 0
+    await MaintenanceService(db_session).compact_changes(86400, 86400, GCStats())
+    body = await feed(client, tree.id)
+    assert body["reset"] is True and body["changes"] == []
+    assert (await feed(client, tree.id, body["next_since"]))["reset"] is False
+
+@pytest.mark.asyncio
+async def test_feed_follows_commit_order_not_row_ids(client, db_session):
+    tree = await seed_tree(db_session, "+8000000004")
+    await MemberService(db_session).create_member(tree.id, "Chitra", date(1960, 2, 2), Gender.FEMALE, 1)
+    body = await feed(client, tree.id)
+    seqs = [c["seq"] for c in body["changes"]]
+    version = (await db_session.execute(select(Tree.version).filter(Tree.id == tree.id))).scalar()
+    assert seqs == list(range(seqs[0], seqs[0] + len(seqs))) and seqs[-1] == version
+
+    # A transaction that took its row id early but committed last: a client that
+    # already read past the newest id must still receive it
+    await insert_changes(db_session, [
+        {"id": -1, "tree_id": tree.id, "entity": "tree", "entity_id": tree.id, "op": "update", "data": {"id": tree.id}}
+    ])
+    await db_session.commit()
+    late = (await feed(client, tree.id, body["next_since"]))["changes"]
+    assert [(c["seq"], c["op"]) for c in late] == [(version + 1, "update")]
+
+@pytest.mark.asyncio
+async def test_paging_with_a_reused_etag_never_stops_early(client, db_session):
+    tree = await seed_tree(db_session, "+8000000201")
+    member_service = MemberService(db_session)
+    for name in ("Asha", "Bela", "Chitra"):
+        await member_service.create_member(tree.id, name, date(1950, 1, 1), Gender.FEMALE, 1)
+
+    seen, since, etag = [], 0, None
+    while True:
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await client.get(f"/trees/{tree.id}/changes", params={"since": since, "limit": 2}, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        seen += [c["seq"] for c in body["changes"]]
+        etag = response.headers["etag"]
+        if not body["has_more"]:
+            break
+        since = body["next_since"]
+    assert len(seen) == 5  # tree, access, three members
+
+    # The same page with its own ETag is still a 304
+    response = await client.get(f"/trees/{tree.id}/changes", params={"since": since, "limit": 2}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
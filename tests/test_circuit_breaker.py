@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import event, exc
+from app.database import db_breaker, engine, is_outage
+from app.services.chatbot_service import DB_UNAVAILABLE, DEGRADED_TWIML, MAIN_MENU
+from app.services.chatbot_service import ChatbotService
+from app.services.user_service import UserService
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+def test_breaker_opens_and_probes():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, half_open_trials=1, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    snapshot = breaker.snapshot()
+    assert (snapshot["opened"], snapshot["trials"], snapshot["rejected"]) == (2, 2, 3)
+
+def test_outage_classification():
+    assert is_outage(exc.TimeoutError("QueuePool limit reached"))
+    assert is_outage(exc.OperationalError("SELECT 1", {}, ConnectionRefusedError()))
+    assert not is_outage(exc.IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed")))
+    assert not is_outage(ValueError())
+
+@pytest.mark.asyncio
+async def test_open_breaker_serves_static_reply_without_the_pool(client, real_get_db):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    state = db_breaker.__dict__.copy()
+    try:
+        for _ in range(db_breaker.failure_threshold):
+            db_breaker.record_failure()
+        response = await client.post("/webhook", data={"From": "whatsapp:+6400000001", "Body": "Hi"}, headers=HEADERS)
+        assert (response.status_code, response.text) == (200, DEGRADED_TWIML)
+        assert DB_UNAVAILABLE.text in response.text and MAIN_MENU.fragment in response.text
+        assert statements == []
+        assert (await client.get("/trees/1/changes")).status_code == 503
+
+        # Half-open: the next request is let through, and its success closes the breaker
+        db_breaker.changed_at -= db_breaker.reset_timeout
+        response = await client.post("/webhook", data={"From": "whatsapp:+6400000001", "Body": "menu"}, headers=HEADERS)
+        assert response.status_code == 200 and DB_UNAVAILABLE.text not in response.text
+        assert statements and db_breaker.state == CLOSED
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+        db_breaker.__dict__.update(state)
+
+@pytest.mark.asyncio
+async def test_connection_failure_mid_request_degrades(client, monkeypatch):
+    async def unreachable(service, *args, **kwargs):
+        raise exc.OperationalError("SELECT users", {}, ConnectionResetError())
+
+    monkeypatch.setattr(UserService, "get_or_create_user", unreachable)
+    response = await client.post("/webhook", data={"From": "whatsapp:+6400000002", "Body": "Hi"}, headers=HEADERS)
+    assert response.status_code == 200 and DB_UNAVAILABLE.text in response.text
+
+@pytest.mark.asyncio
+async def test_pool_timeout_inside_a_handler_counts_toward_the_breaker(client, monkeypatch):
+    async def pool_exhausted(service, ctx):
+        raise exc.TimeoutError("QueuePool limit reached")
+
+    monkeypatch.setattr(ChatbotService, "handle_command", pool_exhausted)
+    state = db_breaker.__dict__.copy()
+    try:
+        failures = db_breaker.consecutive_failures
+        response = await client.post("/webhook", data={"From": "whatsapp:+6400000003", "Body": "Hi"}, headers=HEADERS)
+        assert response.status_code == 200 and DB_UNAVAILABLE.text in response.text
+        assert db_breaker.consecutive_failures == failures + 1
+    finally:
+        db_breaker.__dict__.update(state)
@@ -0,0 +1,93 @@
+import pytest
+from datetime import date
+from httpx import AsyncClient
+from app.models.member import Gender
+from app.utils.commands import parse_command, AddMemberCommand, AddEventCommand, BulkImportCommand
+
+def test_parse_add_and_event_commands():
+    assert parse_command('add "Asha Rao" 12-03-1990 F child-of 14') == AddMemberCommand(
+        name="Asha Rao", dob=date(1990, 3, 12), gender=Gender.FEMALE, relation="child", relative_id=14
+    )
+    assert parse_command("event 14 Death Anniversary 01-06-2001") == AddEventCommand(
+        member_id=14, event_type="Death Anniversary", event_date=date(2001, 6, 1)
+    )
+    assert parse_command("2") is None
+    assert parse_command("Addison") is None
+
+    with pytest.raises(ValueError, match="DD-MM-YYYY"):
+        parse_command("add Asha 1990-03-12 F")
+    with pytest.raises(ValueError, match="relative ID"):
+        parse_command("add Asha 12-03-1990 F child-of")
+
+@pytest.mark.asyncio
+async def test_one_shot_commands_build_a_tree(client: AsyncClient):
+    phone = "whatsapp:+6000000001"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    response = await client.post("/webhook", data={"From": phone, "Body": 'add "Ravi Rao" 01-01-1960 M'}, headers=headers)
+    assert "Added Ravi Rao to the tree! (ID" in response.text
+    root_id = response.text.split("(ID ")[1].split(")")[0]
+
+    response = await client.post("/webhook", data={"From": phone, "Body": f"add Asha 12-03-1990 F child-of {root_id}"}, headers=headers)
+    assert "Added Asha to the tree!" in response.text
+
+    response = await client.post("/webhook", data={"From": phone, "Body": "add Meena 12-03-1962 F"}, headers=headers)
+    assert "Say how this member is related" in response.text
+
+    response = await client.post("/webhook", data={"From": phone, "Body": f"event {root_id} Anniversary 01-06-1985"}, headers=headers)
+    assert "Added Anniversary on 01-06-1985 for Ravi Rao" in response.text
+
+    response = await client.post("/webhook", data={"From": phone, "Body": "1"}, headers=headers)
+    assert "Ravi Rao (M), Gen 1" in response.text
+    assert "Asha (F), Gen 2" in response.text
+
+def test_parse_bulk_reports_all_errors_at_once():
+    command = parse_command("bulk\nRavi, 01-01-1960, M\nAsha, 12-03-1990, F, child-of #1, +919999999999")
+    assert isinstance(command, BulkImportCommand)
+    assert [l.relative_line for l in command.lines] == [None, 1]
+    assert command.lines[1].phone == "+919999999999"
+
+    with pytest.raises(ValueError) as excinfo:
+        parse_command("bulk\nRavi, 1960, M\nAsha, 12-03-1990, X\nMeena, 12-03-1990, F, child-of #3")
+    message = str(excinfo.value)
+    assert "Line 1: Invalid date format" in message
+    assert "Line 2: Invalid gender" in message
+    assert "Line 3: #3 must refer to an earlier line" in message
+
+    # Blank lines keep their place in the numbering
+    command = parse_command("bulk\nRavi, 01-01-1960, M\n\nAsha, 12-03-1990, F, child-of #1\nKabir, 01-01-2015, M, child-of #3")
+    assert [(l.line_no, l.relative_line) for l in command.lines] == [(1, None), (3, 1), (4, 3)]
+    with pytest.raises(ValueError) as excinfo:
+        parse_command("bulk\nRavi, 01-01-1960, M\n\nAsha, 12-03-1990, F, child-of #2")
+    assert "Line 3: #2 must refer to an earlier line" in str(excinfo.value)
+
+@pytest.mark.asyncio
+async def test_bulk_paste_adds_members_in_one_message(client: AsyncClient):
+    phone = "whatsapp:+6000000002"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    paste = "\n".join([
+        "bulk",
+        "Grandpa, 01-01-1940, M",
+        "Grandma, 01-01-1942, F, spouse-of #1",
+        "Dad, 01-01-1970, M, child-of #1",
+        "Aunt, 01-01-1972, F, sister-of #3",
+        "Kid, 01-01-2000, O, child-of #3",
+    ])
+    response = await client.post("/webhook", data={"From": phone, "Body": paste}, headers=headers)
+    assert "Added 5 members to the tree!" in response.text
+    dad_id = int(response.text.split("(IDs ")[1].split("-")[0]) + 2
+
+    response = await client.post("/webhook", data={"From": phone, "Body": f"bulk\nCousin, 01-01-2002, F, child-of 999999\nPup, 01-01-2003, M, child-of {dad_id}"}, headers=headers)
+    assert "member 999999 is not in your tree" in response.text
+
+    response = await client.post("/webhook", data={"From": phone, "Body": f"bulk\nPup, 01-01-2003, M, brother-of #1\nBaby, 01-01-2003, F, child-of {dad_id}"}, headers=headers)
+    assert "#1 must refer to an earlier line" in response.text
+
+    response = await client.post("/webhook", data={"From": phone, "Body": "1"}, headers=headers)
+    text = response.text
+    assert "Grandpa (M) &amp; Grandma (F), Gen 1" in text
+    assert "Dad (M), Gen 2" in text
+    assert "Aunt (F), Gen 2" in text
+    assert "Kid (O), Gen 3" in text
+    assert "Cousin" not in text
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy.future import select
+from app.models.tree import Tree
+from app.services.admission import SHED_OVERLOAD, AdmissionController
+from app.services.chatbot_service import ChatbotService, TOO_SLOW, registry
+from app.services.user_service import UserService
+from app.utils.deadline import deadline, remaining, statement_timeout_ms
+
+def test_nested_deadlines_keep_the_earliest():
+    assert remaining() is None and statement_timeout_ms() is None
+    with deadline(10):
+        with deadline(0.5):
+            assert 0.4 < remaining() <= 0.5
+        with deadline(60):
+            assert 9 < remaining() <= 10
+        assert 9000 < statement_timeout_ms() <= 10000
+    with deadline(-1):
+        assert statement_timeout_ms() == 1
+    assert remaining() is None
+
+@pytest.mark.asyncio
+async def test_slow_handler_is_cancelled_and_rolled_back(db_session, monkeypatch):
+    phone = "+6300000001"
+    user = await UserService(db_session).get_or_create_user(phone, active=True)
+    user_id = user.id
+
+    async def slow_main_menu(service, ctx):
+        service.db.add(Tree(owner_id=ctx.user.id))
+        await service.db.flush()
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(registry.get("MAIN_MENU"), "func", slow_main_menu)
+    before = registry.stats["MAIN_MENU"].deadline_exceeded
+    started = time.monotonic()
+    with deadline(0.1):
+        twiml = await ChatbotService(db_session).handle_message(f"whatsapp:{phone}", "1")
+    assert time.monotonic() - started < 1
+    assert twiml == TOO_SLOW.twiml
+    assert registry.stats["MAIN_MENU"].deadline_exceeded == before + 1
+    trees = await db_session.execute(select(Tree).filter(Tree.owner_id == user_id))
+    assert trees.scalars().all() == []
+
+@pytest.mark.asyncio
+async def test_admission_wait_stops_at_the_deadline():
+    controller = AdmissionController(None, max_concurrency=1, queue_timeout=5)
+    assert await controller.acquire("+1") is None
+    started = time.monotonic()
+    with deadline(0.05):
+        assert await controller.acquire("+2") == SHED_OVERLOAD
+    assert time.monotonic() - started < 1
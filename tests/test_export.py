@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+import pytest
+from datetime import date
+from app.config import get_settings
+from app.models.member import Gender
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.services.gedcom_service import GedcomImportService, iter_gedcom_records
+
+async def seed_tree(db_session, phone):
+    owner = await UserService(db_session).get_or_create_user(phone, active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    member_service = MemberService(db_session)
+    dad = await member_service.create_member(tree.id, "Ravi", date(1950, 3, 12), Gender.MALE, 1)
+    mum = await member_service.create_member(tree.id, "Meena", date(1952, 7, 1), Gender.FEMALE, 1)
+    kid = await member_service.create_member(tree.id, "Arjun", date(1980, 1, 5), Gender.MALE, 2, phone="+6000000099")
+    await member_service.add_relationship(tree.id, dad.id, mum.id, "spouse")
+    await member_service.add_relationship(tree.id, dad.id, kid.id)
+    await member_service.add_relationship(tree.id, mum.id, kid.id)
+    return tree
+
+@pytest.mark.asyncio
+async def test_export_ndjson_and_csv(client, db_session):
+    tree = await seed_tree(db_session, "+6000000001")
+
+    response = await client.get(f"/trees/{tree.id}/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["name"] for r in rows] == ["Ravi", "Meena", "Arjun"]
+    assert rows[2]["phone"] == "+6000000099"
+
+    response = await client.get(f"/trees/{tree.id}/export", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["dob"] for r in rows] == ["1950-03-12", "1952-07-01", "1980-01-05"]
+
+@pytest.mark.asyncio
+async def test_export_gedcom_round_trips(client, db_session):
+    tree = await seed_tree(db_session, "+6000000002")
+
+    response = await client.get(f"/trees/{tree.id}/export")
+    assert response.status_code == 200
+    assert 'filename="tree-' in response.headers["content-disposition"]
+    families = [r for r in iter_gedcom_records(response.text.splitlines()) if r.tag == "FAM"]
+    assert len(families) == 1
+    assert len(families[0].values("CHIL")) == 1
+
+    other_owner = await UserService(db_session).get_or_create_user("+6000000003", active=True)
+    copy = await TreeService(db_session).create_tree(other_owner)
+    stats = await GedcomImportService(db_session, copy.id).import_lines(response.text.splitlines())
+    assert (stats.individuals, stats.relationships) == (3, 3)
+    members = {m.name: m for m in await MemberService(db_session).get_members_by_tree(copy.id)}
+    assert members["Arjun"].generation_level == 2
+    assert members["Meena"].dob == date(1952, 7, 1)
+
+@pytest.mark.asyncio
+async def test_export_requires_api_key_and_existing_tree(client, monkeypatch):
+    response = await client.get("/trees/999999/export")
+    assert response.status_code == 404
+    response = await client.get("/trees/1/export", params={"format": "xml"})
+    assert response.status_code == 422
+
+    monkeypatch.setattr(get_settings(), "API_KEY", "secret")
+    response = await client.get("/trees/1/export")
+    assert response.status_code == 401
+    response = await client.get("/trees/999999/export", headers={"X-API-Key": "secret"})
+    assert response.status_code == 404
@@ -0,0 +1,45 @@
+import re
+import inspect
+import pytest
+from datetime import date
+from httpx import AsyncClient
+from app.models.member import Gender
+from app.services import chatbot_service
+from app.services.chatbot_service import ChatbotService, registry
+from app.services.member_service import MemberService
+from app.services.state_store import DatabaseStateStore
+from app.services.tree_service import TreeService
+from app.services.user_service import UserService
+
+def test_every_state_transition_has_a_handler():
+    source = inspect.getsource(chatbot_service)
+    targets = set(re.findall(r'state_store\.set\([^,]+, "([A-Z_]+)"', source))
+    assert targets
+    assert targets <= set(registry.handlers)
+
+@pytest.mark.asyncio
+async def test_dispatch_records_per_state_latency(client: AsyncClient):
+    phone = "whatsapp:+5000000001"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    before = registry.stats["ADD_MEMBER_NAME"].count
+
+    await client.post("/webhook", data={"From": phone, "Body": "Hi"}, headers=headers)
+    await client.post("/webhook", data={"From": phone, "Body": "2"}, headers=headers)
+    await client.post("/webhook", data={"From": phone, "Body": "Asha"}, headers=headers)
+
+    stats = registry.stats["ADD_MEMBER_NAME"]
+    assert stats.count == before + 1
+    assert stats.max_seconds > 0
+
+@pytest.mark.asyncio
+async def test_edit_relation_lists_prefetched_relatives(db_session):
+    owner = await UserService(db_session).get_or_create_user("+5000000101", active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    member_service = MemberService(db_session)
+    mum = await member_service.create_member(tree.id, "Meena", date(1952, 7, 1), Gender.FEMALE, 1)
+    kid = await member_service.create_member(tree.id, "Arjun", date(1980, 1, 5), Gender.MALE, 2)
+    await DatabaseStateStore(db_session).set(owner.id, "EDIT_SELECT_FIELD", {"member_id": kid.id})
+
+    reply = await ChatbotService(db_session).handle_message("+5000000101", "5")
+    assert f"{mum.id}. Meena" in reply
+    assert "Arjun" not in reply
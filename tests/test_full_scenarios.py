@@ -2,7 +2,7 @@ import pytest
 from httpx import AsyncClient
 
 @pytest.mark.asyncio
-async def test_full_family_scenario(client: AsyncClient):
+async def test_full_family_scenario(client: AsyncClient, query_budget):
     # Users
     user_a = "whatsapp:+1111111111" # Owner
     user_b = "whatsapp:+2222222222" # Viewer -> Owner
@@ -13,30 +13,43 @@ async def test_full_family_scenario(client: AsyncClient):
     # 1. User A Creates Tree & Adds Members
     # ==========================================
     
+    # Query budgets are per message and include the tree version bump and
+    # change-log rows written alongside every edit (see models/versioning.py)
+
     # Start: A says Hi
-    await client.post("/webhook", data={"From": user_a, "Body": "Hi"}, headers=headers)
+    with query_budget(3, "main menu"):
+        await client.post("/webhook", data={"From": user_a, "Body": "Hi"}, headers=headers)
     
     # Add Member (Root)
-    await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers)
-    await client.post("/webhook", data={"From": user_a, "Body": "Grandpa"}, headers=headers) # Name
-    await client.post("/webhook", data={"From": user_a, "Body": "01-01-1950"}, headers=headers) # DOB
-    await client.post("/webhook", data={"From": user_a, "Body": "Male"}, headers=headers) # Gender
-    await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers) # Phone
+    with query_budget(7, "add member, creating the tree"):
+        await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers)
+    with query_budget(2, "add member name"):
+        await client.post("/webhook", data={"From": user_a, "Body": "Grandpa"}, headers=headers) # Name
+    with query_budget(2, "add member dob"):
+        await client.post("/webhook", data={"From": user_a, "Body": "01-01-1950"}, headers=headers) # DOB
+    with query_budget(2, "add member gender"):
+        await client.post("/webhook", data={"From": user_a, "Body": "Male"}, headers=headers) # Gender
+    with query_budget(8, "add first member"):
+        await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers) # Phone
     
     # Add Member (Spouse to Root)
     # Flow: Add Member -> Name -> DOB -> Gender -> Phone -> Relation ID -> Relation Type
-    await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers)
+    with query_budget(3, "add member"):
+        await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "Grandma"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "01-01-1955"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "Female"}, headers=headers)
-    await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers)
+    with query_budget(4, "add member phone, listing relatives"):
+        await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers)
     
     # Select relative: 1 (Grandpa)
-    response = await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers)
+    with query_budget(2, "select relative"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers)
     assert "What is the relationship of the NEW member" in response.text
     
     # Select relation: 4 (Spouse)
-    response = await client.post("/webhook", data={"From": user_a, "Body": "4"}, headers=headers)
+    with query_budget(9, "add member final step"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "4"}, headers=headers)
     assert "Added Grandma to the tree" in response.text
 
     # ==========================================
@@ -44,10 +57,14 @@ async def test_full_family_scenario(client: AsyncClient):
     # ==========================================
     
     # Edit Member -> Select Member (1) -> Select Field (4 Phone) -> Enter Value
-    await client.post("/webhook", data={"From": user_a, "Body": "3"}, headers=headers) # Edit
-    await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers) # Grandpa
-    await client.post("/webhook", data={"From": user_a, "Body": "4"}, headers=headers) # Phone
-    response = await client.post("/webhook", data={"From": user_a, "Body": "+1999999999"}, headers=headers)
+    with query_budget(4, "edit member"):
+        await client.post("/webhook", data={"From": user_a, "Body": "3"}, headers=headers) # Edit
+    with query_budget(5, "edit select member (locks it)"):
+        await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers) # Grandpa
+    with query_budget(4, "edit select field (prefetches the relatives list)"):
+        await client.post("/webhook", data={"From": user_a, "Body": "4"}, headers=headers) # Phone
+    with query_budget(6, "edit save value (unlocks it)"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "+1999999999"}, headers=headers)
     assert "Member updated successfully" in response.text
 
     # ==========================================
@@ -61,7 +78,8 @@ async def test_full_family_scenario(client: AsyncClient):
     await client.post("/webhook", data={"From": user_a, "Body": "Male"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers) # Grandpa
-    response = await client.post("/webhook", data={"From": user_a, "Body": "3"}, headers=headers) # Child
+    with query_budget(9, "add child final step"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "3"}, headers=headers) # Child
     assert "Added Dad to the tree" in response.text
 
     # ==========================================
@@ -75,11 +93,13 @@ async def test_full_family_scenario(client: AsyncClient):
     await client.post("/webhook", data={"From": user_a, "Body": "Male"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "skip"}, headers=headers)
     await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers) # Grandpa
-    response = await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers) # Father
+    with query_budget(9, "add parent final step"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "2"}, headers=headers) # Father
     assert "Added GreatGrandpa to the tree" in response.text
 
     # View Tree
-    response = await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers)
+    with query_budget(4, "view tree"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": "1"}, headers=headers)
     assert "Grandpa" in response.text
     assert "Grandma" in response.text
     assert "Dad" in response.text
@@ -91,7 +111,8 @@ async def test_full_family_scenario(client: AsyncClient):
     
     # Share Tree -> Enter Phone
     await client.post("/webhook", data={"From": user_a, "Body": "4"}, headers=headers)
-    response = await client.post("/webhook", data={"From": user_a, "Body": user_b.replace("whatsapp:", "")}, headers=headers)
+    with query_budget(8, "share"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": user_b.replace("whatsapp:", "")}, headers=headers)
     assert "Access granted" in response.text
 
     # ==========================================
@@ -102,7 +123,8 @@ async def test_full_family_scenario(client: AsyncClient):
     await client.post("/webhook", data={"From": user_b, "Body": "Hi"}, headers=headers)
     
     # User B tries to View Tree (Option 1)
-    response = await client.post("/webhook", data={"From": user_b, "Body": "1"}, headers=headers)
+    with query_budget(4, "view shared tree"):
+        response = await client.post("/webhook", data={"From": user_b, "Body": "1"}, headers=headers)
     
     assert "Grandpa" in response.text
     assert "Grandma" in response.text
@@ -113,7 +135,8 @@ async def test_full_family_scenario(client: AsyncClient):
     # ==========================================
     
     # User B tries Add Member (Option 2)
-    response = await client.post("/webhook", data={"From": user_b, "Body": "2"}, headers=headers)
+    with query_budget(2, "viewer blocked"):
+        response = await client.post("/webhook", data={"From": user_b, "Body": "2"}, headers=headers)
     assert "You are a Viewer" in response.text or "Permission denied" in response.text
     print("\n[SUCCESS] User B blocked from adding members.")
 
@@ -127,7 +150,8 @@ async def test_full_family_scenario(client: AsyncClient):
     # ==========================================
     
     await client.post("/webhook", data={"From": user_a, "Body": "5"}, headers=headers) # Transfer
-    response = await client.post("/webhook", data={"From": user_a, "Body": user_b.replace("whatsapp:", "")}, headers=headers)
+    with query_budget(9, "transfer (SQLite reads the grants it upserts)"):
+        response = await client.post("/webhook", data={"From": user_a, "Body": user_b.replace("whatsapp:", "")}, headers=headers)
     assert "Ownership transferred" in response.text
 
     # ==========================================
@@ -136,12 +160,13 @@ async def test_full_family_scenario(client: AsyncClient):
     
     # User B views tree (now Owner)
     response = await client.post("/webhook", data={"From": user_b, "Body": "1"}, headers=headers)
-    # This might still fail if get_tree_by_owner check is strict on chatbot_service side 
+    # This might still fail if the owner check is strict on chatbot_service side 
     # but strictly speaking B IS the owner now in DB.
     
     # User B deletes
     await client.post("/webhook", data={"From": user_b, "Body": "6"}, headers=headers) # Delete
-    response = await client.post("/webhook", data={"From": user_b, "Body": "yes"}, headers=headers)
+    with query_budget(11, "delete tree"):
+        response = await client.post("/webhook", data={"From": user_b, "Body": "yes"}, headers=headers)
     
     # If B is owner, delete should work.
     if "Tree deleted successfully" in response.text:
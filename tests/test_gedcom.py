@@ -0,0 +1,95 @@
+import pytest
+from datetime import date
+from sqlalchemy.future import select
+from app.models.member import Member, Relationship, Gender, UNKNOWN_DOB
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.gedcom_service import GedcomImportService, iter_gedcom_records, parse_gedcom_date
+from app.utils.query_counter import QueryCounter
+
+# The child's family appears before its spouse is defined, so it is resolved at the end
+GEDCOM = """0 HEAD
+1 CHAR UTF-8
+0 @I1@ INDI
+1 NAME Ravi /Sharma/
+1 SEX M
+1 BIRT
+2 DATE 12 MAR 1950
+0 @I2@ INDI
+1 NAME Meena /Sharma/
+1 SEX F
+1 BIRT
+2 DATE ABT 1952
+0 @I3@ INDI
+1 NAME Arjun /Sharma/
+1 SEX M
+0 @F1@ FAM
+1 HUSB @I1@
+1 WIFE @I2@
+1 CHIL @I3@
+0 @F2@ FAM
+1 HUSB @I3@
+1 WIFE @I4@
+1 CHIL @I5@
+0 @I4@ INDI
+1 NAME Priya
+1 SEX F
+0 @I5@ INDI
+1 NAME Kabir /Sharma/
+1 SEX M
+0 TRLR
+"""
+
+def test_records_and_dates_parse():
+    records = list(iter_gedcom_records(GEDCOM.splitlines()))
+    assert [r.tag for r in records][:3] == ["HEAD", "INDI", "INDI"]
+    assert records[1].sub_value("BIRT", "DATE") == "12 MAR 1950"
+    assert parse_gedcom_date("12 MAR 1950") == date(1950, 3, 12)
+    assert parse_gedcom_date("BET 1900 AND 1910") == date(1900, 1, 1)
+    assert parse_gedcom_date("") == UNKNOWN_DOB
+
+@pytest.mark.asyncio
+async def test_import_creates_members_relationships_and_generations(db_session):
+    owner = await UserService(db_session).get_or_create_user("+5000000001", active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+
+    stats = await GedcomImportService(db_session, tree.id, chunk_size=2).import_lines(GEDCOM.splitlines())
+    assert stats.individuals == 5
+    # 2 spouse links + 4 parent links
+    assert stats.relationships == 6
+
+    result = await db_session.execute(select(Member).filter(Member.tree_id == tree.id))
+    members = {m.name: m for m in result.scalars().all()}
+    assert members["Ravi Sharma"].dob == date(1950, 3, 12)
+    assert members["Meena Sharma"].gender == Gender.FEMALE
+    assert members["Arjun Sharma"].dob == UNKNOWN_DOB
+    assert {name: m.generation_level for name, m in members.items()} == {
+        "Ravi Sharma": 1, "Meena Sharma": 1, "Arjun Sharma": 2, "Priya": 2, "Kabir Sharma": 3,
+    }
+
+    result = await db_session.execute(
+        select(Relationship.parent_id).filter(
+            Relationship.child_id == members["Kabir Sharma"].id, Relationship.relation_type == "parent"
+        )
+    )
+    assert set(result.scalars().all()) == {members["Arjun Sharma"].id, members["Priya"].id}
+
+@pytest.mark.asyncio
+async def test_interleaved_families_do_not_split_member_chunks(db_session):
+    owner = await UserService(db_session).get_or_create_user("+5000000002", active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    lines = ["0 HEAD"]
+    for f in range(10):
+        for i, sex in enumerate("MFM"):
+            lines += [f"0 @I{f}_{i}@ INDI", f"1 NAME Person {f}.{i}", f"1 SEX {sex}"]
+        lines += [f"0 @F{f}@ FAM", f"1 HUSB @I{f}_0@", f"1 WIFE @I{f}_1@", f"1 CHIL @I{f}_2@"]
+    lines.append("0 TRLR")
+
+    with QueryCounter(trace=True) as counter:
+        stats = await GedcomImportService(db_session, tree.id, chunk_size=100).import_lines(lines)
+    assert stats.individuals == 30
+    assert stats.relationships == 30
+
+    # Every commit bumps the tree version: one chunk each of members, relationships and generations, then the reset
+    commits = [s for s, _ in counter.statements if s.startswith("UPDATE trees") and "RETURNING" not in s]
+    assert len(commits) == 4
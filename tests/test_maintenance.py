@@ -0,0 +1,100 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.models.user import User, ArchivedUser
+from app.models.tree import Role
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.maintenance_service import MaintenanceService, GCStats
+from app.services.state_store import DatabaseStateStore
+
+@pytest.mark.asyncio
+async def test_stale_states_are_reset_in_batches(db_session):
+    user_service = UserService(db_session)
+    users = [await user_service.get_or_create_user(f"+40000000{i:02d}", active=True) for i in range(5)]
+    user_ids = [u.id for u in users]
+    for user_id in user_ids:
+        await user_service.update_state(user_id, "ADD_MEMBER_DOB", {"name": "Half done"})
+
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+    await db_session.execute(
+        update(User).filter(User.id.in_(user_ids[:3])).values(state_updated_at=old)
+    )
+    await db_session.commit()
+
+    stats = await MaintenanceService(db_session, batch_size=2).reset_stale_states(86400, GCStats())
+    assert stats.states_reset == 3
+    assert stats.batches == 2
+
+    result = await db_session.execute(
+        select(User.current_state).filter(User.id.in_(user_ids)).order_by(User.id)
+    )
+    assert result.scalars().all() == [None, None, None, "ADD_MEMBER_DOB", "ADD_MEMBER_DOB"]
+
+@pytest.mark.asyncio
+async def test_expired_state_reads_as_empty(db_session):
+    user_service = UserService(db_session)
+    user = await user_service.get_or_create_user("+4000000100", active=True)
+    await user_service.update_state(user.id, "EVENT_TYPE", {"member_id": 1})
+    user.state_updated_at = datetime.now(timezone.utc) - timedelta(days=30)
+
+    assert await DatabaseStateStore(db_session).get(user) == (None, {})
+
+@pytest.mark.asyncio
+async def test_only_unreferenced_inactive_users_are_archived(db_session):
+    user_service = UserService(db_session)
+    tree_service = TreeService(db_session)
+    owner = await user_service.get_or_create_user("+4000000200", active=True)
+    tree = await tree_service.create_tree(owner)
+
+    shared = await user_service.get_or_create_user("+4000000201")
+    await tree_service.grant_access(tree.id, shared.id, Role.VIEWER)
+    orphan = await user_service.get_or_create_user("+4000000202")
+    fresh = await user_service.get_or_create_user("+4000000203")
+
+    old = datetime.now(timezone.utc) - timedelta(days=90)
+    await db_session.execute(
+        update(User).filter(User.id.in_([owner.id, shared.id, orphan.id])).values(created_at=old)
+    )
+    await db_session.commit()
+
+    stats = await MaintenanceService(db_session).archive_inactive_users(30 * 86400, GCStats())
+    assert stats.users_archived == 1
+
+    remaining = (await db_session.execute(select(User.phone).filter(User.phone.like("+40000002%")))).scalars().all()
+    assert sorted(remaining) == [owner.phone, shared.phone, fresh.phone]
+    archived = (await db_session.execute(select(ArchivedUser).filter(ArchivedUser.user_id == orphan.id))).scalars().one()
+    assert archived.phone == orphan.phone
+
+@pytest.mark.asyncio
+async def test_users_touched_after_selection_are_left_alone(db_session, session_factory, monkeypatch):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user("+4000000300", active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    chatty = await user_service.get_or_create_user("+4000000301", active=True)
+    await user_service.update_state(chatty.id, "ADD_MEMBER_DOB", {"name": "Half done"})
+    invited = await user_service.get_or_create_user("+4000000302")
+    tree_id, chatty_id, invited_id = tree.id, chatty.id, invited.id
+    old = datetime.now(timezone.utc) - timedelta(days=90)
+    await db_session.execute(update(User).filter(User.id == chatty_id).values(state_updated_at=old))
+    await db_session.execute(update(User).filter(User.id == invited_id).values(created_at=old))
+    await db_session.commit()
+
+    select_ids = MaintenanceService._next_ids
+    async def select_then_race(service, last_id, *criteria):
+        ids = await select_ids(service, last_id, *criteria)
+        # Between the GC's SELECT and its write, the user replies and the invite is granted
+        async with session_factory() as other:
+            await UserService(other).update_state(chatty_id, "ADD_MEMBER_GENDER", {"name": "Half done"})
+            await TreeService(other).grant_access(tree_id, invited_id, Role.VIEWER)
+        return ids
+    monkeypatch.setattr(MaintenanceService, "_next_ids", select_then_race)
+
+    service = MaintenanceService(db_session)
+    assert (await service.reset_stale_states(86400, GCStats())).states_reset == 0
+    assert (await service.archive_inactive_users(30 * 86400, GCStats())).users_archived == 0
+    db_session.expire_all()
+    assert (await db_session.get(User, chatty_id)).current_state == "ADD_MEMBER_GENDER"
+    assert await db_session.get(User, invited_id) is not None
+    assert (await db_session.execute(select(ArchivedUser).filter(ArchivedUser.user_id == invited_id))).first() is None
@@ -0,0 +1,32 @@
+import pytest
+from datetime import date
+from app.models.member import Member, Gender
+from app.services.chatbot_service import ChatbotService
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+
+@pytest.mark.asyncio
+async def test_projected_rows_match_entities_without_hydrating(db_session):
+    owner = await UserService(db_session).get_or_create_user("+1300000001", active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    member_service = MemberService(db_session)
+    mum = await member_service.create_member(tree.id, "Meena", date(1952, 7, 1), Gender.FEMALE, 1)
+    dad = await member_service.create_member(tree.id, "Ravi", date(1950, 3, 9), Gender.MALE, 1)
+    kid = await member_service.create_member(tree.id, "Arjun", date(1980, 1, 5), Gender.MALE, 2)
+    await member_service.add_relationship(tree.id, mum.id, kid.id)
+    await member_service.add_relationship(tree.id, dad.id, kid.id)
+    db_session.expunge_all()
+
+    rows = await member_service.get_member_rows(tree.id)
+    assert [(r.id, r.name, r.gender, r.generation_level) for r in rows] == [
+        (mum.id, "Meena", Gender.FEMALE, 1), (dad.id, "Ravi", Gender.MALE, 1), (kid.id, "Arjun", Gender.MALE, 2),
+    ]
+    links = await member_service.get_relationship_rows(tree.id)
+    # Nothing was put in the identity map
+    assert not any(isinstance(obj, Member) for obj in db_session.identity_map.values())
+
+    chatbot = ChatbotService(db_session)
+    members = await member_service.get_members_by_tree(tree.id)
+    relationships = await member_service.get_relationships_by_tree(tree.id)
+    assert chatbot._build_tree_text(rows, links) == chatbot._build_tree_text(members, relationships)
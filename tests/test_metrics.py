@@ -0,0 +1,57 @@
+import re
+import pytest
+from sqlalchemy import text
+from app.utils.metrics import Histogram, MetricsWriter
+from app.utils.query_counter import QueryCounter
+
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+def sample(text, name, **labels):
+    selector = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+    match = re.search(rf"^{name}{re.escape(selector)} (\S+)$", text, re.M)
+    assert match, f"{name} {labels} missing"
+    return float(match.group(1))
+
+def test_histogram_exposition():
+    histogram = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    w = MetricsWriter()
+    w.family("t_seconds", "histogram", "Test")
+    w.histogram("t_seconds", histogram, {"state": 'A"B'})
+    assert w.render().splitlines()[2:] == [
+        't_seconds_bucket{state="A\\"B",le="0.1"} 2',
+        't_seconds_bucket{state="A\\"B",le="1.0"} 3',
+        't_seconds_bucket{state="A\\"B",le="+Inf"} 4',
+        't_seconds_sum{state="A\\"B"} 3.65',
+        't_seconds_count{state="A\\"B"} 4',
+    ]
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client, real_get_db):
+    before = sample((await client.get("/metrics")).text, "http_request_db_queries_sum", path="/webhook")
+    response = await client.post("/webhook", data={"From": "whatsapp:+6500000001", "Body": "menu"}, headers=HEADERS)
+    assert response.status_code == 200
+
+    scrape = await client.get("/metrics")
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = scrape.text
+    assert sample(text, "fsm_state_seconds_count", state="MAIN_MENU") >= 1
+    assert sample(text, "fsm_state_seconds_bucket", state="MAIN_MENU", le="+Inf") >= 1
+    assert sample(text, "fsm_state_errors_total", state="ADD_MEMBER_RELATION_TYPE") >= 0
+    assert sample(text, "http_request_db_queries_sum", path="/webhook") > before
+    assert sample(text, "http_responses_total", path="/webhook", status=200) >= 1
+    assert sample(text, "db_query_seconds_count") > 0
+    assert sample(text, "db_breaker_state") == 0
+
+@pytest.mark.asyncio
+async def test_query_counters_nest_and_budgets_fail_with_the_statements(db_session, query_budget):
+    with QueryCounter() as outer:
+        with query_budget(1, "two selects") as inner:
+            await db_session.execute(text("SELECT 1"))
+        with pytest.raises(AssertionError, match=r"two selects exceeded its budget of 1: 2 statements(.|\n)*SELECT 2"):
+            with query_budget(1, "two selects"):
+                await db_session.execute(text("SELECT 1"))
+                await db_session.execute(text("SELECT 2"))
+    assert (inner.queries, outer.queries) == (1, 3)
+    assert outer.statements is None and inner.statements == [("SELECT 1", inner.db_seconds)]
@@ -0,0 +1,105 @@
+import pytest
+from datetime import date
+from sqlalchemy.future import select
+from app.models.member import Gender
+from app.models.tree import Role
+from app.models.user import User
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.services.notifier import ChangeNotifier, get_notifier, set_notifier
+from app.services.outbound import FakeSender
+
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+async def seed_tree(db_session, phone, viewers):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user(phone, active=True)
+    tree_service = TreeService(db_session)
+    tree = await tree_service.create_tree(owner)
+    for viewer_phone, opted_in in viewers:
+        viewer = await user_service.get_or_create_user(viewer_phone, active=True)
+        await tree_service.grant_access(tree.id, viewer.id, Role.VIEWER)
+        await user_service.set_notify_changes(viewer.id, opted_in)
+    await user_service.set_notify_changes(owner.id, True)
+    return owner, tree
+
+@pytest.mark.asyncio
+async def test_quick_edits_are_coalesced_into_one_digest(db_session, session_factory):
+    owner, tree = await seed_tree(
+        db_session, "+1600000001", [("+1600000002", True), ("+1600000003", True), ("+1600000004", False)]
+    )
+    tree_id = tree.id
+    clock, sender = Clock(), FakeSender()
+    notifier = ChangeNotifier(session_factory, sender, window_seconds=60, clock=clock)
+    set_notifier(notifier)
+    try:
+        db_session.info["actor_id"] = owner.id
+        member_service = MemberService(db_session)
+        asha = await member_service.create_member(tree.id, "Asha", date(1950, 1, 1), Gender.FEMALE, 1)
+        bela = await member_service.create_member(tree.id, "Bela", date(1975, 1, 1), Gender.FEMALE, 2)
+        await member_service.add_relationship(tree.id, asha.id, bela.id)
+        for i in range(7):
+            await member_service.update_member(bela.id, name=f"Bela {i}")
+        await member_service.update_member(asha.id, name="Asha K")
+
+        # A rolled back edit is never announced
+        asha.name = "Nope"
+        await db_session.flush()
+        await db_session.rollback()
+        del db_session.info["actor_id"]
+
+        assert notifier.snapshot()["changes_enqueued"] == 11
+        assert list(notifier.pending) == [tree_id]
+        # Nothing goes out before the window closes
+        assert await notifier.flush_due() == 0
+        clock.now += 61
+        assert await notifier.flush_due() == 2
+        await notifier.drain()
+    finally:
+        set_notifier(None)
+
+    # The actor and the viewer who did not opt in get nothing
+    assert sorted(m.to for m in sender.sent) == ["+1600000002", "+1600000003"]
+    # Bela's renames fold into her creation
+    assert sender.sent[0].body.splitlines()[1:3] == ["• Added: Asha K, Bela 6", "• 1 relationship/event change(s)"]
+    snapshot = notifier.snapshot()
+    assert (snapshot["digests_flushed"], snapshot["messages_sent"], snapshot["queue_depth"]) == (1, 2, 0)
+
+@pytest.mark.asyncio
+async def test_webhook_edit_only_records_the_digest(client, db_session, session_factory):
+    phone = "+1600000011"
+    await client.post("/webhook", data={"From": f"whatsapp:{phone}", "Body": 'add "Root" 01-01-1950 M'}, headers=HEADERS)
+    owner = await UserService(db_session).get_user_by_phone(phone)
+    tree, _, _ = await TreeService(db_session).get_tree_and_role(owner.id)
+    viewer = await UserService(db_session).get_or_create_user("+1600000012", active=True)
+    await TreeService(db_session).grant_access(tree.id, viewer.id, Role.VIEWER)
+
+    response = await client.post("/webhook", data={"From": "whatsapp:+1600000012", "Body": "notify on"}, headers=HEADERS)
+    assert "You will get a summary" in response.text
+    opted_in = (await db_session.execute(select(User.notify_changes).filter(User.id == viewer.id))).scalar()
+    assert opted_in is True
+
+    root = (await MemberService(db_session).get_member_rows(tree.id))[0]
+
+    sender = FakeSender()
+    set_notifier(ChangeNotifier(session_factory, sender, window_seconds=60))
+    try:
+        body = f'add "Kid" 01-01-1980 F child-of {root.id}'
+        await client.post("/webhook", data={"From": f"whatsapp:{phone}", "Body": body}, headers=HEADERS)
+        notifier = get_notifier()
+        # The webhook only touched the in-memory digest
+        assert (sender.batches, notifier.queue.qsize()) == (0, 0)
+        assert notifier.pending[tree.id].added == ["Kid"]
+        await notifier.flush_due(force=True)
+        await notifier.drain()
+    finally:
+        set_notifier(None)
+    assert [m.to for m in sender.sent] == ["+1600000012"]
@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from datetime import date
+from sqlalchemy import event, func
+from sqlalchemy.future import select
+from app.models.reminder import ReminderDelivery
+from app.models.member import Gender
+from app.models.tree import Role
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.services.outbound import FakeSender
+from app.services.reminder_service import ReminderService, ReminderStats
+
+async def seed_tree(db_session, phone, members, viewers=()):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user(phone, active=True)
+    tree_service = TreeService(db_session)
+    tree = await tree_service.create_tree(owner)
+    member_service = MemberService(db_session)
+    created = [
+        await member_service.create_member(tree.id, name, dob, Gender.FEMALE, 1) for name, dob in members
+    ]
+    for viewer_phone, active in viewers:
+        viewer = await user_service.get_or_create_user(viewer_phone, active=active)
+        await tree_service.grant_access(tree.id, viewer.id, Role.VIEWER)
+    return tree, created
+
+class CrashingSender(FakeSender):
+    def __init__(self, crash_on_batch):
+        super().__init__()
+        self.crash_on_batch = crash_on_batch
+
+    async def send_batch(self, messages):
+        if self.batches + 1 == self.crash_on_batch:
+            raise RuntimeError("worker died")
+        return await super().send_batch(messages)
+
+@pytest.mark.asyncio
+async def test_reminders_are_grouped_per_tree_and_sent_once(db_session):
+    day = date(2026, 3, 14)
+    tree, (asha, bela) = await seed_tree(
+        db_session, "+1500000001", [("Asha", date(1950, 3, 14)), ("Bela", date(1960, 5, 1))],
+        viewers=[("+1500000002", True), ("+1500000003", False)],
+    )
+    await MemberService(db_session).add_event(bela.id, "Wedding", date(1985, 3, 14))
+    await seed_tree(db_session, "+1500000011", [("Esha", date(2000, 3, 14)), ("Leap", date(1992, 2, 29))])
+    await seed_tree(db_session, "+1500000021", [("Nobody", date(1970, 3, 15))])
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        sender = FakeSender()
+        service = ReminderService(db_session, sender, batch_size=2)
+        stats = await service.plan(day, ReminderStats())
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    # Occasions across all trees, their recipients, one outbox insert
+    assert len(statements) == 3
+    assert (stats.trees, stats.planned) == (2, 3)
+
+    stats = await service.run(day)
+    assert (stats.sent, stats.failed, stats.abandoned) == (3, 0, 0)
+    assert sender.batches == 2
+    bodies = {m.to: m.body for m in sender.sent}
+    # The viewer who never messaged the bot is skipped
+    assert set(bodies) == {"+1500000001", "+1500000002", "+1500000011"}
+    assert bodies["+1500000001"] == bodies["+1500000002"] == (
+        "🎂 *Today in your family tree*\n• Asha: Birthday (turns 76)\n• Bela: Wedding (41 years)"
+    )
+
+    # Running the day again (scheduler restart) sends nothing
+    again = FakeSender()
+    await ReminderService(db_session, again).run(day)
+    assert again.sent == []
+
+    # 29 February birthdays come round on 1 March in other years
+    occasions = await service.find_occasions(date(2027, 3, 1))
+    assert [(o.name, o.years) for tree_occasions in occasions.values() for o in tree_occasions] == [("Leap", 35)]
+
+@pytest.mark.asyncio
+async def test_crashed_run_resumes_without_double_sending(db_session):
+    day = date(2026, 8, 9)
+    await seed_tree(
+        db_session, "+1500000031", [("Farah", date(1990, 8, 9))],
+        viewers=[("+1500000032", True), ("+1500000033", True)],
+    )
+    crashing = CrashingSender(crash_on_batch=2)
+    with pytest.raises(RuntimeError):
+        await ReminderService(db_session, crashing, batch_size=1).run(day)
+    assert len(crashing.sent) == 1
+
+    resumed = FakeSender()
+    stats = await ReminderService(db_session, resumed, batch_size=1).run(day)
+    # The batch claimed when the worker died is not retried
+    assert (stats.sent, stats.abandoned) == (1, 1)
+    phones = [m.to for m in crashing.sent + resumed.sent]
+    assert len(phones) == len(set(phones)) == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_never_send_the_same_row(db_session, session_factory):
+    day = date(2026, 9, 21)
+    await seed_tree(
+        db_session, "+1500000041", [("Gita", date(1980, 9, 21))],
+        viewers=[(f"+15000000{n}", True) for n in range(42, 48)],
+    )
+    await ReminderService(db_session, FakeSender()).plan(day, ReminderStats())
+
+    senders = [FakeSender(), FakeSender()]
+    async with session_factory() as first, session_factory() as second:
+        await asyncio.gather(
+            ReminderService(first, senders[0], batch_size=2).deliver(day, ReminderStats()),
+            ReminderService(second, senders[1], batch_size=2).deliver(day, ReminderStats()),
+        )
+    phones = [m.to for sender in senders for m in sender.sent]
+    assert len(phones) == len(set(phones)) == 7
+
+@pytest.mark.asyncio
+async def test_preview_leaves_the_outbox_untouched(db_session):
+    day = date(2026, 4, 2)
+    await seed_tree(db_session, "+1500000201", [("Asha", date(1950, 4, 2))], viewers=[("+1500000202", True)])
+    service = ReminderService(db_session, FakeSender(), batch_size=1)
+    stats, messages = await service.preview(day)
+    assert (stats.trees, stats.planned) == (1, 2)
+    assert sorted(m.to for m in messages) == ["+1500000201", "+1500000202"]
+    assert (await db_session.execute(
+        select(func.count()).select_from(ReminderDelivery).filter(ReminderDelivery.reminder_date == day)
+    )).scalar() == 0
+
+    # Planned rows stay pending through a dry run and are still sent by the real one
+    await service.plan(day, ReminderStats())
+    stats, messages = await service.preview(day)
+    assert (stats.planned, len(messages)) == (0, 2)
+    result = await db_session.execute(select(ReminderDelivery.status).filter(ReminderDelivery.reminder_date == day))
+    assert result.scalars().all() == ["pending", "pending"]
+    assert (await service.run(day)).sent == 2
@@ -0,0 +1,106 @@
+import pathlib
+import pytest
+import xml.etree.ElementTree as ET
+from sqlalchemy import event
+from twilio.twiml.messaging_response import MessagingResponse
+from app.config import get_settings
+from app.services import chatbot_service
+from app.utils.twiml import ChunkedResponse, StaticReply, split_text, text_size
+
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+GOLDEN = pathlib.Path(__file__).parent / "golden"
+FAMILY = "👨‍👩‍👧"  # 5 code points, 8 UTF-16 units, 18 UTF-8 bytes
+
+def bodies(twiml: str):
+    return [m.text for m in ET.fromstring(twiml).iter("Message")]
+
+def test_split_keeps_lines_and_emoji_sequences_whole():
+    lines = "\n".join(f"{i}. 🎂 Member number {i}" for i in range(200))
+    parts = split_text(lines, max_chars=300, max_bytes=1000)
+    assert len(parts) > 1 and "\n".join(parts) == lines
+    assert all(text_size(p)[0] <= 300 for p in parts)
+    # Greedy: the next part's first line would not have fit
+    assert all(text_size(f"{a}\n{b.split(chr(10))[0]}")[0] > 300 for a, b in zip(parts, parts[1:]))
+
+    # One long line of ZWJ sequences and flags, with and without spaces
+    for line in (FAMILY * 200, " ".join([FAMILY] * 200), "🇮🇳" * 200):
+        parts = split_text(line, max_chars=100, max_bytes=150)
+        assert all(text_size(p)[0] <= 100 and text_size(p)[1] <= 150 for p in parts)
+        assert "".join(parts).replace(" ", "") == line.replace(" ", "")
+        unit = FAMILY if FAMILY in line else "🇮🇳"
+        assert all(p.replace(" ", "").replace(unit, "") == "" for p in parts)
+
+def test_render_caps_parts_and_returns_the_rest():
+    response = ChunkedResponse(max_chars=200, max_parts=2)
+    response.message("\n".join(f"Line {i}" for i in range(100)))
+    response.message("🌳 menu")
+    twiml, rest = response.render()
+    shown = bodies(twiml)
+    assert len(shown) == 2 and "Reply *more* for the rest" in shown[-1]
+    assert all(text_size(b)[0] <= 200 for b in shown)
+    assert rest[-1] == "🌳 menu"
+
+    twiml, left = response.render(rest)
+    assert bodies(twiml)[0] == rest[0] and left == rest[2:]
+
+def reference(*texts):
+    response = MessagingResponse()
+    for text in texts:
+        response.message(text)
+    return str(response)
+
+def test_twiml_matches_messaging_response():
+    statics = [v for v in vars(chatbot_service).values() if isinstance(v, StaticReply)]
+    assert len(statics) >= 5
+    for static in statics:
+        response = ChunkedResponse()
+        response.message(static)
+        assert response.render() == (static.twiml, [])
+        assert static.twiml == reference(static.text)
+
+    samples = ["", "a & <b> \"q\" 's' ]]>", "line\r\nnext\ttab", "🇮🇳 👨‍👩‍👧 é", "&amp; already"]
+    for texts in ([], samples, samples[1:3] + [chatbot_service.MAIN_MENU]):
+        response = ChunkedResponse(max_parts=len(samples))
+        for text in texts:
+            response.message(text)
+        assert response.render()[0] == reference(*map(str, texts))
+
+    # Checked-in output of the old builder for a dynamic message followed by the menu
+    response = ChunkedResponse()
+    response.message("🌳 Family Tree:\n1. Ravi & Asha <root>\n  └ 2. Kid")
+    response.message(chatbot_service.MAIN_MENU)
+    assert response.render()[0] == (GOLDEN / "tree_and_menu.xml").read_text(encoding="utf-8")
+
+@pytest.mark.asyncio
+async def test_long_tree_text_continues_on_more(client, db_session, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "REPLY_MAX_CHARS", 300)
+    monkeypatch.setattr(settings, "REPLY_MAX_PARTS", 2)
+    phone = "whatsapp:+6100000001"
+    response = await client.post("/webhook", data={"From": phone, "Body": 'add "Ravi Rao" 01-01-1960 M'}, headers=HEADERS)
+    root_id = response.text.split("(ID ")[1].split(")")[0]
+    paste = "\n".join(["bulk"] + [f"Child {i} 👶, 01-01-1990, O, child-of {root_id}" for i in range(40)])
+    await client.post("/webhook", data={"From": phone, "Body": paste}, headers=HEADERS)
+
+    response = await client.post("/webhook", data={"From": phone, "Body": "1"}, headers=HEADERS)
+    first = bodies(response.text)
+    assert len(first) == 2 and "Reply *more*" in first[-1]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        seen = first
+        while "Reply *more*" in seen[-1]:
+            response = await client.post("/webhook", data={"From": phone, "Body": "more"}, headers=HEADERS)
+            seen = bodies(response.text)
+            assert all(text_size(b)[0] <= 300 for b in seen)
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    # The stored parts were sent as they are; the tree was not rendered again
+    assert not any("members" in s for s in statements)
+    assert "Family Tree Bot" in seen[-1]
+
+    # Nothing left: "more" is an ordinary message again
+    response = await client.post("/webhook", data={"From": phone, "Body": "more"}, headers=HEADERS)
+    assert "Invalid option" in response.text
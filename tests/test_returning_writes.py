@@ -0,0 +1,110 @@
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app.models.member import Gender
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+
+class WriteLog:
+    """Records SQL statements issued through a session as (verb, table) pairs."""
+
+    # Version bump and change feed rows ride along with every tree write
+    FEED = {("UPDATE", "trees"), ("INSERT", "tree_changes")}
+
+    def __init__(self, db_session):
+        self.engine = db_session.bind.sync_engine
+        self.statements = []
+
+    def _statement(self, conn, cursor, statement, *args):
+        words = statement.replace('"', "").split()
+        verb = words[0].upper()
+        keyword = {"INSERT": "INTO", "UPDATE": "UPDATE", "DELETE": "FROM", "SELECT": "FROM"}[verb]
+        self.statements.append((verb, words[words.index(keyword) + 1], "RETURNING" in statement))
+
+    def writes(self):
+        return [s for s in self.statements if s[:2] not in self.FEED]
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._statement)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._statement)
+
+@pytest.mark.asyncio
+async def test_creates_return_generated_columns_without_refresh(db_session):
+    user_service = UserService(db_session)
+    with WriteLog(db_session) as log:
+        user = await user_service.create_user("+1200000001", active=True)
+    assert log.writes() == [("INSERT", "users", True)]
+    assert user.id and user.created_at
+
+    tree = await TreeService(db_session).create_tree(user)
+    with WriteLog(db_session) as log:
+        member = await MemberService(db_session).create_member(tree.id, "Asha", date(1950, 1, 1), Gender.FEMALE, 1)
+    assert log.writes() == [("INSERT", "members", True)]
+    assert member.id and member.created_at
+
+@pytest.mark.asyncio
+async def test_tree_and_event_creates_skip_the_refresh(db_session, query_budget):
+    user = await UserService(db_session).create_user("+1200000011", active=True)
+    # Tree, owner access, version bump + change feed rows
+    with WriteLog(db_session) as log, query_budget(4, "create tree"):
+        tree = await TreeService(db_session).create_tree(user)
+    assert not [s for s in log.statements if s[0] == "SELECT"]
+    assert ("INSERT", "trees", True) in log.statements
+    assert tree.id and tree.created_at and tree.version >= 1 and tree.change_floor == 0
+
+    member_service = MemberService(db_session)
+    member = await member_service.create_member(tree.id, "Asha", date(1950, 1, 1), Gender.FEMALE, 1)
+    with WriteLog(db_session) as log, query_budget(3, "add event"):
+        added = await member_service.add_event(member.id, "Wedding", date(1975, 12, 30))
+    # Only `id` is generated here (lastrowid on SQLite); the member's tree comes from the session
+    assert [s[:2] for s in log.writes()] == [("INSERT", "events")]
+    assert not [s for s in log.statements if s[0] == "SELECT"]
+    assert added.id and added.month_day == 1230
+
+@pytest.mark.asyncio
+async def test_updates_are_single_update_returning(db_session):
+    user = await UserService(db_session).create_user("+1200000002", active=True)
+    tree = await TreeService(db_session).create_tree(user)
+    member_service = MemberService(db_session)
+    member = await member_service.create_member(tree.id, "Bela", date(1951, 1, 1), Gender.FEMALE, 1)
+
+    with WriteLog(db_session) as log:
+        updated = await member_service.update_member(member.id, name="Bela K")
+    assert log.writes() == [("UPDATE", "members", True)]
+    assert updated is member and member.name == "Bela K"
+
+    with WriteLog(db_session) as log:
+        await UserService(db_session).update_state(user.id, "ADD_MEMBER", {"step": 1})
+    assert log.writes() == [("UPDATE", "users", True)]
+    assert user.current_state == "ADD_MEMBER" and user.state_data == {"step": 1}
+
+@pytest.mark.asyncio
+async def test_lock_is_a_single_conditional_update(db_session):
+    user_service = UserService(db_session)
+    alice = await user_service.create_user("+1200000003", active=True)
+    bob = await user_service.create_user("+1200000004", active=True)
+    tree = await TreeService(db_session).create_tree(alice)
+    member_service = MemberService(db_session)
+    member = await member_service.create_member(tree.id, "Chitra", date(1952, 1, 1), Gender.FEMALE, 1)
+
+    # Locks are not tree edits: no version bump or change feed row
+    with WriteLog(db_session) as log:
+        assert await member_service.lock_member(member.id, alice.id)
+    assert log.statements == [("UPDATE", "members", True)]
+
+    # Bob loses the race without any extra round trip; Alice can renew
+    with WriteLog(db_session) as log:
+        assert not await member_service.lock_member(member.id, bob.id)
+    assert log.statements == [("UPDATE", "members", True)]
+    assert await member_service.lock_member(member.id, alice.id)
+
+    assert not await member_service.unlock_member(member.id, bob.id)
+    with WriteLog(db_session) as log:
+        assert await member_service.unlock_member(member.id, alice.id)
+    assert log.statements == [("UPDATE", "members", True)]
+    assert member.is_locked is False and member.locked_by is None
+    assert await member_service.lock_member(member.id, bob.id)
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.future import select
+from app.models.change import TreeChange
+from app.models.tree import Tree, TreeAccess, Role
+from app.models.user import User
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+
+class StatementLog:
+    """Records SQL statements and commits issued through a session."""
+
+    def __init__(self, db_session):
+        self.engine = db_session.bind.sync_engine
+        self.session = db_session.sync_session
+        self.statements, self.commits = [], 0
+
+    def _statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement.lstrip().split()[0].upper())
+
+    def _commit(self, session):
+        self.commits += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._statement)
+        event.listen(self.session, "after_commit", self._commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._statement)
+        event.remove(self.session, "after_commit", self._commit)
+
+async def roles(db_session, tree_id):
+    result = await db_session.execute(
+        select(TreeAccess.user_id, TreeAccess.role).filter(TreeAccess.tree_id == tree_id)
+    )
+    return dict(result.all())
+
+@pytest.mark.asyncio
+async def test_grant_access_upserts_a_single_row(db_session):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user("+1100000001", active=True)
+    friend = await user_service.get_or_create_user("+1100000002")
+    tree_service = TreeService(db_session)
+    tree = await tree_service.create_tree(owner)
+
+    await tree_service.grant_access(tree.id, friend.id, Role.VIEWER)
+    with StatementLog(db_session) as log:
+        await tree_service.grant_access(tree.id, friend.id, Role.EDITOR)
+    # SQLite has no xmax, so the existing grants are read to tell creates from updates
+    assert log.statements == ["SELECT", "INSERT", "UPDATE", "INSERT"]
+    assert log.commits == 1
+    assert await roles(db_session, tree.id) == {owner.id: Role.OWNER, friend.id: Role.EDITOR}
+
+    result = await db_session.execute(
+        select(TreeChange.op).filter(TreeChange.tree_id == tree.id, TreeChange.entity == "access").order_by(TreeChange.seq)
+    )
+    assert result.scalars().all() == ["create", "create", "update"]
+
+@pytest.mark.asyncio
+async def test_transfer_ownership_is_one_transaction(db_session):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user("+1100000011", active=True)
+    heir = await user_service.get_or_create_user("+1100000012")
+    tree_service = TreeService(db_session)
+    tree = await tree_service.create_tree(owner)
+
+    with StatementLog(db_session) as log:
+        await tree_service.transfer_ownership(tree, heir)
+    # Tree UPDATE, existing grants (SQLite only), one two-row access upsert, version bump + change log
+    assert log.statements == ["UPDATE", "SELECT", "INSERT", "UPDATE", "INSERT"]
+    assert log.commits == 1
+
+    assert (await db_session.execute(select(Tree.owner_id).filter(Tree.id == tree.id))).scalar() == heir.id
+    assert await roles(db_session, tree.id) == {owner.id: Role.EDITOR, heir.id: Role.OWNER}
+
+@pytest.mark.asyncio
+async def test_share_with_many_phones_in_batched_statements(db_session):
+    user_service = UserService(db_session)
+    owner = await user_service.get_or_create_user("+1100000021", active=True)
+    editor = await user_service.get_or_create_user("+1100000022")
+    tree_service = TreeService(db_session)
+    tree = await tree_service.create_tree(owner)
+    await tree_service.grant_access(tree.id, editor.id, Role.EDITOR)
+
+    phones = ["+1100000022", "+1100000023", "+1100000024", "+1100000023"]
+    with StatementLog(db_session) as log:
+        granted, existing = await tree_service.share_with_phones(tree.id, phones)
+    assert (granted, existing) == (2, 1)
+    # users insert, their ids, access insert, version bump + change log
+    assert log.statements == ["INSERT", "SELECT", "INSERT", "UPDATE", "INSERT"]
+
+    users = (await db_session.execute(
+        select(User.phone, User.id).filter(User.phone.in_(phones))
+    )).all()
+    ids = dict(users)
+    assert len(ids) == 3
+    # The existing editor is not downgraded
+    assert await roles(db_session, tree.id) == {
+        owner.id: Role.OWNER, editor.id: Role.EDITOR,
+        ids["+1100000023"]: Role.VIEWER, ids["+1100000024"]: Role.VIEWER,
+    }
+
+@pytest.mark.asyncio
+async def test_share_flow_accepts_several_numbers(client):
+    phone = "whatsapp:+1100000031"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    await client.post("/webhook", data={"From": phone, "Body": 'add "Root" 01-01-1950 M'}, headers=headers)
+    await client.post("/webhook", data={"From": phone, "Body": "4"}, headers=headers)
+    response = await client.post(
+        "/webhook", data={"From": phone, "Body": "+1100000032, +1100000033\n1100000034"}, headers=headers
+    )
+    assert "Shared with 3 people as Viewers." in response.text
+
+@pytest.mark.asyncio
+async def test_share_flow_keeps_spaced_numbers_whole(client, db_session):
+    phone = "whatsapp:+1100000041"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    await client.post("/webhook", data={"From": phone, "Body": 'add "Root" 01-01-1950 M'}, headers=headers)
+    owner = await UserService(db_session).get_user_by_phone("+1100000041")
+    tree, _, _ = await TreeService(db_session).get_tree_and_role(owner.id)
+
+    await client.post("/webhook", data={"From": phone, "Body": "4"}, headers=headers)
+    response = await client.post("/webhook", data={"From": phone, "Body": "+91 98765 43210, +1 555 0100"}, headers=headers)
+    assert "Shared with 2 people as Viewers." in response.text
+    granted = await roles(db_session, tree.id)
+    ids = dict((await db_session.execute(
+        select(User.phone, User.id).filter(User.phone.in_(["+919876543210", "+15550100"]))
+    )).all())
+    assert granted == {owner.id: Role.OWNER, ids["+919876543210"]: Role.VIEWER, ids["+15550100"]: Role.VIEWER}
+
+    # Implausible entries are reported and nothing is granted
+    await client.post("/webhook", data={"From": phone, "Body": "4"}, headers=headers)
+    response = await client.post("/webhook", data={"From": phone, "Body": "+44 20 7946 0958; call me"}, headers=headers)
+    assert "Nothing was shared" in response.text and "'call me' is not a valid phone number." in response.text
+    assert len(await roles(db_session, tree.id)) == 3
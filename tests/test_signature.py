@@ -0,0 +1,79 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from starlette.datastructures import FormData
+from twilio.request_validator import RequestValidator
+from app.main import app
+from app.middleware.twilio_signature import FORM_STATE_KEY, SignatureVerifier, TwilioSignatureMiddleware
+
+TOKEN = "AUTH_TEST"
+URL = "https://bot.example.com/webhook"
+PROXY = {"X-Forwarded-Proto": "https", "X-Forwarded-Host": "bot.example.com"}
+
+def sign(url, params):
+    return RequestValidator(TOKEN).compute_signature(url, params)
+
+class Endpoint:
+    """Bare ASGI app recording what the middleware handed over."""
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        self.calls.append((scope.get("state", {}).get(FORM_STATE_KEY), message["body"]))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+def test_signature_matches_twilio_validator():
+    verifier = SignatureVerifier(TOKEN)
+    params = {"Body": ["héllo 🌳 & more"], "From": ["whatsapp:+15550001"], "MediaUrl": ["b", "a", "a"]}
+    for url in (URL, "https://bot.example.com:443/webhook?x=1", "http://localhost:8000/webhook"):
+        multi = FormData([(name, value) for name, values in params.items() for value in values])
+        assert verifier.signature(url, params).decode() == sign(url, multi)
+    # Twilio may sign with or without the default port
+    simple = {"Body": ["Hi"], "From": ["whatsapp:+15550001"]}
+    assert verifier.verify("https://bot.example.com:443/webhook", simple, sign(URL, {"Body": "Hi", "From": "whatsapp:+15550001"}))
+    assert not verifier.verify(URL, simple, sign(URL, {"Body": "tampered", "From": "whatsapp:+15550001"}))
+
+@pytest.mark.asyncio
+async def test_middleware_verifies_behind_proxy_and_shares_the_form():
+    endpoint = Endpoint()
+    middleware = TwilioSignatureMiddleware(endpoint, TOKEN)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://internal:10000") as client:
+        data = {"From": "whatsapp:+15550001", "Body": "Hi"}
+        headers = {**PROXY, "X-Twilio-Signature": sign(URL, data)}
+        response = await client.post("/webhook", data=data, headers=headers)
+        assert response.status_code == 200
+        form, body = endpoint.calls[0]
+        assert (form["From"], form["Body"]) == ("whatsapp:+15550001", "Hi")
+        assert body == b"From=whatsapp%3A%2B15550001&Body=Hi"
+
+        # Signed for another URL, missing, or without trusted proxy headers
+        for bad in ({**PROXY, "X-Twilio-Signature": sign("https://evil.example.com/webhook", data)}, PROXY):
+            assert (await client.post("/webhook", data=data, headers=bad)).status_code == 403
+        assert len(endpoint.calls) == 1
+
+    untrusting = TwilioSignatureMiddleware(endpoint, TOKEN, trust_proxy=False)
+    async with AsyncClient(transport=ASGITransport(app=untrusting), base_url="http://internal:10000") as client:
+        assert (await client.post("/webhook", data=data, headers=headers)).status_code == 403
+        # Other paths pass straight through, unparsed
+        assert (await client.post("/other", data=data)).status_code == 200
+        assert endpoint.calls[-1][0] is None
+
+@pytest.mark.asyncio
+async def test_forged_webhook_never_reaches_the_database(prepare_database, db_session):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    enforcing = TwilioSignatureMiddleware(app, TOKEN)
+    data = {"From": "whatsapp:+6200000001", "Body": "Hi"}
+    try:
+        async with AsyncClient(transport=ASGITransport(app=enforcing), base_url="https://bot.example.com") as client:
+            forged = await client.post("/webhook", data=data, headers={"X-Twilio-Signature": "Zm9yZ2Vk"})
+            assert forged.status_code == 403 and statements == []
+
+            signed = await client.post("/webhook", data=data, headers={"X-Twilio-Signature": sign(URL, data)})
+            assert signed.status_code == 200 and "Family Tree Bot" in signed.text
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    assert statements
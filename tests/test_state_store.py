@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.models.user import User
+from app.services.user_service import UserService
+from app.services.state_store import (
+    DatabaseStateStore,
+    InMemoryStateStore,
+    WriteBehindStateStore,
+)
+
+@pytest.mark.asyncio
+async def test_database_store_round_trip(db_session):
+    user = await UserService(db_session).get_or_create_user("+3000000001")
+    store = DatabaseStateStore(db_session)
+
+    await store.set(user.id, "ADD_MEMBER_DOB", {"name": "Asha"})
+    await store.set(user.id, "ADD_MEMBER_GENDER")
+    state, data = await store.get(user)
+    assert state == "ADD_MEMBER_GENDER"
+    assert data == {"name": "Asha"}
+
+    await store.clear(user.id)
+    assert await store.get(user) == (None, {})
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_entries(db_session):
+    now = [0.0]
+    store = InMemoryStateStore(ttl_seconds=10, clock=lambda: now[0])
+    user = User(id=42, phone="+3000000002")
+
+    await store.set(user.id, "EVENT_TYPE", {"member_id": 1})
+    now[0] = 5
+    assert await store.get(user) == ("EVENT_TYPE", {"member_id": 1})
+
+    now[0] = 11
+    assert await store.get(user) == (None, {})
+
+@pytest.mark.asyncio
+async def test_write_behind_store_flushes_latest_state_on_close(db_session, session_factory):
+    user_service = UserService(db_session)
+    users = [await user_service.get_or_create_user(f"+30000001{i:02d}") for i in range(5)]
+    store = WriteBehindStateStore(session_factory, flush_interval_ms=60000)
+
+    for step in range(20):
+        for user in users:
+            await store.set(user.id, f"STEP_{step}", {"step": step})
+    await store.set(users[0].id, "FINAL")
+
+    # Reads are served from memory before anything is flushed
+    assert await store.get(users[0]) == ("FINAL", {"step": 19})
+    assert store.flush_count == 0
+
+    await store.close()
+    assert store.flush_count == 1
+
+    async with session_factory() as session:
+        result = await session.execute(
+            select(User.id, User.current_state, User.state_data).filter(User.id.in_([u.id for u in users]))
+        )
+        rows = {row.id: (row.current_state, row.state_data) for row in result}
+    assert rows[users[0].id] == ("FINAL", {"step": 19})
+    for user in users[1:]:
+        assert rows[user.id] == ("STEP_19", {"step": 19})
+
+@pytest.mark.asyncio
+async def test_write_behind_store_keeps_updates_made_during_flush(db_session, session_factory):
+    user = await UserService(db_session).get_or_create_user("+3000000200")
+    store = WriteBehindStateStore(session_factory, flush_interval_ms=60000)
+
+    await store.set(user.id, "A", {"n": 1})
+    flushing = asyncio.create_task(store.flush())
+    await store.set(user.id, "B", {"n": 2})
+    await flushing
+    await store.close()
+
+    async with session_factory() as session:
+        row = (await session.execute(
+            select(User.current_state, User.state_data).filter(User.id == user.id)
+        )).one()
+    assert (row.current_state, row.state_data) == ("B", {"n": 2})
+
+
+@pytest.mark.asyncio
+async def test_write_behind_store_drops_expired_and_overwritten_entries(db_session, session_factory):
+    user = await UserService(db_session).get_or_create_user("+3000000300")
+    store = WriteBehindStateStore(session_factory, flush_interval_ms=60000, ttl_seconds=3600)
+
+    await store.set(user.id, "A", {"n": 1})
+    await store.close()
+    assert await store.get(user) == ("A", {"n": 1})
+
+    # The GC resets abandoned rows after the same TTL; an old cached state goes with them
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    store._entries[user.id] = store._entries[user.id]._replace(updated_at=old)
+    await db_session.execute(
+        update(User).filter(User.id == user.id).values(current_state=None, state_data={}, state_updated_at=None)
+    )
+    await db_session.commit()
+    await db_session.refresh(user)
+    assert await store.get(user) == (None, {})
+
+    # A row written elsewhere after the cached value wins
+    await store.set(user.id, "B", {"n": 2})
+    await store.close()
+    await db_session.execute(
+        update(User).filter(User.id == user.id).values(
+            current_state="C", state_data={"n": 3}, state_updated_at=datetime.now(timezone.utc) + timedelta(seconds=1)
+        )
+    )
+    await db_session.commit()
+    await db_session.refresh(user)
+    assert await store.get(user) == ("C", {"n": 3})
@@ -0,0 +1,81 @@
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app.models.member import Gender
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+
+async def seed_tree(db_session, phone):
+    owner = await UserService(db_session).get_or_create_user(phone, active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    member_service = MemberService(db_session)
+    members = [
+        await member_service.create_member(tree.id, name, date(1950 + i, 1, 1), Gender.FEMALE, 1)
+        for i, name in enumerate(["Asha", "Bela", "Chitra", "Divya", "Esha"])
+    ]
+    await member_service.add_relationship(tree.id, members[0].id, members[1].id)
+    return tree, members
+
+@pytest.mark.asyncio
+async def test_tree_summary_and_keyset_pages(client, db_session):
+    tree, members = await seed_tree(db_session, "+7000000001")
+
+    response = await client.get(f"/trees/{tree.id}")
+    assert response.status_code == 200
+    summary = response.json()
+    assert (summary["member_count"], summary["relationship_count"]) == (5, 1)
+    assert response.headers["etag"] == f'W/"{tree.id}-{summary["version"]}"'
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"after": cursor} if cursor else {})}
+        page = (await client.get(f"/trees/{tree.id}/members", params=params)).json()
+        names += [m["name"] for m in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["Asha", "Bela", "Chitra", "Divya", "Esha"]
+
+    page = (await client.get(f"/trees/{tree.id}/relationships")).json()
+    assert [(r["parent_id"], r["child_id"]) for r in page["items"]] == [(members[0].id, members[1].id)]
+
+@pytest.mark.asyncio
+async def test_member_detail_includes_events(client, db_session):
+    tree, members = await seed_tree(db_session, "+7000000002")
+    member_service = MemberService(db_session)
+    await member_service.add_event(members[2].id, "Wedding", date(1990, 5, 1))
+    await member_service.add_event(members[2].id, "Graduation", date(1985, 6, 1))
+
+    response = await client.get(f"/trees/{tree.id}/members/{members[2].id}")
+    assert response.status_code == 200
+    assert [e["event_type"] for e in response.json()["events"]] == ["Graduation", "Wedding"]
+
+    # Members of another tree are not reachable through this one
+    other, other_members = await seed_tree(db_session, "+7000000003")
+    response = await client.get(f"/trees/{tree.id}/members/{other_members[0].id}")
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304_until_the_tree_changes(client, db_session):
+    tree, members = await seed_tree(db_session, "+7000000004")
+    url = f"/trees/{tree.id}/members"
+    etag = (await client.get(url)).headers["etag"]
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = await client.get(url, headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert len(statements) == 1 and "members" not in statements[0]
+
+    await MemberService(db_session).add_event(members[0].id, "Birthday", date(2000, 1, 1))
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
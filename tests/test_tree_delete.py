@@ -0,0 +1,90 @@
+import pytest
+from datetime import date
+from sqlalchemy import event, func
+from sqlalchemy.future import select
+from app.models.change import TreeChange
+from app.models.event import Event
+from app.models.member import Member, Relationship, Gender
+from app.models.tree import Tree, TreeAccess
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.services.maintenance_service import MaintenanceService, GCStats
+
+async def seed_tree(db_session, phone, members=5):
+    owner = await UserService(db_session).get_or_create_user(phone, active=True)
+    tree = await TreeService(db_session).create_tree(owner)
+    member_service = MemberService(db_session)
+    root = await member_service.create_member(tree.id, "Root", date(1940, 1, 1), Gender.MALE, 1)
+    for i in range(members - 1):
+        child = await member_service.create_member(tree.id, f"Child {i}", date(1970, 1, 1), Gender.FEMALE, 2)
+        await member_service.add_relationship(tree.id, root.id, child.id)
+        await member_service.add_event(child.id, "Wedding", date(1995, 1, 1))
+    return tree
+
+async def count_rows(db_session, tree_id):
+    counts = {}
+    for model, column in (
+        (Member, Member.tree_id), (Relationship, Relationship.tree_id),
+        (TreeAccess, TreeAccess.tree_id), (TreeChange, TreeChange.tree_id), (Tree, Tree.id),
+    ):
+        counts[model.__tablename__] = (await db_session.execute(
+            select(func.count()).select_from(model).filter(column == tree_id)
+        )).scalar()
+    return counts
+
+@pytest.mark.asyncio
+async def test_delete_tree_is_set_based(db_session):
+    tree = await seed_tree(db_session, "+9000000001", members=6)
+    event_count = select(func.count(Event.id)).join(Member).filter(Member.tree_id == tree.id)
+    assert (await db_session.execute(event_count)).scalar() == 5
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        await TreeService(db_session).delete_tree(tree.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # One DELETE per table, no SELECT of members/relationships/events
+    assert len(statements) == 7
+    assert all(s.lstrip().upper().startswith("DELETE") for s in statements)
+    assert set((await count_rows(db_session, tree.id)).values()) == {0}
+    assert (await db_session.execute(event_count)).scalar() == 0
+
+@pytest.mark.asyncio
+async def test_detached_tree_is_deleted_in_chunks_by_gc(db_session):
+    tree = await seed_tree(db_session, "+9000000002")
+    owner_id = tree.owner_id
+    tree_service = TreeService(db_session)
+    await tree_service.detach_tree(tree.id)
+
+    # The owner no longer sees the tree, but its rows are still there
+    assert (await tree_service.get_tree_and_role(owner_id))[0] is None
+    assert (await count_rows(db_session, tree.id))["members"] == 5
+
+    stats = await MaintenanceService(db_session).purge_detached_trees(GCStats())
+    assert stats.trees_purged == 1
+    assert set((await count_rows(db_session, tree.id)).values()) == {0}
+
+@pytest.mark.asyncio
+async def test_delete_tree_in_chunks_commits_per_batch(db_session):
+    tree = await seed_tree(db_session, "+9000000003")
+    tree_service = TreeService(db_session)
+    await tree_service.detach_tree(tree.id)
+
+    commits = []
+    def record(session):
+        commits.append(session)
+    event.listen(db_session.sync_session, "after_commit", record)
+    try:
+        deleted = await tree_service.delete_tree_in_chunks(tree.id, batch_size=2)
+    finally:
+        event.remove(db_session.sync_session, "after_commit", record)
+    assert deleted == 5
+    # 3 member chunks + the final sweep of the tree row and change log
+    assert len(commits) == 4
+    assert set((await count_rows(db_session, tree.id)).values()) == {0}
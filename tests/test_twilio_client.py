@@ -0,0 +1,69 @@
+import time
+import httpx
+import pytest
+from app.services.outbound import OutboundMessage, TwilioSender
+from app.services.twilio_client import TwilioClient
+from app.utils.rate_limit import TokenBucket
+from scripts.twilio_standin import StandIn
+
+FROM = "whatsapp:+14155238886"
+
+def client_for(stand_in, **kwargs):
+    kwargs.setdefault("rate_per_second", 1000)
+    kwargs.setdefault("backoff_base", 0.001)
+    return TwilioClient(
+        "AC_TEST", "AUTH_TEST", base_url="http://twilio.test",
+        transport=httpx.ASGITransport(app=stand_in.app), **kwargs
+    )
+
+def test_token_bucket_refills_at_its_rate():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now[0])
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    now[0] += 0.5
+    assert bucket.try_acquire() and not bucket.try_acquire()
+    now[0] += 10
+    assert sum(bucket.try_acquire() for _ in range(5)) == 3
+
+@pytest.mark.asyncio
+async def test_batch_is_sent_through_the_sender():
+    stand_in = StandIn()
+    sender = TwilioSender(client_for(stand_in), FROM)
+    results = await sender.send_batch([OutboundMessage(f"+1555000000{i}", f"Hi {i}") for i in range(5)])
+    await sender.close()
+    assert results == [True] * 5
+    assert sorted(m["to"] for m in stand_in.messages) == [f"whatsapp:+1555000000{i}" for i in range(5)]
+    assert {m["from"] for m in stand_in.messages} == {FROM}
+
+@pytest.mark.asyncio
+async def test_retries_429_and_5xx_but_not_other_client_errors():
+    stand_in = StandIn()
+    client = client_for(stand_in)
+    stand_in.fail_next(429, 503, retry_after="0")
+    result = await client.send(FROM, "+15550000001", "Hello")
+    assert (result.ok, result.attempts) == (True, 3)
+    assert result.sid == stand_in.messages[0]["sid"]
+
+    stand_in.fail_next(500, 500, 500, 500)
+    result = await client.send(FROM, "+15550000002", "Hello")
+    assert (result.ok, result.status_code, result.attempts) == (False, 500, 4)
+
+    result = await client.send(FROM, "not-a-number", "Hello")
+    assert (result.ok, result.status_code, result.attempts) == (False, 400, 1)
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_sends_are_paced_per_sender_number():
+    stand_in = StandIn()
+    client = client_for(stand_in, rate_per_second=50, burst=1)
+    started = time.monotonic()
+    await client.send_many(FROM, [(f"+1555000010{i}", "Hi") for i in range(6)])
+    # 1 immediate + 5 at 50/s
+    assert time.monotonic() - started >= 0.09
+
+    # Another number has its own bucket
+    started = time.monotonic()
+    await client.send("whatsapp:+14155550000", "+15550000200", "Hi")
+    assert time.monotonic() - started < 0.05
+    await client.close()
+    assert len(stand_in.messages) == 7
@@ -0,0 +1,86 @@
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import event, text
+from app.models.member import Gender, UNKNOWN_DOB
+from app.services.user_service import UserService
+from app.services.tree_service import TreeService
+from app.services.member_service import MemberService
+from app.utils.commands import parse_bulk
+
+async def seed_tree(db_session, phone):
+    owner = await UserService(db_session).get_or_create_user(phone, active=True)
+    return await TreeService(db_session).create_tree(owner)
+
+@pytest.mark.asyncio
+async def test_upcoming_dates_wrap_around_the_year(db_session):
+    tree = await seed_tree(db_session, "+1400000001")
+    member_service = MemberService(db_session)
+    asha = await member_service.create_member(tree.id, "Asha", date(1950, 1, 3), Gender.FEMALE, 1)
+    await member_service.create_member(tree.id, "Bela", date(1960, 12, 24), Gender.FEMALE, 1)
+    await member_service.create_member(tree.id, "Chitra", date(1970, 6, 1), Gender.FEMALE, 2)
+    await member_service.create_member(tree.id, "Unknown", UNKNOWN_DOB, Gender.OTHER, 2)
+    await member_service.add_event(asha.id, "Wedding", date(1975, 12, 30))
+    # Core bulk inserts fill the key too
+    await member_service.bulk_create_members(tree.id, parse_bulk([f"Divya, 28-12-2000, F, child-of {asha.id}"]).lines)
+
+    other = await seed_tree(db_session, "+1400000002")
+    await member_service.create_member(other.id, "Elsewhere", date(1950, 12, 25), Gender.MALE, 1)
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        upcoming = await member_service.get_upcoming_dates(tree.id, date(2025, 12, 20), 30)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    assert upcoming == [
+        (date(2025, 12, 24), "Bela", "Birthday", 65),
+        (date(2025, 12, 28), "Divya", "Birthday", 25),
+        (date(2025, 12, 30), "Asha", "Wedding", 50),
+        (date(2026, 1, 3), "Asha", "Birthday", 76),
+    ]
+
+    # Changing a birth date moves the member in the index
+    await member_service.update_member(asha.id, dob=date(1950, 6, 2))
+    upcoming = await member_service.get_upcoming_dates(tree.id, date(2026, 5, 30), 7)
+    assert [(u.name, u.kind) for u in upcoming] == [("Chitra", "Birthday"), ("Asha", "Birthday")]
+
+@pytest.mark.asyncio
+async def test_upcoming_query_uses_the_month_day_indexes(db_session):
+    plan = (await db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM members WHERE tree_id = 1 AND month_day BETWEEN 1220 AND 1231"
+    ))).all()
+    assert any("ix_members_tree_month_day" in row[-1] for row in plan)
+    plan = (await db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM events WHERE month_day BETWEEN 1220 AND 1231"
+    ))).all()
+    assert any("ix_events_month_day" in row[-1] for row in plan)
+
+@pytest.mark.asyncio
+async def test_upcoming_menu_option(client):
+    phone = "whatsapp:+1400000011"
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    soon = date.today() + timedelta(days=3)
+    dob = soon.replace(year=1990) if (soon.month, soon.day) != (2, 29) else date(1992, 2, 29)
+    await client.post(
+        "/webhook", data={"From": phone, "Body": f'add "Root" {dob.strftime("%d-%m-%Y")} M'}, headers=headers
+    )
+    response = await client.post("/webhook", data={"From": phone, "Body": "9"}, headers=headers)
+    assert f"{soon.strftime('%d-%m')} Root: Birthday (turns {soon.year - dob.year})" in response.text
+
+@pytest.mark.asyncio
+async def test_leap_day_birthdays_show_on_1_march_in_common_years(db_session):
+    tree = await seed_tree(db_session, "+1400000021")
+    member_service = MemberService(db_session)
+    await member_service.create_member(tree.id, "Leap", date(1996, 2, 29), Gender.FEMALE, 1)
+
+    upcoming = await member_service.get_upcoming_dates(tree.id, date(2025, 3, 1), 7)
+    assert upcoming == [(date(2025, 3, 1), "Leap", "Birthday", 29)]
+    upcoming = await member_service.get_upcoming_dates(tree.id, date(2025, 2, 20), 8)
+    assert upcoming == []
+    upcoming = await member_service.get_upcoming_dates(tree.id, date(2028, 2, 29), 7)
+    assert upcoming == [(date(2028, 2, 29), "Leap", "Birthday", 32)]